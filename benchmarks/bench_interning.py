@@ -0,0 +1,72 @@
+"""
+Measure the memory saved by interning equal cell values and the export speedup of escaping each distinct value once.
+The export is faster because of the escape cache of create_php_data, not because of the interning. The dictionaries
+only tell the export which columns have mostly distinct values and are not worth caching.
+
+Run from the repository root: python -m benchmarks.bench_interning --rows 100000
+"""
+
+import time
+import argparse
+
+from util.interning import intern_rows, drop_distinct_columns
+from util.memory import deep_sizeof, format_size
+from util.parser import create_php_data
+
+from .generator import generate_roster
+
+
+def fresh_copy(rows):
+    """
+    Copy all rows with a new string object for each cell, like the html parser creates them.
+    """
+    return [[(v + " ")[:-1] for v in row] for row in rows]
+
+
+def measure(func, repeat):
+    """
+    :return best wall clock time of func in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark interning of cell values.")
+    parser.add_argument("--rows", type=int, default=100000, help="Number of students.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of repetitions. The best time is reported.")
+    args = parser.parse_args()
+
+    headers, rows = generate_roster(args.rows)
+    plain = fresh_copy(rows)
+    interned = fresh_copy(rows)
+    dictionaries = drop_distinct_columns(intern_rows(interned), len(interned))
+
+    plain_size = deep_sizeof(plain)
+    interned_size = deep_sizeof((interned, dictionaries))
+    print("{0:<28} {1:>12}".format("rows (fresh strings)", format_size(plain_size)))
+    print("{0:<28} {1:>12}".format("rows (interned)", format_size(interned_size)))
+    print("{0:<28} {1:>11.1f}%".format("memory saved", 100 * (1 - interned_size / plain_size)))
+    print("{0:<28} {1}".format("interned columns", ", ".join(h for h, d in zip(headers, dictionaries) if d)))
+
+    timings = [
+        ("intern_rows", measure(lambda: intern_rows(fresh_copy(rows)), args.repeat)
+         - measure(lambda: fresh_copy(rows), args.repeat)),
+        # Without any dictionary each cell is escaped, which matches the export before the values were interned.
+        ("create_php_data (each cell)", measure(lambda: create_php_data(headers, plain, [None] * len(headers)),
+                                                args.repeat)),
+        # Each distinct value of each column is escaped once.
+        ("create_php_data", measure(lambda: create_php_data(headers, plain), args.repeat)),
+        # Columns with mostly distinct values are escaped for each cell instead of being cached.
+        ("create_php_data (interned)", measure(lambda: create_php_data(headers, interned, dictionaries), args.repeat)),
+    ]
+    for name, t in timings:
+        print("{0:<28} {1:>11.3f}s".format(name, t))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare the launch time of LaunchMode.RESTORE for the binary state format and the legacy pickle format.
+
+Run from the repository root: python -m benchmarks.bench_state --rows 100000
+"""
+
+import os
+import sys
+import time
+import pickle
+import argparse
+import tempfile
+
+from PyQt5.QtWidgets import QApplication
+
+from util.state import save_state, load_state
+from ui.listview import ListView
+
+from .generator import generate_roster
+
+
+def measure(func, repeat):
+    """
+    :return best wall clock time of func in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark restoring the application state.")
+    parser.add_argument("--rows", type=int, default=100000, help="Number of students.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of repetitions. The best time is reported.")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    headers, rows = generate_roster(args.rows)
+    checked = list(range(0, args.rows, 7))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.dat")
+        with open(legacy_path, "wb") as f:
+            pickle.dump({"headers": headers, "user_data": rows, "checked_rows": checked}, f)
+
+        paths = {"pickle": legacy_path}
+        for name, compress in (("binary", False), ("binary+zlib", True)):
+            paths[name] = os.path.join(tmp, name + ".dat")
+            save_state(paths[name], headers, rows, checked, compress=compress)
+
+        print("{0:<12} {1:>10} {2:>10} {3:>12}".format("format", "size", "load [s]", "restore [s]"))
+        for name, path in paths.items():
+            def restore():
+                headers, data, checked_rows, _ = load_state(path)
+                view = ListView()
+                view.updateData(headers, data, 0)
+                view.setCheckedRows(checked_rows)
+
+            load_time = measure(lambda: load_state(path), args.repeat)
+            restore_time = measure(restore, args.repeat)
+            print("{0:<12} {1:>10} {2:>10.3f} {3:>12.3f}".format(name, os.path.getsize(path), load_time, restore_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Deterministic generator for synthetic Monoid rosters.
+"""
+
+import random
+
+from util.helper import points_to_str
+from util.collation import collation_key
+
+
+HEADERS = ["Name", "Stufe", "Schule", "135", "136", "137", "138", "Summe", "Forscher", "Denkerchen"]
+
+FIRST_NAMES = ["Anna", "Lea", "Lena", "Hannah", "Sophie", "Marie", "Emilia", "Zoë", "Chloé", "Jana", "Greta",
+               "Lotte", "Maximilian", "Paul", "Jonas", "Lukas", "Felix", "Leon", "Jürgen", "Sören", "Jörg", "Björn",
+               "Günther", "Mathis", "Ömer", "Çağla", "Noah", "Elias", "Lina", "Ida", "Mia", "Frieda"]
+
+LAST_NAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schulz", "Hoffmann",
+              "Schäfer", "Koch", "Bauer", "Richter", "Klein", "Wolf", "Schröder", "Neumann", "Schwarz", "Zimmermann",
+              "Braun", "Krüger", "Hofmann", "Hartmann", "Lange", "Schmitt", "Werner", "Köhler", "Größ", "Weiß",
+              "Jäger", "Böhm", "Süß", "Groß", "Krämer", "Vogt", "Özdemir", "Yılmaz"]
+
+TOWNS = ["Mainz", "Wiesbaden", "Bingen", "Worms", "Ingelheim", "Alzey", "Bad Kreuznach", "Trier", "Koblenz",
+         "Kaiserslautern", "Ludwigshafen", "Speyer", "Frankfurt", "Darmstadt", "Saarbrücken", "Köln"]
+
+SCHOOL_TYPES = ["Gymnasium", "Realschule plus", "Gesamtschule", "Grundschule", "Privatgymnasium"]
+
+SCHOOL_NAMES = ["Gutenberg", "Frauenlob", "Goethe", "Schiller", "Theresianum", "Rabanus-Maurus", "Willigis",
+                "Sophie-Scholl", "Geschwister-Scholl", "Otto-Schott", "Humboldt", "Lessing", "Käthe-Kollwitz"]
+
+# Relative number of participants for each grade. Younger students participate more often.
+GRADE_WEIGHTS = {5: 20, 6: 18, 7: 15, 8: 12, 9: 10, 10: 8, 11: 6, 12: 5, 13: 3}
+
+# Probability that a student did not submit a solution for a release.
+MISSING_PROBABILITY = 0.45
+
+
+def _schools(rng, count):
+    schools = set()
+    while len(schools) < count:
+        schools.add("{0}, {1}-{2}".format(rng.choice(TOWNS), rng.choice(SCHOOL_NAMES), rng.choice(SCHOOL_TYPES)))
+    return sorted(schools)
+
+
+def generate_roster(num_students, seed=0, num_schools=None):
+    """
+    Create a reproducible roster with realistic names, schools, grades and sparse point cells.
+    :param num_students: number of students
+    :param seed: random seed
+    :param num_schools: number of distinct schools (None to derive it from the number of students)
+    :return headers, data for each student sorted by name
+    """
+    rng = random.Random(seed)
+    if num_schools is None:
+        num_schools = max(1, min(500, num_students // 40))
+    schools = _schools(rng, num_schools)
+
+    grades = list(GRADE_WEIGHTS)
+    grade_weights = [GRADE_WEIGHTS[g] for g in grades]
+    point_values = [points_to_str(p / 2) for p in range(1, 21)]
+
+    rows = []
+    for grade in rng.choices(grades, grade_weights, k=num_students):
+        points = ["-" if rng.random() < MISSING_PROBABILITY else rng.choice(point_values) for _ in range(4)]
+        total = sum(float(p.replace(",", ".")) for p in points if p != "-")
+        name = "{0} {1}".format(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES))
+
+        # Use a second first name for a part of the students to reduce the number of identical names.
+        if rng.random() < 0.5:
+            name = "{0} {1}".format(rng.choice(FIRST_NAMES), name)
+
+        forscher = "-" if rng.random() < 0.9 else str(rng.randint(1, 5))
+        rows.append([name, str(grade), rng.choice(schools)] + points + [points_to_str(total), forscher, "-"])
+
+    rows.sort(key=lambda e: collation_key(e[0]))
+    return list(HEADERS), rows
+
+
+def create_website_data(headers, user_data):
+    """
+    Create html data with the same layout as the monoid website, which can be parsed with parse_website_data.
+    :param headers: all header fields
+    :param user_data: data for each student
+    :return html source code
+    """
+    rows = ["<tr>" + "".join("<th>{0}</th>".format(h) for h in headers) + "</tr>"]
+    rows += ["<tr>" + "".join("<td>{0}</td>".format(v) for v in entry) + "</tr>" for entry in user_data]
+    return """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Rubrik der L&ouml;ser</title></head>
+<body>
+<table><tr><td>
+<table border="1">
+<tbody>
+{0}
+</tbody>
+</table>
+</td></tr></table>
+</body>
+</html>
+""".format("\n".join(rows))
+
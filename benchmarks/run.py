@@ -0,0 +1,268 @@
+"""
+Benchmark suite for parsing, exporting and the data model.
+
+Run from the repository root:
+
+    python -m benchmarks.run --sizes 10,1000,10000 --output results.json
+    python -m benchmarks.run --sizes 10,1000,10000 --baseline results.json
+
+Each benchmark reports the best wall clock time of several repetitions. The results are stored as json and can be
+compared against the results of an earlier run.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import datetime
+from types import SimpleNamespace
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+from util.parser import parse_website_data, parse_php_file, create_php_data
+from util.state import save_state, load_state
+from util.sorting import SortColumn
+from ui.listview import ListView
+from ui.tableview import TableModel, TableView, join_block
+
+from .generator import generate_roster, create_website_data
+
+
+# Parsing with BeautifulSoup is slow. Skip the parse benchmarks for larger rosters unless requested.
+DEFAULT_MAX_PARSE_ROWS = 5000
+
+# Number of names inserted by the addDataInOrder benchmark.
+INSERT_COUNT = 100
+
+# Number of scroll positions painted by the scroll benchmark and size of the list in pixels.
+SCROLL_STEPS = 200
+VIEW_SIZE = (300, 600)
+
+# Roles a QListView asks for when it paints a row.
+PAINT_ROLES = [Qt.DisplayRole, Qt.DecorationRole, Qt.FontRole, Qt.TextAlignmentRole, Qt.BackgroundRole,
+               Qt.ForegroundRole, Qt.CheckStateRole]
+
+
+def measure(func, setup=None, repeat=3):
+    """
+    Measure the best wall clock time of a function.
+    :param func: function to measure, which receives the result of setup
+    :param setup: function which prepares the arguments for func (not measured)
+    :param repeat: number of repetitions
+    :return best time in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is None:
+            start = time.perf_counter()
+            func()
+        else:
+            arg = setup()
+            start = time.perf_counter()
+            func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def create_list_view(headers, user_data):
+    """
+    :return ListView with a copy of the data
+    """
+    view = ListView()
+    view.updateData(headers, [list(e) for e in user_data], 0)
+    return view
+
+
+def show_list_view(view):
+    """
+    Show a ListView and wait until its first rows were laid out and painted.
+    :return the view
+    """
+    view.resize(*VIEW_SIZE)
+    view.show()
+    QApplication.processEvents()
+    return view
+
+
+def lay_out_list_view(view):
+    """
+    Show a ListView and wait until all rows were laid out. The rows are laid out in batches while the event loop runs.
+    :return the view
+    """
+    show_list_view(view)
+    bar = view.verticalScrollBar()
+    rows = view.model().rowCount()
+    while bar.maximum() + bar.pageStep() < rows:
+        QApplication.processEvents()
+    return view
+
+
+def read_paint_roles(model):
+    """
+    Read all roles of all rows like a view does when it paints the rows.
+    """
+    for row in range(model.rowCount()):
+        index = model.index(row)
+        for role in PAINT_ROLES:
+            model.data(index, role)
+
+
+def scroll_list_view(view):
+    """
+    Scroll from the top to the bottom of a ListView and paint each position.
+    """
+    bar = view.verticalScrollBar()
+    for i in range(SCROLL_STEPS):
+        bar.setValue(bar.maximum() * i // (SCROLL_STEPS - 1))
+        view.viewport().repaint()
+
+
+def benchmark_size(headers, user_data, tmp_dir, repeat, max_parse_rows):
+    """
+    Run all benchmarks for a single roster.
+    :return dictionary with the name of each benchmark and its time in seconds
+    """
+    results = {}
+    n = len(user_data)
+
+    php_data = create_php_data(headers, user_data)
+    php_path = os.path.join(tmp_dir, "loeser.php")
+    with open(php_path, "w") as f:
+        f.write(php_data)
+
+    if n <= max_parse_rows:
+        website_data = create_website_data(headers, user_data).encode("utf-8")
+        results["parse_website_data"] = measure(lambda: parse_website_data(website_data), repeat=repeat)
+        results["parse_php_file"] = measure(lambda: parse_php_file(php_path), repeat=repeat)
+
+    results["create_php_data"] = measure(lambda: create_php_data(headers, user_data), repeat=repeat)
+
+    # Data model operations.
+    rng = random.Random(n)
+    names = ["{0} Benchmark".format(rng.choice(user_data)[0]) for _ in range(INSERT_COUNT)]
+    checked = list(range(0, n, 7))
+
+    def insert(view):
+        for name in names:
+            view.addDataInOrder(name)
+
+    def check(view):
+        view.setCheckedRows(checked)
+        return view
+
+    results["addDataInOrder_x{0}".format(INSERT_COUNT)] = measure(
+        insert, lambda: create_list_view(headers, user_data), repeat)
+    results["setCheckedRows"] = measure(check, lambda: create_list_view(headers, user_data), repeat)
+
+    # Rendering: the first layout and paint of the list and painting while scrolling through all rows.
+    results["ListView_show"] = measure(show_list_view, lambda: create_list_view(headers, user_data), repeat)
+    results["ListView_layout"] = measure(lay_out_list_view, lambda: create_list_view(headers, user_data), repeat)
+    results["ListView_scroll_repaint_x{0}".format(SCROLL_STEPS)] = measure(
+        scroll_list_view, lambda: lay_out_list_view(create_list_view(headers, user_data)), repeat)
+    results["DataModel_data_paint_roles"] = measure(
+        read_paint_roles, lambda: create_list_view(headers, user_data).model(), repeat)
+
+    # Ranking: sum in descending order, then name. The edits move single rows to their new sorted position.
+    sum_index = headers.index("Summe")
+    ranking = [SortColumn(sum_index, descending=True, numeric=True), SortColumn(0)]
+    edit_rows = [rng.randrange(n) for _ in range(INSERT_COUNT)]
+
+    def rank(view):
+        view.setSortOrder(ranking)
+        return view
+
+    def edit(view):
+        for i, row in enumerate(edit_rows):
+            view.setData(row, str(i % 40), header="Summe")
+
+    results["setSortOrder_ranking"] = measure(rank, lambda: create_list_view(headers, user_data), repeat)
+    results["setData_ranked_x{0}".format(INSERT_COUNT)] = measure(
+        edit, lambda: rank(create_list_view(headers, user_data)), repeat)
+    results["checkedRows"] = measure(lambda view: view.checkedRows(),
+                                     lambda: check(create_list_view(headers, user_data)), repeat)
+
+    # Table editor: paste the points of all releases for every student as a single block.
+    point_indices = range(3, sum_index)
+    block = join_block([[str((row + i) % 40) for i in point_indices] for row in range(n)])
+
+    def create_table_view():
+        table_model = TableModel(create_list_view(headers, user_data).model())
+        table_model.setHeaders(headers)
+        table_model.setSchema(SimpleNamespace(sum_index=sum_index, point_indices=tuple(point_indices)))
+        view = TableView()
+        view.setModel(table_model)
+        view.setCurrentIndex(table_model.index(0, point_indices[0]))
+        return view
+
+    results["TableView_pasteBlock"] = measure(lambda view: view.pasteBlock(block), create_table_view, repeat)
+
+    # Application state.
+    state_path = os.path.join(tmp_dir, "state.dat")
+    results["save_state"] = measure(lambda: save_state(state_path, headers, user_data, checked), repeat=repeat)
+    results["load_state"] = measure(lambda: load_state(state_path), repeat=repeat)
+
+    return results
+
+
+def compare(results, baseline):
+    """
+    Print a comparison of two benchmark runs.
+    :param results: results of this run
+    :param baseline: results of an earlier run
+    """
+    print("\n{0:<28} {1:>8} {2:>12} {3:>12} {4:>8}".format("benchmark", "rows", "baseline", "current", "ratio"))
+    for size, timings in results["results"].items():
+        base_timings = baseline.get("results", {}).get(size, {})
+        for name, t in timings.items():
+            base = base_timings.get(name)
+            if base is None:
+                continue
+            ratio = t / base if base else 0
+            print("{0:<28} {1:>8} {2:>12.6f} {3:>12.6f} {4:>7.2f}x".format(name, size, base, t, ratio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the MonoidApp benchmark suite.")
+    parser.add_argument("--sizes", type=str, default="10,1000,10000", help="Comma separated list of roster sizes "\
+                        "between 10 and 1000000.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of repetitions. The best time is reported.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the roster generator.")
+    parser.add_argument("--max-parse-rows", type=int, default=DEFAULT_MAX_PARSE_ROWS, help="Skip the parse "\
+                        "benchmarks for rosters larger than this.")
+    parser.add_argument("--output", type=str, help="Write the results to this json file.")
+    parser.add_argument("--baseline", type=str, help="Compare the results with an earlier json file.")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    results = {
+        "meta": {"date": datetime.datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                 "platform": platform.platform(), "seed": args.seed, "repeat": args.repeat},
+        "results": {}
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            headers, user_data = generate_roster(size, args.seed)
+            timings = benchmark_size(headers, user_data, tmp_dir, args.repeat, args.max_parse_rows)
+            results["results"][str(size)] = timings
+            for name, t in timings.items():
+                print("{0:<28} {1:>8} {2:>12.6f}s".format(name, size, t))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ Coding conventions:
 """
 
 import sys
+import time
+import datetime
 import argparse
 from functools import partial
 
@@ -19,8 +21,27 @@ from PyQt5.QtWidgets import QShortcut
 from PyQt5.QtGui import QKeySequence
 
 from ui import MonoidApp, MonoidSplashScreen, OptionDialog
-from util.parser import fetch_latest_data, parse_website_data, parse_php_file
-from util.config import LaunchMode, TEMPLATE_FILE
+from util.parser import STREAM_CHUNK_SIZE, fetch_latest_data, parse_website_data, parse_php_file, stream_php_file, \
+                        stream_table, current_school_year
+from util.config import LaunchMode, TEMPLATE_FILE, SAVED_APP_STATE_FILE, SAVED_APP_STATE_JOURNAL_FILE, load_settings, \
+                        PUBLISH_STATE_FILE
+from util.publish import Publisher, PublishException
+from util.monitor import WebsitePoller, diff_rows_by_name, diff_roster_batches, is_empty_diff, format_row_diff
+from util.state import load_state
+from util.stateformat import is_encoded_state
+from util.statistics import RosterStatistics, statistics_columns, format_statistics_report
+from util.duplicates import find_duplicates, format_duplicates_report
+from util.store import ResultsStore, StoreException, format_school_year
+from util.rollover import RolloverException, rollover_school_years, next_first_release, plan_rollover, \
+                          apply_rollover, format_rollover_summary, format_rollover_diff
+from util.csvimport import CsvImporter, CsvImportException, format_import_report
+from util.sorting import RowSorter
+from util.validation import PointValidator, format_point_problems
+from util.shards import SPLIT_MODES, DEFAULT_PAGE_SIZE, ShardException, export_sharded, format_export_result
+from util.helper import export_data_to_file
+from util.schema import HeaderSchema
+from util.memory import MemoryTracer, format_memory_report
+from ui.listview import DataModel
 
 
 
@@ -36,6 +57,8 @@ def prepare_app_launch(app, launch_mode, path=""):
     # file should be executed. The window is only displayed if this flag is True.
     did_load = False
 
+    app.memory_tracer.begin_load()
+
     # Try to load the last known application state.
     if launch_mode == LaunchMode.RESTORE:
         did_load = app.restoreApplicationState()
@@ -63,8 +86,8 @@ def prepare_app_launch(app, launch_mode, path=""):
     # Try to parse a specific user requested file.
     elif launch_mode == LaunchMode.FILE and path:
         try:
-            headers, users = parse_php_file(path)
-            app.setData(headers, users)
+            # Show the first students immediately and load the remaining students after the window is shown.
+            app.loadStream(stream_php_file(path))
             did_load = True
         except:
             app.showError("Corrupt file.", "Error parsing the file: {0}. Make sure the file is a "\
@@ -80,9 +103,298 @@ def prepare_app_launch(app, launch_mode, path=""):
             app.showError("Corrupt template file.", "Error parsing the template file. Make sure the file is a "\
                           "valid php file.")
 
+    if not did_load:
+        app.memory_tracer.abort_load()
     return did_load
 
 
+def determine_launch_mode(args, settings):
+    """
+    Determine how the app should be launched based on the command line arguments and the settings.
+    :param args: application startup arguments
+    :param settings: application settings
+    :return launch mode, path to the file to open for LaunchMode.FILE
+    """
+    if args.website:
+        return LaunchMode.WEBSITE, ""
+    elif args.restore_state:
+        return LaunchMode.RESTORE, ""
+    elif args.template:
+        return LaunchMode.TEMPLATE, ""
+    elif args.open_file:
+        return LaunchMode.FILE, args.open_file
+
+    # Choose the settings from the settings file.
+    return LaunchMode(settings.general.launch_mode), settings.general.file_path
+
+
+def load_headless_data(settings, launch_mode, path=""):
+    """
+    Load the data for a headless command without creating any windows. Errors are not handled, they should be reported
+    to the caller.
+    :param settings: application settings
+    :param launch_mode: See the LaunchMode enum
+    :param path: path to the file to open for LaunchMode.FILE
+    :return list of headings, list of all user data
+    """
+    if launch_mode == LaunchMode.RESTORE:
+        headers, users, _, _ = load_state(SAVED_APP_STATE_FILE, SAVED_APP_STATE_JOURNAL_FILE,
+                                          settings.general.state_generations)
+        return headers, users
+    elif launch_mode == LaunchMode.WEBSITE:
+        return parse_website_data(fetch_latest_data(settings.general.website_url))
+    elif launch_mode == LaunchMode.FILE and path:
+        return parse_php_file(path)
+    return parse_php_file(TEMPLATE_FILE)
+
+
+def run_website_monitor(settings, headers, users, interval):
+    """
+    Poll the website until the process is interrupted and print all changes compared to the last known data.
+    :param settings: application settings
+    :param headers: headers of the data selected by the launch options
+    :param users: data selected by the launch options
+    :param interval: minutes between two polls
+    :return exit code
+    """
+    name_field = settings.header.name_field
+    poller = WebsitePoller(settings.general.website_url)
+    try:
+        while True:
+            try:
+                result = poller.poll()
+            except Exception as e:
+                print("{0}  Poll failed: {1}".format(datetime.datetime.now().isoformat(" ", "seconds"), e),
+                      file=sys.stderr)
+                result = None
+
+            if result is not None and name_field in headers and name_field in result[0]:
+                new_headers, new_users = result
+                diff = diff_rows_by_name(headers, users, new_headers, new_users, headers.index(name_field),
+                                         new_headers.index(name_field))
+                if not is_empty_diff(diff):
+                    print(datetime.datetime.now().isoformat(" ", "seconds"))
+                    print(format_row_diff(diff, new_headers, new_headers.index(name_field)), flush=True)
+                headers, users = new_headers, new_users
+            time.sleep(interval * 60)
+    except KeyboardInterrupt:
+        return 0
+
+
+def stream_diff_source(settings, source):
+    """
+    Parse a roster for --diff. Php files and websites are parsed incrementally.
+    :param settings: application settings
+    :param source: "website" for the configured website, "state" for the saved application state, a url or the path to
+                   an exported php file or a saved state file
+    :return iterable which yields the headings and a list of user data for each batch
+    """
+    if source == "website":
+        source = settings.general.website_url
+    if source.startswith(("http://", "https://")):
+        text = fetch_latest_data(source).decode("utf-8", errors="replace")
+        return stream_table(text[i:i+STREAM_CHUNK_SIZE] for i in range(0, len(text), STREAM_CHUNK_SIZE))
+    if source == "state":
+        headers, users, _, _ = load_state(SAVED_APP_STATE_FILE, SAVED_APP_STATE_JOURNAL_FILE,
+                                          settings.general.state_generations)
+        return [(headers, users)]
+    with open(source, "rb") as f:
+        if is_encoded_state(f.read(8)):
+            headers, users, _, _ = load_state(source)
+            return [(headers, users)]
+    return stream_php_file(source)
+
+
+def run_roster_diff(settings, old_source, new_source):
+    """
+    Print all changes between two rosters.
+    :param settings: application settings
+    :param old_source: current roster (see stream_diff_source)
+    :param new_source: new roster
+    :return exit code: 0 if the rosters are equal, 1 if they differ and 2 if a roster could not be read
+    """
+    name_field = settings.header.name_field
+    try:
+        headers, diff = diff_roster_batches(stream_diff_source(settings, old_source),
+                                            stream_diff_source(settings, new_source), name_field)
+    except Exception as e:
+        print("Error reading the data: {0}".format(e), file=sys.stderr)
+        return 2
+    print(format_row_diff(diff, headers, headers.index(name_field)))
+    return 0 if is_empty_diff(diff) else 1
+
+
+def check_export_points(validator, user_data, force):
+    """
+    Validate the points of the data before it is exported and print the number of problems.
+    :param validator: PointValidator for the headers of the data
+    :param user_data: data for each student which is exported
+    :param force: True to export the data even if there are problems
+    :return True if the data may be exported
+    """
+    problems = validator.validate(user_data)
+    if not problems:
+        return True
+    if force:
+        print("Warning: {0} point cells are invalid, see --check-points.".format(len(problems)), file=sys.stderr)
+        return True
+    print("{0} point cells are invalid, see --check-points. Use --force-export to export the data "
+          "anyway.".format(len(problems)), file=sys.stderr)
+    return False
+
+
+def run_headless_command(args):
+    """
+    Run a command which does not require the user interface and print its result to stdout.
+    :param args: application startup arguments
+    :return exit code
+    """
+    settings = load_settings()
+
+    store = None
+    if args.query_student or args.query_top or args.store_save or (args.rollover and not args.dry_run):
+        if not settings.general.results_store:
+            print("No results store configured. Set a path in the preferences.", file=sys.stderr)
+            return 1
+        store = ResultsStore(settings.general.results_store)
+
+    school_year = args.school_year or format_school_year(current_school_year())
+
+    # Queries which only require the results store.
+    if args.query_student:
+        for row in store.student_results(args.query_student):
+            print("{0}  {1:>4}  {2:>5}  {3} ({4}, {5})".format(*row))
+    if args.query_top:
+        for rank, row in enumerate(store.top_students(school_year, args.query_top), 1):
+            print("{0:>3}. {1} ({2}, {3}): {4}".format(rank, *row))
+    if args.diff:
+        return run_roster_diff(settings, *args.diff)
+    if not (args.statistics or args.store_save or args.memory_report or args.find_duplicates or args.rollover or
+            args.publish or args.import_csv or args.monitor or args.export_pages or args.check_points):
+        return 0
+
+    tracer = MemoryTracer()
+    if args.memory_report:
+        tracer.start()
+
+    launch_mode, path = determine_launch_mode(args, settings)
+    headers, users = load_headless_data(settings, launch_mode, path)
+
+    schema = HeaderSchema(headers, settings.header)
+
+    # The points are validated before every export.
+    validator = PointValidator(schema, settings.general.max_points)
+    problems = []
+    if args.check_points:
+        problems = validator.validate(users)
+        print(format_point_problems(problems, headers, schema.name_index) if problems else "All points are valid.")
+
+    stats = None
+    if args.statistics:
+        name_idx, group_indices, value_indices = statistics_columns(schema)
+        stats = RosterStatistics(users, name_idx, group_indices, value_indices)
+        print(format_statistics_report(headers, stats))
+
+    if args.find_duplicates:
+        groups = find_duplicates(users, schema.name_index, schema.school_index, schema.grade_index)
+        print(format_duplicates_report(users, groups, schema.name_index, schema.school_index, schema.grade_index))
+
+    if args.memory_report:
+        # Build the same data model as the user interface without creating any windows.
+        model = DataModel(schema.name_index, users)
+        for i, h in enumerate(headers):
+            model.registerRole(h+"Role", i)
+        tracer.end_load()
+        structures = model.memoryStructures() + [("Header schema", schema), ("Statistics cache", stats)]
+        print(format_memory_report(structures, tracer))
+
+    if args.store_save:
+        try:
+            store.save_roster(school_year, users, schema)
+        except StoreException as e:
+            print(e, file=sys.stderr)
+            return 1
+
+    if args.publish:
+        general = settings.general
+        if not general.publish_url:
+            print("No publish target configured. Set the url in the preferences.", file=sys.stderr)
+            return 1
+        if not check_export_points(validator, users, args.force_export):
+            return 1
+        publisher = None
+        try:
+            publisher = Publisher(general.publish_url, PUBLISH_STATE_FILE, general.publish_verify_url or
+                                  general.website_url, general.publish_compressed)
+            result = publisher.publish(headers, users, force=args.force_publish)
+        except PublishException as e:
+            print(e, file=sys.stderr)
+            return 1
+        finally:
+            if publisher is not None:
+                publisher.close()
+        if result.uploaded:
+            print("Uploaded {0} bytes ({1}){2}.".format(result.size, result.content_hash,
+                                                       ", verified" if result.verified else ""))
+        else:
+            print("Unchanged since the last upload ({0}).".format(result.content_hash))
+
+    if args.rollover:
+        try:
+            plan = plan_rollover(users, schema, next_first_release(headers, schema.point_indices))
+        except RolloverException as e:
+            print(e, file=sys.stderr)
+            return 1
+        if args.dry_run:
+            print(format_rollover_diff(users, plan, schema))
+            return 0
+        # The school year is archived in the results store, which requires the school field as well.
+        if schema.school_index is None:
+            print("The name, sum, grade and school fields of the header settings must be part of the data.",
+                  file=sys.stderr)
+            return 1
+        # Only the point and sum cells are cleared, so the columns of the validator do not change.
+        new_users = apply_rollover(users, plan)
+        if not check_export_points(validator, new_users, args.force_export):
+            return 1
+        # Archive the school year before the data is changed.
+        archived_year = args.school_year or format_school_year(rollover_school_years()[0])
+        store.save_roster(archived_year, users, schema)
+        export_data_to_file(args.rollover, plan.headers, new_users)
+        print(format_rollover_summary(users, plan, schema))
+
+    if args.import_csv:
+        csv_path, output = args.import_csv
+        try:
+            importer = CsvImporter(csv_path, headers, schema)
+            for _, rows in importer.batches():
+                users.extend(rows)
+        except (CsvImportException, OSError) as e:
+            print(e, file=sys.stderr)
+            return 1
+        RowSorter([schema.name_index]).sort(users)
+        if not check_export_points(validator, users, args.force_export):
+            return 1
+        export_data_to_file(output, headers, users)
+        print(format_import_report(importer))
+
+    if args.export_pages:
+        if not check_export_points(validator, users, args.force_export):
+            return 1
+        try:
+            result = export_sharded(args.export_pages, headers, users, schema, args.split_by, args.page_size)
+        except (ShardException, OSError) as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(format_export_result(result))
+
+    # The monitor runs until the process is interrupted.
+    if args.monitor:
+        return run_website_monitor(settings, headers, users, args.monitor)
+
+    return 1 if args.check_points and problems else 0
+
+
 def present_startup_option_menu(app, args):
     """
     Interrupt the application startup to show different options. This function has no return value, but modifies the
@@ -125,12 +437,66 @@ if __name__ == "__main__":
                         " state.")
     parser.add_argument("-p", "--skip-splashscreen", action="store_true", help="Skip the application splash screen. "\
                         "You wont be able to show the start menu when the splashscreen is disabled.", default=None)
+    parser.add_argument("--statistics", action="store_true", help="Print statistics grouped by school and grade for "\
+                        "the data selected by the launch options and exit without showing the user interface.")
+    parser.add_argument("--store-save", action="store_true", help="Save the data selected by the launch options "\
+                        "as a school year in the results store and exit.")
+    parser.add_argument("--query-student", type=str, help="Print the results of a student across all school years "\
+                        "from the results store and exit.")
+    parser.add_argument("--query-top", type=str, metavar="GRADE", help="Print the top 20 students of a grade from the "\
+                        "results store and exit.")
+    parser.add_argument("--school-year", type=str, help="School year in the format 2018/2019 used for the results "\
+                        "store. Defaults to the current school year.")
+    parser.add_argument("--memory-report", action="store_true", help="Print the memory used by the data selected by "\
+                        "the launch options and the top allocation sites of the load and exit.")
+    parser.add_argument("--find-duplicates", action="store_true", help="Print the students of the data selected by "\
+                        "the launch options which were probably entered more than once and exit.")
+    parser.add_argument("--rollover", type=str, metavar="OUTPUT", help="Archive the data selected by the launch "\
+                        "options as a school year in the results store, prepare it for the next school year (clear "\
+                        "points and sums, promote grades, remove graduates) and write it to the php file OUTPUT.")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the changes of --rollover without "\
+                        "archiving or writing any data.")
+    parser.add_argument("--publish", action="store_true", help="Upload the data selected by the launch options to "\
+                        "the configured publish target if it changed since the last upload and exit.")
+    parser.add_argument("--force-publish", action="store_true", help="Upload the data with --publish even if it did "\
+                        "not change.")
+    parser.add_argument("--import-csv", type=str, nargs=2, metavar=("CSV", "OUTPUT"), help="Add the students of the "\
+                        "file CSV to the data selected by the launch options, write the result to the php file OUTPUT "\
+                        "and print the rejected rows.")
+    parser.add_argument("--monitor", type=int, metavar="MINUTES", help="Poll the website each MINUTES minutes and "\
+                        "print all changes compared to the data selected by the launch options until interrupted.")
+    parser.add_argument("--export-pages", type=str, metavar="OUTPUT", help="Export the data selected by the launch "\
+                        "options to multiple php files and the index page OUTPUT. Pages which did not change since "\
+                        "the last export are not written again.")
+    parser.add_argument("--split-by", choices=SPLIT_MODES, default="rows", help="Split the pages of --export-pages by "\
+                        "rows, grade or initial letter of the name (default: rows).")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Number of students on each page of "\
+                        "--export-pages --split-by rows (default: {0}).".format(DEFAULT_PAGE_SIZE))
+    parser.add_argument("--diff", type=str, nargs=2, metavar=("OLD", "NEW"), help="Print the added, removed and "\
+                        "changed students between two rosters and exit with status 1 if they differ. OLD and NEW are "\
+                        "php files, saved state files, urls, 'website' for the configured website or 'state' for the "\
+                        "saved application state.")
+    parser.add_argument("--check-points", action="store_true", help="Print all point and sum cells of the data "\
+                        "selected by the launch options which are not a number, too high or do not add up and exit "\
+                        "with status 1 if there are any.")
+    parser.add_argument("--force-export", action="store_true", help="Export the data with --publish, --rollover, "\
+                        "--import-csv or --export-pages even if some point or sum cells are invalid.")
+    parser.add_argument("--trace-memory", action="store_true", help="Trace all allocations to show the top allocation "\
+                        "sites of the last load in the memory usage window. This slows down the application.")
     args = parser.parse_args()
 
+    # Commands which run without the user interface.
+    if args.statistics or args.store_save or args.query_student or args.query_top or args.memory_report or \
+            args.find_duplicates or args.rollover or args.publish or args.import_csv or args.monitor or \
+            args.export_pages or args.diff or args.check_points:
+        sys.exit(run_headless_command(args))
 
     # Create the main application.
     app = MonoidApp(sys.argv)
 
+    if args.trace_memory:
+        app.memory_tracer.start()
+
     # Show a Splashscreen with a fake progressbar to allow interrupting the startup.
     if args.skip_splashscreen is None:
         args.skip_splashscreen = not app.settings.general.enable_splashscreen
@@ -142,22 +508,7 @@ if __name__ == "__main__":
         splash.animateFakeProgress()
 
     # Determine how the app should be launched.
-    path = ""
-    launch_mode = LaunchMode.WEBSITE
-
-    if args.website:
-        pass
-    elif args.restore_state:
-        launch_mode = LaunchMode.RESTORE
-    elif args.template:
-        launch_mode = LaunchMode.TEMPLATE
-    elif args.open_file:
-        launch_mode = LaunchMode.FILE
-        path = args.open_file
-    else:
-        # Choose the settings from the settings file.
-        launch_mode = LaunchMode(app.settings.general.launch_mode)
-        path = app.settings.general.file_path
+    launch_mode, path = determine_launch_mode(args, app.settings)
 
     # Delete the application state if requested.
     if args.delete_app_state:
@@ -175,6 +526,8 @@ if __name__ == "__main__":
             interval = args.save_app_state
 
         if interval > 0:
+            # Record every change in the journal and compact it regularly.
+            app.startStateJournal()
             timer = QTimer()
             timer.timeout.connect(app.saveApplicationState)
             timer.start(interval*1000)
@@ -189,7 +542,7 @@ if __name__ == "__main__":
         ret = app.exec_()
         # Save the application state when the app quits.
         if interval > 0:
-            app.saveApplicationState()
+            app.stopStateJournal()
 
         # Save application settings.
         app.saveSettings()
@@ -3,8 +3,15 @@ from .monoidsplashscreen import MonoidSplashScreen
 from .monoidaboutwindow import MonoidAboutWindow
 from .monoidmainwindow import MonoidMainWindow
 from .monoidpreferenceswindow import MonoidPreferencesWindow
+from .monoidstatisticswindow import MonoidStatisticsWindow
+from .monoidmemorywindow import MonoidMemoryWindow
+from .monoidduplicateswindow import MonoidDuplicatesWindow
+from .monoidtablewindow import MonoidTableWindow
+from .monoidproblemswindow import MonoidProblemsWindow
 from .optiondialog import OptionDialog
 from .listview import ListView, DataModel
 
 __all__ = ["MonoidApp", "MonoidSplashScreen", "OptionDialog", "ListView", "DataModel", "MonoidAboutWindow",
-           "MonoidMainWindow", "MonoidPreferencesWindow"]
+           "MonoidMainWindow", "MonoidPreferencesWindow", "MonoidStatisticsWindow",
+           "MonoidMemoryWindow", "MonoidDuplicatesWindow", "MonoidTableWindow",
+           "MonoidProblemsWindow"]
@@ -0,0 +1,64 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+# Number of changes within one run of the event loop after which derived data is computed again instead of being
+# updated for each change, e.g. after pasting a block of points.
+REBUILD_THRESHOLD = 1000
+
+
+class ChangeBatcher(QObject):
+    """
+    Count the changes of a data model within one run of the event loop. Windows which update derived data, e.g.
+    statistics, incrementally on each change stop doing so once a batch exceeds the threshold and compute everything
+    again instead.
+    """
+
+    # Emitted on the next run of the event loop after a batch which exceeded the threshold.
+    rebuildNeeded = pyqtSignal()
+
+    def __init__(self, threshold=REBUILD_THRESHOLD, parent=None):
+        """
+        :param threshold: number of changes within one run of the event loop after which the data is stale
+        :param parent: parent QObject
+        """
+        super(ChangeBatcher, self).__init__(parent)
+
+        self.threshold = threshold
+        # Number of changes since the event loop last ran and whether the derived data is computed again.
+        self._pending_changes = 0
+        self._stale = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.finishBatch)
+
+    def countChanges(self, count):
+        """
+        Count changes of the data until the event loop runs again.
+        :param count: number of changed values or rows
+        :return True if the derived data is computed again instead of being updated for each change
+        """
+        if not self._stale:
+            self._pending_changes += count
+            self._stale = self._pending_changes > self.threshold
+            self._timer.start(0)
+        return self._stale
+
+    def isStale(self):
+        """
+        :return True if the derived data must be computed again before it is used
+        """
+        return self._stale
+
+    def reset(self):
+        """
+        Mark the derived data as up to date after it was computed again.
+        """
+        self._stale = False
+
+    def finishBatch(self):
+        """
+        End the current batch and request a rebuild if it exceeded the threshold.
+        """
+        self._pending_changes = 0
+        if self._stale:
+            self.rebuildNeeded.emit()
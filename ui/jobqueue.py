@@ -0,0 +1,151 @@
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import Qt, QObject, pyqtSignal
+
+
+class JobCancelledException(Exception):
+    pass
+
+
+class Job(QObject):
+    """
+    A function which runs on the worker thread of a JobQueue. The function receives the job to report its progress,
+    which also stops the function once the job was cancelled. All signals are emitted on the GUI thread, so the result
+    can be applied to the models directly.
+    """
+
+    # Emitted with the number of processed students whenever the function reports its progress.
+    progress = pyqtSignal(int)
+    # Emitted with the return value of the function.
+    finished = pyqtSignal(object)
+    # Emitted with the exception raised by the function.
+    failed = pyqtSignal(object)
+    # Emitted if the job was cancelled. The result of a cancelled job is dropped, even if the function completed.
+    cancelled = pyqtSignal()
+
+    # Internal signal to pass the progress of the worker thread to the GUI thread.
+    _progressReported = pyqtSignal(int)
+
+    def __init__(self, title, parent=None):
+        """
+        :param title: description of the job shown to the user, e.g. "Exporting loeser.php"
+        :param parent: parent QObject
+        """
+        super(Job, self).__init__(parent)
+
+        self.title = title
+        self.count = 0
+        self._cancelled = threading.Event()
+        self._future = None
+
+        self._progressReported.connect(self._updateProgress)
+
+    def cancel(self):
+        """
+        Cancel the job. A queued job does not run at all, a running job stops at its next progress report.
+        """
+        self._cancelled.set()
+        if self._future is not None:
+            self._future.cancel()
+
+    def isCancelled(self):
+        """
+        :return True if the job was cancelled
+        """
+        return self._cancelled.is_set()
+
+    def reportProgress(self, count=0):
+        """
+        Called by the function on the worker thread.
+        :param count: number of processed students
+        :raise JobCancelledException if the job was cancelled
+        """
+        if self._cancelled.is_set():
+            raise JobCancelledException()
+        self._progressReported.emit(count)
+
+    def _updateProgress(self, count):
+        if not self._cancelled.is_set():
+            self.count = count
+            self.progress.emit(count)
+
+
+class JobQueue(QObject):
+    """
+    Run jobs one after another on a worker thread, e.g. parsing and writing large files, so the window stays responsive.
+    Jobs which are submitted while another job runs are queued.
+    """
+
+    # Emitted whenever a job was submitted or has ended.
+    jobsChanged = pyqtSignal()
+
+    # Internal signal to pass the job, its result and its exception from the worker thread to the GUI thread.
+    _jobEnded = pyqtSignal(object, object, object)
+
+    def __init__(self, parent=None):
+        """
+        :param parent: parent QObject
+        """
+        super(JobQueue, self).__init__(parent)
+
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._jobs = []
+        # Always queued, so the caller of submit can connect to the signals of the job before it ends.
+        self._jobEnded.connect(self._finishJob, Qt.QueuedConnection)
+
+    def jobs(self):
+        """
+        :return list of the running and all queued jobs in the order of execution
+        """
+        return list(self._jobs)
+
+    def submit(self, title, function, *args):
+        """
+        Add a job to the end of the queue.
+        :param title: description of the job shown to the user
+        :param function: function (job, *args) -> result which runs on the worker thread
+        :return Job
+        """
+        job = Job(title, self)
+        self._jobs.append(job)
+        job._future = self._executor.submit(function, job, *args)
+        job._future.add_done_callback(partial(self._jobDone, job))
+        self.jobsChanged.emit()
+        return job
+
+    def _jobDone(self, job, future):
+        # Called on the worker thread or, for a cancelled queued job, on the thread which cancelled it. The signal is
+        # queued to the thread of the queue.
+        if future.cancelled():
+            self._jobEnded.emit(job, None, JobCancelledException())
+        else:
+            error = future.exception()
+            self._jobEnded.emit(job, None if error is not None else future.result(), error)
+
+    def _finishJob(self, job, result, error):
+        if job not in self._jobs:
+            return
+        self._jobs.remove(job)
+        if job.isCancelled() or isinstance(error, JobCancelledException):
+            job.cancelled.emit()
+        elif error is not None:
+            job.failed.emit(error)
+        else:
+            job.finished.emit(result)
+        job.deleteLater()
+        self.jobsChanged.emit()
+
+    def cancelAll(self):
+        """
+        Cancel the running and all queued jobs.
+        """
+        for job in self.jobs():
+            job.cancel()
+
+    def shutdown(self):
+        """
+        Wait for the running and all queued jobs which were not cancelled and stop the worker thread.
+        """
+        self._executor.shutdown(wait=True)
@@ -1,8 +1,18 @@
 import bisect
 
-from PyQt5.QtCore import QAbstractListModel, Qt, QModelIndex, QVariant
+from PyQt5.QtCore import QAbstractListModel, Qt, QModelIndex, QByteArray, pyqtSignal
 from PyQt5.QtWidgets import QListView
 
+from util.interning import MIN_SAMPLE_ROWS, intern_rows, drop_distinct_columns
+from util.diff import diff_sorted_rows, contiguous_ranges
+from util.sorting import RowSorter
+
+from .searchmodel import SearchFilterModel
+
+
+# Number of rows the ListView lays out at once.
+LAYOUT_BATCH_SIZE = 1000
+
 
 class ModelNotInitializedException(Exception):
     pass
@@ -17,15 +27,36 @@ class DataModel(QAbstractListModel):
 
     AllRole = Qt.UserRole + 1
 
+    # Emitted with (row, column, old value, new value) whenever a value is changed by setData. The column is -1 if the
+    # whole entry was replaced.
+    valueChanged = pyqtSignal(int, int, object, object)
+    # Emitted with (row, new check state) whenever the check state of a row changes.
+    checkStateChanged = pyqtSignal(int, int)
+
     def __init__(self, display_index, data, parent=None):
         super(DataModel, self).__init__(parent)
 
         self.list_data = data
+        # Share equal values of each column between all rows. See intern_rows. Edited values are not interned, which
+        # keeps the dictionaries from growing with each typed value.
+        self.dictionaries = intern_rows(data)
+        # True once the columns with mostly distinct values were dropped from the dictionaries.
+        self._distinct_dropped = False
+        self._dropDistinctColumns(len(data))
         # Check state for each row
         self._checked_rows = [Qt.Unchecked] * len(data)
 
         # Index of the tuple item for QDisplayRole
         self._display_index = display_index
+        # Order of the entries, which is kept after each edit. The data must already be sorted by the displayed value.
+        self._sorter = RowSorter([display_index])
+
+        # Optional function to fetch more rows on demand. See setRowSource.
+        self._row_source = None
+        self._source_count = 0
+        self._fetch_size = 0
+        # True while rows of the row source are inserted. These rows are not a change of the data.
+        self._fetching = False
 
         self.resetRoles()
 
@@ -41,6 +72,64 @@ class DataModel(QAbstractListModel):
         """
         return len(self.list_data)
 
+    def setRowSource(self, source, count, fetch_size=500):
+        """
+        Load rows on demand instead of keeping all rows in memory from the beginning. The rows are appended to the
+        existing data whenever the view needs them.
+        :param source: function (offset, limit) -> list of entries
+        :param count: total number of rows provided by the source
+        :param fetch_size: number of rows to load at once
+        """
+        self._row_source = source
+        self._source_count = count
+        self._fetch_size = fetch_size
+
+    def canFetchMore(self, parent=QModelIndex()):
+        """
+        :return True if the row source provides more rows
+        """
+        return self._row_source is not None and len(self.list_data) < self._source_count
+
+    def fetchMore(self, parent=QModelIndex()):
+        """
+        Load the next rows from the row source.
+        """
+        if not self.canFetchMore(parent):
+            return
+
+        first = len(self.list_data)
+        rows = self._row_source(first, min(self._fetch_size, self._source_count - first))
+        if not rows:
+            # The source returned less rows than expected.
+            self._source_count = first
+            return
+
+        self.internRows(rows)
+        self._fetching = True
+        try:
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self.list_data.extend(rows)
+            self._checked_rows.extend([Qt.Unchecked] * len(rows))
+            self.endInsertRows()
+        finally:
+            self._fetching = False
+
+    def isFetching(self):
+        """
+        :return True while rows of the row source are inserted, e.g. to ignore them when recording the changes
+        """
+        return self._fetching
+
+    def snapshotData(self):
+        """
+        :return all entries including the entries the row source did not provide yet. The missing entries are read
+                from the row source without loading them into the model.
+        """
+        if not self.canFetchMore():
+            return self.list_data
+        first = len(self.list_data)
+        return self.list_data + self._row_source(first, self._source_count - first)
+
     def data(self, index, role=Qt.DisplayRole):
         """
         Read a specific data entry.
@@ -50,19 +139,18 @@ class DataModel(QAbstractListModel):
         try:
             entry = self.list_data[index.row()]
         except IndexError:
-            return QVariant()
+            return None
 
-        if role == Qt.DisplayRole:
-            return entry[self._display_index]
-        elif role == DataModel.AllRole:
-            return entry
+        # The view asks for several roles of each visible row on each paint. Resolve the column with a single lookup
+        # and answer all other roles, e.g. the font or the colors, without further checks.
+        column = self._role_columns.get(role)
+        if column is not None:
+            return entry[column]
         elif role == Qt.CheckStateRole:
             return self._checked_rows[index.row()]
-        elif role in self._roles:
-            idx = self._role_indices[role]
-            return entry[idx]
-
-        return QVariant()
+        elif role == DataModel.AllRole:
+            return entry
+        return None
 
     def setData(self, index, value, role=Qt.DisplayRole):
         """
@@ -71,35 +159,301 @@ class DataModel(QAbstractListModel):
         :param index: index (row) of the data to change
         :param role: specific role which should be changed (there is a role for each header)
         """
-        entry = self.list_data[index.row()]
-
-        if role == Qt.DisplayRole:
-            entry[self._display_index] = value
-        elif role == DataModel.AllRole:
-            entry = value
-        elif role == Qt.CheckStateRole:
-            self._checked_rows[index.row()] = value
-        elif role in self._roles:
-            idx = self._role_indices[role]
-            entry[idx] = value
-        else:
-            return super(DataModel, self).setData(index, value, role)
+        row = index.row()
+        entry = self.list_data[row]
+
+        column = self._role_columns.get(role)
+        if column is None:
+            if role == DataModel.AllRole:
+                column = -1
+            elif role == Qt.CheckStateRole:
+                old_state = self._checked_rows[row]
+                self._checked_rows[row] = value
+                if old_state != value:
+                    self.checkStateChanged.emit(row, value)
+            else:
+                return super(DataModel, self).setData(index, value, role)
+
+        # Store the new value and inform all observers about the change.
+        if column == -1:
+            self.list_data[row] = value
+            self.valueChanged.emit(row, column, entry, value)
+        elif column is not None:
+            old_value = entry[column]
+            entry[column] = value
+            if old_value != value:
+                self.valueChanged.emit(row, column, old_value, value)
 
         # update UI
         self.dataChanged.emit(index, index)
+
+        # Keep the entries sorted if a value of a sort column changed.
+        if column is not None and (column == -1 or column in self._sorter.column_set):
+            self.moveSortedRow(row)
         return True
 
+    def setValues(self, changes):
+        """
+        Change multiple values with a single dataChanged notification. valueChanged is still emitted for each changed
+        value. Afterwards a single changed entry is moved to its sorted position, multiple entries are sorted again
+        with a single layout change.
+        :param changes: list of (row, column, value) tuples, column -1 replaces the whole entry
+        """
+        if not changes:
+            return
+
+        resort = []
+        for row, column, value in changes:
+            entry = self.list_data[row]
+            if column == -1:
+                self.list_data[row] = value
+                self.valueChanged.emit(row, column, entry, value)
+            else:
+                old_value = entry[column]
+                entry[column] = value
+                if old_value == value:
+                    continue
+                self.valueChanged.emit(row, column, old_value, value)
+            if column == -1 or column in self._sorter.column_set:
+                resort.append(row)
+
+        rows = [change[0] for change in changes]
+        self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)))
+
+        if len(resort) == 1:
+            self.moveSortedRow(resort[0])
+        elif resort:
+            self.sortRows()
+
+    def checkState(self, row):
+        """
+        :param row: row of an entry
+        :return check state of the entry
+        """
+        return self._checked_rows[row]
+
+    def setCheckStates(self, changes):
+        """
+        Change the check state of multiple rows with a single dataChanged notification.
+        :param changes: list of (row, state) tuples
+        """
+        if not changes:
+            return
+
+        for row, state in changes:
+            if self._checked_rows[row] != state:
+                self._checked_rows[row] = state
+                self.checkStateChanged.emit(row, state)
+
+        rows = [change[0] for change in changes]
+        self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)), [Qt.CheckStateRole])
+
     def insertData(self, row, value):
         """
         Insert a new data entry at a given index.
         :param row: row to insert the data at
         :param value: new value to isert
         """
+        self.internRows([value])
         self.beginInsertRows(QModelIndex(), row, row)
         self.list_data.insert(row, value)
         self._checked_rows.insert(row, False)
         self.endInsertRows()
 
+    def insertDataRange(self, row, rows):
+        """
+        Insert multiple data entries at a given index with a single notification.
+        :param row: row to insert the first entry at
+        :param rows: list of new entries
+        """
+        if not rows:
+            return
+        self.internRows(rows)
+        self.beginInsertRows(QModelIndex(), row, row + len(rows) - 1)
+        self.list_data[row:row] = rows
+        self._checked_rows[row:row] = [Qt.Unchecked] * len(rows)
+        self.endInsertRows()
+
+    def insertSortedRows(self, rows, key, keys=None):
+        """
+        Insert multiple entries in sorted order. Consecutive entries which belong to the same position are inserted
+        with a single ranged notification, e.g. entries which all belong behind the existing entries are a single
+        append.
+        :param rows: list of new entries in any order
+        :param key: function which returns the sort key of an entry
+        :param keys: sorted list with the key of each existing entry, which is updated in place. Callers which insert
+                     repeatedly can keep this list to avoid computing the keys of all existing entries again.
+        """
+        if keys is None:
+            keys = [key(e) for e in self.list_data]
+
+        rows = sorted(rows, key=key)
+        new_keys = [key(e) for e in rows]
+        positions = [bisect.bisect_right(keys, k) for k in new_keys]
+
+        # Insert the runs from back to front so that the positions of the earlier runs stay valid.
+        end = len(rows)
+        while end > 0:
+            pos = positions[end-1]
+            start = bisect.bisect_left(positions, pos, 0, end)
+            keys[pos:pos] = new_keys[start:end]
+            self.insertDataRange(pos, rows[start:end])
+            end = start
+
+    def moveData(self, row, to):
+        """
+        Move a single entry to another row. The entry keeps its check state.
+        :param row: current row of the entry
+        :param to: new row of the entry
+        """
+        if row == to:
+            return
+        # Qt expects the row in front of which the entry is moved.
+        self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), to + 1 if to > row else to)
+        self.list_data.insert(to, self.list_data.pop(row))
+        self._checked_rows.insert(to, self._checked_rows.pop(row))
+        self.endMoveRows()
+
+    def sorter(self):
+        """
+        :return RowSorter which defines the order of the entries
+        """
+        return self._sorter
+
+    def setSorter(self, sorter):
+        """
+        Change the order of the entries. All entries are sorted again with a single layout change.
+        :param sorter: new RowSorter
+        """
+        self._sorter = sorter
+        self.sortRows()
+
+    def sortRows(self):
+        """
+        Sort all entries with the current sorter. Persistent indices, e.g. the selection, and the check states move
+        with their entries.
+        """
+        order = self._sorter.order(self.list_data)
+        if all(old == new for new, old in enumerate(order)):
+            return
+
+        self.layoutAboutToBeChanged.emit()
+        new_rows = [0] * len(order)
+        for new, old in enumerate(order):
+            new_rows[old] = new
+        # Keep the list objects, they are shared with the ListView.
+        self.list_data[:] = [self.list_data[i] for i in order]
+        self._checked_rows[:] = [self._checked_rows[i] for i in order]
+
+        old_indices = self.persistentIndexList()
+        self.changePersistentIndexList(old_indices, [self.index(new_rows[i.row()]) for i in old_indices])
+        self.layoutChanged.emit()
+
+    def moveSortedRow(self, row):
+        """
+        Move an entry to its sorted position after its sort key changed. Only the keys of the neighbours and of a
+        binary search are compared, the remaining entries must already be sorted.
+        :param row: row of the changed entry
+        :return new row of the entry
+        """
+        data = self.list_data
+        entry = data[row]
+        key = self._sorter.key
+        entry_key = key(entry)
+
+        if row > 0 and entry_key < key(data[row-1]):
+            to = self._sorter.insert_position(data, entry, 0, row)
+        elif row + 1 < len(data) and key(data[row+1]) < entry_key:
+            # The entry is removed in front of the insert position.
+            to = self._sorter.insert_position(data, entry, row+1) - 1
+        else:
+            return row
+
+        self.moveData(row, to)
+        return to
+
+    def removeDataRange(self, row, count):
+        """
+        Remove multiple consecutive entries with a single notification.
+        :param row: first row to remove
+        :param count: number of rows to remove
+        """
+        if count <= 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        del self.list_data[row:row+count]
+        del self._checked_rows[row:row+count]
+        self.endRemoveRows()
+
+    def removeDataRows(self, rows):
+        """
+        Remove a set of entries. Each contiguous range of rows is removed with a single notification.
+        :param rows: iterable with the row numbers to remove
+        """
+        for first, last in reversed(contiguous_ranges(rows)):
+            self.removeDataRange(first, last - first + 1)
+
+    def applyDiff(self, opcodes, new_rows):
+        """
+        Transform the entries into new_rows with ranged notifications. Replaced entries keep their check state.
+        :param opcodes: list of (tag, i1, i2, j1, j2) tuples from the current entries to new_rows
+                        (see diff_sorted_rows or difflib.SequenceMatcher.get_opcodes)
+        :param new_rows: new entries
+        """
+        # Apply the operations from back to front so that the row numbers of the earlier operations stay valid.
+        for tag, i1, i2, j1, j2 in reversed(opcodes):
+            if tag == "equal":
+                continue
+            if tag == "replace" and i2 - i1 == j2 - j1:
+                self.replaceDataRange(i1, new_rows[j1:j2])
+                continue
+            if tag in ("delete", "replace"):
+                self.removeDataRange(i1, i2 - i1)
+            if tag in ("insert", "replace"):
+                self.insertDataRange(i1, new_rows[j1:j2])
+
+    def replaceDataRange(self, row, rows):
+        """
+        Replace consecutive entries in place with a single dataChanged notification.
+        :param row: first row to replace
+        :param rows: list of new entries
+        """
+        if not rows:
+            return
+        self.internRows(rows)
+        for i, entry in enumerate(rows, row):
+            old_entry = self.list_data[i]
+            self.list_data[i] = entry
+            if old_entry != entry:
+                self.valueChanged.emit(i, -1, old_entry, entry)
+        self.dataChanged.emit(self.index(row), self.index(row + len(rows) - 1))
+
+    def replaceData(self, new_rows, key):
+        """
+        Replace all entries without resetting the model. Unchanged entries keep their check state and the selection.
+        :param new_rows: new entries sorted by key
+        :param key: function which returns the sort key of an entry, the current entries must be sorted by this key
+        """
+        self.applyDiff(diff_sorted_rows(self.list_data, new_rows, key), new_rows)
+
+    def internRows(self, rows):
+        """
+        Share the values of new rows with the existing rows. The rows are modified in place.
+        :param rows: list of new rows
+        """
+        if not rows:
+            return
+        # The model might have been created without any data.
+        self.dictionaries = intern_rows(rows, self.dictionaries or None)
+        self._dropDistinctColumns(len(self.list_data) + len(rows))
+
+    def _dropDistinctColumns(self, row_count):
+        # Columns with mostly distinct values are detected once, as soon as there are enough rows to tell. Until then
+        # all columns are interned.
+        if not self._distinct_dropped and row_count >= MIN_SAMPLE_ROWS:
+            self.dictionaries = drop_distinct_columns(self.dictionaries, row_count)
+            self._distinct_dropped = True
+
     def removeData(self, row):
         """
         Remove data entry at a specific row.
@@ -121,7 +475,7 @@ class DataModel(QAbstractListModel):
         role = Qt.UserRole + self._last_role_idx
 
         self._roles[role] = name
-        self._role_indices[role] = data_index
+        self._role_columns[role] = data_index
 
         return role
 
@@ -130,14 +484,28 @@ class DataModel(QAbstractListModel):
         Delete all registered roles.
         """
         self._roles = {DataModel.AllRole: "all"}
-        self._role_indices = {}
+        # Column of each role which reads a single value of an entry: the displayed value and one role per header.
+        self._role_columns = {Qt.DisplayRole: self._display_index}
         self._last_role_idx = 1
 
     def roleNames(self):
         """
-        :return a list with all role names
+        :return a dictionary with the name of each role. Qt requires the names as QByteArray, e.g. when the roles are
+                read through a proxy model.
+        """
+        names = super(DataModel, self).roleNames()
+        names.update({role: QByteArray(name.encode("utf-8")) for role, name in self._roles.items()})
+        return names
+
+    def memoryStructures(self):
+        """
+        :return list of (name, object) tuples with all data structures of the model for a memory report
         """
-        return self._roles
+        return [("DataModel.list_data", self.list_data),
+                ("DataModel._checked_rows", self._checked_rows),
+                ("DataModel role maps", (self._roles, self._role_columns)),
+                ("DataModel column dictionaries", self.dictionaries),
+                ("DataModel sort key caches", self._sorter)]
 
 
 class ListView(QListView):
@@ -174,11 +542,24 @@ class ListView(QListView):
     Calling: setData(1, G_R_A_D_E_3, header="Grade") -> [(name1, grade1, ...), (name2, G_R_A_D_E_3, ...), ...]
     """
 
+    # Emitted with the new headers whenever the headers change.
+    headersChanged = pyqtSignal(list)
+
     def __init__(self, headers=None, data=None, display_index=0, parent=None):
         super(ListView, self).__init__(parent)
 
         self._selection_callback = None
         self._data = []
+        # Each row shows a single line of text. Uniform sizes allow filtering large lists without measuring each row.
+        self.setUniformItemSizes(True)
+        # Lay out large lists in batches while the event loop runs, so that new data is shown right away.
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(LAYOUT_BATCH_SIZE)
+
+        # Filters the entries of the model by a search text. See setSearchText.
+        self._filter_model = None
+        # Columns which are searched by setSearchText.
+        self._search_columns = ()
 
         if headers and data:
             self.updateData(headers, data, display_index)
@@ -186,6 +567,83 @@ class ListView(QListView):
         # connect each header to a specific role
         self._header_roles = {}
 
+    def model(self):
+        """
+        :return the DataModel with all entries. While a search text is set the view shows the SearchFilterModel instead.
+        """
+        model = super(ListView, self).model()
+        return model.sourceModel() if isinstance(model, SearchFilterModel) else model
+
+    def filterModel(self):
+        """
+        :return the SearchFilterModel of the current DataModel or None if no data was set
+        """
+        return self._filter_model
+
+    def _showModel(self):
+        """
+        Show the DataModel or the SearchFilterModel inside the view. Without a search text the view shows the DataModel
+        directly, so that large lists do not pay for mapping each row through the proxy model.
+        """
+        model = self._filter_model if self._filter_model.isFiltered() else self._filter_model.sourceModel()
+        if super(ListView, self).model() is model:
+            return
+        self.setModel(model)
+        if self.selectionModel() and self.selectionCallback():
+            self.selectionModel().selectionChanged.connect(self.selectionCallback())
+
+    def _mapFromSource(self, index):
+        """
+        :return the index of the view for an index of the DataModel
+        """
+        if super(ListView, self).model() is self._filter_model:
+            return self._filter_model.mapFromSource(index)
+        return index
+
+    def _mapToSource(self, index):
+        """
+        :return the index of the DataModel for an index of the view
+        """
+        if super(ListView, self).model() is self._filter_model:
+            return self._filter_model.mapToSource(index)
+        return index
+
+    def setSearchColumns(self, columns):
+        """
+        Change the columns which are searched by setSearchText.
+        :param columns: indices of the columns to search
+        """
+        self._search_columns = tuple(columns)
+        if self._filter_model is not None:
+            self._filter_model.setSearchColumns(self._search_columns)
+            self._showModel()
+
+    def searchText(self):
+        """
+        :return the current search text
+        """
+        return self.filterModel().searchText() if self.filterModel() is not None else ""
+
+    def setSearchText(self, text):
+        """
+        Only show the entries which contain a word starting with each word of the search text. The current entry
+        stays selected if it matches, otherwise the first matching entry is selected.
+        :param text: search text (an empty text shows all entries)
+        """
+        proxy = self._filter_model
+        if proxy is None:
+            return
+
+        row = self.currentRow()
+        proxy.setSearchText(text)
+        self._showModel()
+
+        index = self._mapFromSource(self.model().index(row))
+        if not index.isValid():
+            index = super(ListView, self).model().index(0, 0)
+        if index.isValid():
+            self.setCurrentIndex(index)
+
     def selectionCallback(self):
         """
         Callback function for selection change.
@@ -204,25 +662,38 @@ class ListView(QListView):
 
     def addDataInOrder(self, value):
         """
-        Add a new entry with a given value for the QDisplayRole in alphabetical order
+        Add a new entry with a given value for the QDisplayRole in the current sort order (see setSortOrder).
         :param value: new value for QDisplayRole
         """
         model = self.model()
 
-        # Insert the new user in the sidebar in alphabetical order.
-        names = [d[model._display_index].lower() for d in self._data]
-        row = bisect.bisect(names, value.lower())
+        # Show the new user even if it does not match the current search text.
+        if self.searchText():
+            self.setSearchText("")
 
         # New information about the user.
         user_info = ["-"]*len(self._headers)
         user_info[model._display_index] = value
 
+        # Insert the new user in the sidebar in sorted order.
+        row = model.sorter().insert_position(model.list_data, user_info)
+
         # Add new Information to the model.
         model.insertData(row, user_info)
 
         # Select the new user.
         self.setCurrentRow(row)
 
+    def setRowSource(self, source, count):
+        """
+        Load the data on demand from a row source. The first rows are loaded immediately.
+        :param source: function (offset, limit) -> list of entries
+        :param count: total number of rows provided by the source
+        """
+        model = self.model()
+        model.setRowSource(source, count)
+        model.fetchMore()
+
     def removeSelectedData(self):
         """
         Remove the currently selected data from the list.
@@ -266,17 +737,78 @@ class ListView(QListView):
             role = self._header_roles[header]
         return model.data(index, role)
 
-    def updateData(self, headers, data, display_index):
+    def sortKey(self):
+        """
+        :return function which returns the sort key of an entry in the current sort order
+        """
+        return self.model().sorter().key
+
+    def sortOrder(self):
+        """
+        :return tuple of SortColumn instances, the most significant column first
+        """
+        return self.model().sorter().columns
+
+    def setSortOrder(self, columns=None):
+        """
+        Sort the entries by one or more columns. Edited and new entries are moved to their sorted position. New data
+        (see updateData) is sorted by the displayed value again.
+        :param columns: list of SortColumn instances or column indices, the most significant column first (None to
+                        sort by the displayed value)
+        """
+        model = self.model()
+        sorter = RowSorter(columns or [model._display_index])
+        if sorter != model.sorter():
+            model.setSorter(sorter)
+
+    def insertDataInOrder(self, rows):
+        """
+        Insert multiple entries in the current sort order. See DataModel.insertSortedRows.
+        :param rows: list of new entries
+        """
+        self.model().insertSortedRows(rows, self.sortKey())
+
+    def removeDataRows(self, rows):
+        """
+        Remove multiple entries. See DataModel.removeDataRows.
+        :param rows: iterable with the row numbers to remove
+        """
+        self.model().removeDataRows(rows)
+
+    def updateData(self, headers, data, display_index, replace=False):
         """
         Call this methode if the data changes.
         :param headers: new header values
         :param data: new data
         :param display_index: index inside the data tuple to display
+        :param replace: True to replace the entries of the current model with ranged notifications instead of
+                        creating a new model. The selection, the sort order and the check state of unchanged entries
+                        are kept. Otherwise the data must be sorted by the displayed value.
         """
+        model = self.model()
+        if replace and isinstance(model, DataModel) and model._display_index == display_index:
+            # Bring the data into the current order. This is a linear pass if the data is already sorted.
+            data = list(data)
+            model.sorter().sort(data)
+            model.replaceData(data, self.sortKey())
+            self._data = model.list_data
+            if headers != self._headers:
+                self.updateHeaders(headers)
+            return
+
         self._data = data
 
         model = DataModel(display_index, data)
-        self.setModel(model)
+
+        # Keep the current search text for the new data.
+        text = self.searchText()
+        if self._filter_model is not None:
+            self._filter_model.deleteLater()
+        self._filter_model = SearchFilterModel(model, self)
+        self._filter_model.setSearchColumns(self._search_columns)
+        self._filter_model.setSearchText(text)
+
+        self.setModel(self._filter_model if self._filter_model.isFiltered() else model)
 
         self.updateHeaders(headers)
 
@@ -298,18 +830,51 @@ class ListView(QListView):
         for i, h in enumerate(headers):
             self._header_roles[h] = self.model().registerRole(h+"Role", i)
 
+        self.headersChanged.emit(headers)
+
+    def memoryStructures(self):
+        """
+        :return list of (name, object) tuples with all data structures of the view and its model for a memory report
+        """
+        model = self.model()
+        structures = model.memoryStructures() if isinstance(model, DataModel) else []
+        return structures + [("ListView header roles", self._header_roles)]
+
+    def hasHeaders(self):
+        """
+        :return True if headers were set with updateData.
+        """
+        return isinstance(self.model(), DataModel)
+
     def allHeaders(self):
         """
         :return a list of all headers
         """
         return self._headers
 
+    def fetchAll(self):
+        """
+        Load all remaining rows from the row source of the model.
+        """
+        model = self.model()
+        while model is not None and model.canFetchMore():
+            model.fetchMore()
+
     def allData(self):
         """
         :return a list of all the data in the format: [(a1, b1, ...), (a2, b2, ...), ...]
         """
+        self.fetchAll()
         return self._data
 
+    def snapshotData(self):
+        """
+        :return a list of all the data like allData, but without loading the remaining rows of the row source into the
+                model
+        """
+        model = self.model()
+        return model.snapshotData() if model is not None else self._data
+
     def selectedData(self):
         """
         :return a list with all selected data entries in the format: [(a1, b1, ...), (a2, b2, ...), ...]
@@ -330,8 +895,8 @@ class ListView(QListView):
         """
         if self.hasData():
             model = self.model()
-            index = model.index(row)
-            if index:
+            index = self._mapFromSource(model.index(row))
+            if index.isValid():
                 self.setCurrentIndex(index)
 
     def currentRow(self):
@@ -339,7 +904,9 @@ class ListView(QListView):
         :return the index of the currently selected row or -1 if none is selected
         """
         index = self.currentIndex()
-        return index.row() if index else -1
+        if not index.isValid():
+            return -1
+        return self._mapToSource(index).row()
 
     def checkedRows(self):
         """
@@ -1,24 +1,56 @@
 import os
 import sys
-import pickle
 from webbrowser import open_new_tab
+from functools import partial
 from collections import namedtuple
 
-from PyQt5.QtCore import QFileInfo, QCoreApplication
+from PyQt5.QtCore import Qt, QFileInfo, QCoreApplication, QTimer, pyqtSignal
+from PyQt5.QtGui import QKeySequence
 from PyQt5.QtWidgets import QApplication, QMessageBox, QAction, QFileDialog, QInputDialog
 
-from util import DEFAULT_FILE, SAVED_APP_STATE_FILE
+from util import DEFAULT_FILE, SAVED_APP_STATE_FILE, SAVED_APP_STATE_JOURNAL_FILE
+from util.config import PUBLISH_STATE_FILE
 from util.helper import export_data_to_file
-from util.parser import parse_php_file
+from util.parser import parse_php_file, current_school_year
+from util.store import ResultsStore, format_school_year
+from util.schema import HeaderSchema, SchemaException
 from util.config import load_settings, save_settings
+from util.publish import Publisher, PublishException
+from util.monitor import diff_rows_by_name, is_empty_diff, format_row_diff
+from util.journal import StateJournal
+from util.state import StateWriter, load_state, generation_path
+from util.memory import MemoryTracer
+from util.sorting import RowSorter
+from util.csvimport import CsvImporter, CsvImportException, format_import_report
+from util.validation import format_point_problems
+from util.shards import SPLIT_MODES, DEFAULT_PAGE_SIZE, export_sharded, format_export_result
+from util.rollover import RolloverException, rollover_school_years, release_headers, next_first_release, \
+                          plan_rollover, format_rollover_summary, format_rollover_diff
 
 from .monoidmainwindow import MonoidMainWindow
 from .monoidaboutwindow import MonoidAboutWindow
 from .monoidpreferenceswindow import MonoidPreferencesWindow
+from .monoidstatisticswindow import MonoidStatisticsWindow
+from .monoidmemorywindow import MonoidMemoryWindow
+from .monoidduplicateswindow import MonoidDuplicatesWindow
+from .monoidtablewindow import MonoidTableWindow
+from .monoidproblemswindow import MonoidProblemsWindow
+from .streamloader import StreamLoader
+from .jobqueue import JobQueue
+from .undohistory import UndoHistory
+from .websitemonitor import WebsiteMonitor
 
 
 class MonoidApp(QApplication):
 
+    # Emitted with the new HeaderSchema (or None if the headers do not match the header settings) whenever the headers
+    # or the header settings change.
+    schemaChanged = pyqtSignal(object)
+
+    # Interval in milliseconds in which the journal records of the last edits are synced to the disc. At most the edits
+    # of this interval are lost if the application crashes.
+    JOURNAL_SYNC_INTERVAL = 1000
+
     @staticmethod
     def applicationName():
         return QFileInfo(QCoreApplication.applicationFilePath()).fileName()
@@ -48,6 +80,9 @@ class MonoidApp(QApplication):
         # Load the main application settings.
         self.settings = load_settings()
 
+        # Column indices of the special header fields for the current headers.
+        self.schema = None
+
         # Create the about window.
         self.about_win = MonoidAboutWindow(self)
 
@@ -57,9 +92,75 @@ class MonoidApp(QApplication):
         # Create a main window.
         self.win = MonoidMainWindow(self)
 
+        # Create the statistics window.
+        self.stats_win = MonoidStatisticsWindow(self)
+
+        # Records the allocation sites of the last load if allocation tracing was started.
+        self.memory_tracer = MemoryTracer()
+
+        # Create the memory usage window.
+        self.memory_win = MonoidMemoryWindow(self)
+
+        # Create the window to find and merge duplicate students.
+        self.duplicates_win = MonoidDuplicatesWindow(self)
+
+        # Create the window to edit all columns in a table.
+        self.table_win = MonoidTableWindow(self)
+
+        # Create the window with all invalid points. It keeps the problems up to date to validate each export.
+        self.problems_win = MonoidProblemsWindow(self)
+
+        # Undo and redo all changes of the loaded data.
+        self.undo_history = UndoHistory(self.win.user_list, self.settings.general.undo_memory * 1024 * 1024, self)
+
+        # Loads the remaining rows of a streamed file while the event loop runs. See loadStream.
+        self.stream_loader = None
+        # Reads the rows of a CSV file while it is imported by the stream loader. See importCsv.
+        self.csv_importer = None
+
+        # Parses opened files and writes exports on a worker thread. See openFile and exportFile.
+        self.jobs = JobQueue(self)
+        self.jobs.jobsChanged.connect(self.showJobStatus)
+        # Job which parses the file that is opened.
+        self.open_job = None
+        # Exports which were already started are finished before quitting.
+        self.aboutToQuit.connect(self.cancelOpenFile)
+        self.aboutToQuit.connect(self.jobs.shutdown)
+
+        # Optional database with the results of all school years. It is opened on first use.
+        self.results_store = None
+
+        # Uploads the php file to the server and keeps its connections open. It is created on first use.
+        self.publisher = None
+
+        # Polls the website in the background and offers to apply its changes.
+        self.website_monitor = WebsiteMonitor(self.settings.general.website_url, self.settings.general.monitor_interval,
+                                              self)
+        self.website_monitor.pageChanged.connect(self.websiteChanged)
+        self.website_monitor.pollFailed.connect(self.websitePollFailed)
+        self.aboutToQuit.connect(self.website_monitor.shutdown)
+        # Headers and user data of the last changed website.
+        self._website_data = None
+
+        # Journal of all model mutations since the last saved application state. The journal is only written after
+        # startStateJournal was called.
+        self.journal = StateJournal(SAVED_APP_STATE_JOURNAL_FILE)
+        self._journal_seq = 0
+        # Writes the snapshots of the application state on a background thread.
+        self.state_writer = StateWriter(SAVED_APP_STATE_FILE, self.journal, self.settings.general.state_generations)
+        # Sync the journal records of the last edits to the disc on the thread of the state writer.
+        self._journal_timer = QTimer(self)
+        self._journal_timer.setInterval(self.JOURNAL_SYNC_INTERVAL)
+        self._journal_timer.timeout.connect(self.state_writer.sync_journal)
+        self.win.user_list.headersChanged.connect(self.journalHeadersChanged)
+        self.win.user_list.headersChanged.connect(self.updateSchema)
+
         # Setup menu items.
         self.createMenubar()
 
+        # Keep the header schema up to date when the preferences change.
+        self.settings.subscribe(self.settingsChanged)
+
     def saveSettings(self):
         """
         Save the current settings to a file.
@@ -72,8 +173,470 @@ class MonoidApp(QApplication):
         :param headers: header information
         :param users: user information
         """
+        # Validate the headers before changing anything. This raises a SchemaException for invalid headers.
+        schema = HeaderSchema(headers, self.settings.header)
+
+        # Stop loading the rows of a previous file.
+        self.cancelStreamLoad()
+        self.schema = schema
+
         self.win.populate(headers, users)
 
+        model = self.win.user_list.model()
+        self.stats_win.setSourceModel(model)
+        self.table_win.setSourceModel(model)
+        self.problems_win.setSourceModel(model)
+        # Changes of the previous data can not be undone anymore.
+        self.undo_history.setModel(model)
+
+        # Record all future changes in the journal.
+        model.valueChanged.connect(self.journalValueChanged)
+        model.checkStateChanged.connect(self.journalCheckStateChanged)
+        model.rowsInserted.connect(self.journalRowsInserted)
+        model.rowsAboutToBeRemoved.connect(self.journalRowsAboutToBeRemoved)
+        model.rowsMoved.connect(self.journalRowsMoved)
+        model.layoutChanged.connect(self.journalLayoutChanged)
+
+        # The journal can not describe replacing all data. Start with a new snapshot instead.
+        if self.journal.is_open():
+            self.compactApplicationState(wait=True)
+
+        self.schemaChanged.emit(self.schema)
+
+        self.memory_tracer.end_load()
+
+    def updateSchema(self, headers=None, force=False):
+        """
+        Resolve the header schema again and inform all observers.
+        :param headers: new headers (None to use the current headers)
+        :param force: True to update the schema even if the headers did not change
+        """
+        if headers is None:
+            headers = self.win.user_list.allHeaders()
+        if not force and self.schema is not None and self.schema.headers == tuple(headers):
+            return
+
+        try:
+            self.schema = HeaderSchema(headers, self.settings.header)
+        except SchemaException:
+            self.schema = None
+        self.schemaChanged.emit(self.schema)
+
+    def settingsChanged(self, section, key, value):
+        """
+        Called whenever a setting changes.
+        :param section: section of the changed setting
+        :param key: name of the changed setting
+        :param value: new value
+        """
+        if section == "header" and self.win.user_list.hasHeaders():
+            self.updateSchema(force=True)
+        elif section == "general" and key == "undo_memory":
+            self.undo_history.max_memory = value * 1024 * 1024
+        elif section == "general" and key == "monitor_interval":
+            self.website_monitor.setInterval(value)
+        elif section == "general" and key == "max_points":
+            self.problems_win.rebuildProblems()
+        elif section == "general" and key in ("publish_url", "publish_verify_url", "publish_compressed", "website_url"):
+            # Connect to the new target on the next publish. A running upload still uses the old connections, so they are
+            # closed on the worker thread after it.
+            if self.publisher is not None:
+                self.jobs.submit("Closing the publish connection", lambda job, publisher=self.publisher:
+                                 publisher.close())
+                self.publisher = None
+            if key == "website_url":
+                self.website_monitor.setUrl(value)
+
+    def setDataSource(self, headers, source, count):
+        """
+        Fill the list with data which is loaded on demand.
+        :param headers: header information
+        :param source: function (offset, limit) -> list of entries
+        :param count: total number of entries provided by the source
+        """
+        self.setData(headers, [])
+        self.win.user_list.setRowSource(source, count)
+        # The rows of the source are not journaled when they are fetched. Start with a snapshot which contains them.
+        if self.journal.is_open():
+            self.compactApplicationState(wait=True)
+        self.memory_tracer.end_load()
+
+        if self.win.user_list.hasData():
+            self.win.user_info_widget.show()
+            self.win.user_list.setCurrentRow(0)
+
+    def loadStream(self, batches):
+        """
+        Fill the list with the rows of a streaming parser (see stream_table). The first batch is loaded immediately,
+        the remaining batches are merged in sorted order while the event loop runs. Errors while parsing the first
+        batch are raised, later errors are shown to the user.
+        :param batches: iterator which yields (headers, rows) tuples
+        """
+        headers, rows = next(batches)
+        self.setData(headers, [])
+
+        self.stream_loader = StreamLoader(batches, self.win.user_list, self)
+        self.stream_loader.progress.connect(self.streamLoadProgress)
+        self.stream_loader.finished.connect(self.streamLoadFinished)
+        self.stream_loader.failed.connect(self.streamLoadFailed)
+        self.stream_loader.start()
+        # Loading the rows can not be undone.
+        self.undo_history.setPaused(True)
+        self.stream_loader.mergeRows(rows)
+
+        if self.win.user_list.hasData():
+            self.win.user_info_widget.show()
+            self.win.user_list.setCurrentRow(0)
+
+    def isStreamLoading(self):
+        """
+        :return True while the rows of a file are loaded in the background.
+        """
+        return self.stream_loader is not None and self.stream_loader.isRunning()
+
+    def cancelStreamLoad(self):
+        """
+        Stop loading the remaining rows of a file.
+        """
+        if self.stream_loader is not None:
+            self.stream_loader.cancel()
+            self.stream_loader.deleteLater()
+            self.stream_loader = None
+            self.undo_history.setPaused(False)
+            self.csv_importer = None
+
+    def streamLoadProgress(self, count):
+        """
+        Show the number of loaded rows.
+        """
+        self.win.statusBar().showMessage("Loading... {0} students".format(count))
+
+    def streamLoadFinished(self):
+        """
+        Called after all rows of a file were loaded.
+        """
+        self.win.statusBar().showMessage("Loaded {0} students".format(self.win.user_list.model().rowCount()), 5000)
+        self.undo_history.setPaused(False)
+        # The loaded rows were journaled batch by batch. Replace them with a new snapshot to keep the journal short.
+        if self.journal.is_open():
+            self.compactApplicationState(wait=True)
+        self.memory_tracer.end_load()
+
+    def streamLoadFailed(self, error):
+        """
+        Called if the remaining rows of a file could not be parsed.
+        """
+        self.win.statusBar().clearMessage()
+        self.undo_history.setPaused(False)
+        # The rows loaded so far are kept.
+        self.memory_tracer.end_load()
+        self.showError("Corrupt file.", "Error parsing the file: {0}. Only the first {1} students were "\
+                       "loaded.".format(error, self.win.user_list.model().rowCount()))
+
+    def openFile(self, path):
+        """
+        Parse a php file on the worker thread of the job queue. The data is only replaced after the whole file was
+        parsed, so the current data stays untouched if the job is cancelled or the file is corrupt.
+        :param path: path to exported php file
+        """
+        self.cancelOpenFile()
+        self.memory_tracer.begin_load()
+        self.open_job = self.jobs.submit("Opening {0}".format(os.path.basename(path)),
+                                         lambda job: parse_php_file(path, job.reportProgress))
+        self.open_job.progress.connect(self.showJobStatus)
+        self.open_job.finished.connect(self.openFileFinished)
+        self.open_job.failed.connect(partial(self.openFileFailed, path))
+        self.open_job.cancelled.connect(partial(self.openFileCancelled, self.open_job))
+
+    def cancelOpenFile(self):
+        """
+        Stop parsing the file which is opened and keep the current data.
+        """
+        if self.open_job is not None:
+            self.open_job.cancel()
+            self.open_job = None
+            self.memory_tracer.abort_load()
+
+    def openFileCancelled(self, job):
+        """
+        Called on the GUI thread if parsing the opened file was cancelled, e.g. by cancelling all jobs.
+        :param job: Job which parsed the file
+        """
+        if self.open_job is job:
+            self.open_job = None
+            self.memory_tracer.abort_load()
+
+    def openFileFinished(self, result):
+        """
+        Called on the GUI thread after the opened file was parsed.
+        :param result: headers and user data of the file
+        """
+        self.open_job = None
+        headers, users = result
+        try:
+            self.setData(headers, users)
+        except SchemaException as e:
+            self.memory_tracer.abort_load()
+            self.showError("Invalid headers.", str(e))
+            return
+        self.win.statusBar().showMessage("Loaded {0} students".format(len(users)), 5000)
+        if self.win.user_list.hasData():
+            self.win.user_info_widget.show()
+            self.win.user_list.setCurrentRow(0)
+
+    def openFileFailed(self, path, error):
+        """
+        Called on the GUI thread if the opened file could not be parsed.
+        """
+        self.open_job = None
+        self.memory_tracer.abort_load()
+        self.showError("Corrupt file.", "Error parsing the file: {0}. Make sure the file is a valid php "\
+                       "file.".format(path))
+
+    def confirmExport(self, data):
+        """
+        Validate the points before an export. If there are problems, the user decides whether to export anyway.
+        :param data: entries to export
+        :return True if the data should be exported
+        """
+        problems = self.problems_win.problems(data)
+        if not problems:
+            return True
+
+        headers = self.win.user_list.allHeaders()
+        name_index = self.schema.name_index
+        msg = QMessageBox(self.win)
+        msg.setWindowTitle("Point problems")
+        msg.setIcon(QMessageBox.Warning)
+        msg.setText("{0} point cells are invalid. Export anyway?".format(len(problems)))
+        msg.setInformativeText(format_point_problems(problems, headers, name_index, limit=5))
+        msg.setDetailedText(format_point_problems(problems, headers, name_index,
+                                                  limit=MonoidProblemsWindow.MAX_SHOWN_PROBLEMS))
+        msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+        msg.setDefaultButton(QMessageBox.No)
+        show_button = msg.addButton("Show problems", QMessageBox.ActionRole)
+        answer = msg.exec_()
+        if msg.clickedButton() is show_button:
+            self.problems_win.raise_()
+            self.problems_win.show()
+            return False
+        return answer == QMessageBox.Yes
+
+    def exportFile(self, path, data, export_function, *args):
+        """
+        Write the data on the worker thread of the job queue. The data is copied first, so it can be edited while the
+        file is written. Exports are written one after another in the order they were started.
+        :param path: path of the php file
+        :param data: entries to export
+        :param export_function: function (path, headers, data, *args, progress=None) which writes the file and returns
+                                a summary for the status bar or None
+        :param args: additional arguments of the export function
+        """
+        if not self.confirmExport(data):
+            return
+        headers = list(self.win.user_list.allHeaders())
+        data = [tuple(e) for e in data]
+        name = os.path.basename(path)
+
+        job = self.jobs.submit("Exporting {0}".format(name),
+                               lambda job: export_function(path, headers, data, *args, progress=job.reportProgress))
+        job.finished.connect(lambda summary: self.win.statusBar().showMessage(
+            summary or "Exported {0} students to {1}".format(len(data), name), 5000))
+        job.failed.connect(lambda error: self.showError("Export failed.", "Error writing {0}: {1}".format(name, error)))
+
+    def showJobStatus(self, *args):
+        """
+        Show the running background job and the number of queued jobs in the status bar.
+        """
+        jobs = self.jobs.jobs()
+        if not jobs:
+            return
+        text = jobs[0].title + "..."
+        if jobs[0].count:
+            text += " {0} students".format(jobs[0].count)
+        if len(jobs) > 1:
+            text += " ({0} more queued)".format(len(jobs) - 1)
+        self.win.statusBar().showMessage(text)
+
+    def cancelJobs(self):
+        """
+        Cancel all background jobs. The current data is kept.
+        """
+        self.open_job = None
+        self.jobs.cancelAll()
+        self.win.statusBar().showMessage("Cancelled", 5000)
+
+    def importCsv(self, path):
+        """
+        Add the students of a CSV file to the loaded data. The rows are read in batches and merged in sorted order while
+        the event loop runs, like the rows of a streamed file. The whole import is undone at once, edits made while it
+        runs are undone separately.
+        :param path: path of the CSV file
+        :raise CsvImportException if the columns of the file can not be mapped onto the headers
+        """
+        importer = CsvImporter(path, self.win.user_list.allHeaders(), self.schema)
+
+        self.cancelStreamLoad()
+        self.csv_importer = importer
+        self.stream_loader = StreamLoader(importer.batches(), self.win.user_list, self)
+        self.stream_loader.progress.connect(self.csvImportProgress)
+        self.stream_loader.finished.connect(self.csvImportFinished)
+        self.stream_loader.failed.connect(self.csvImportFinished)
+        self.stream_loader.mergeStarted.connect(partial(self.undo_history.beginGroup, "Import CSV", importer))
+        self.stream_loader.mergeFinished.connect(self.undo_history.endGroup)
+        self.stream_loader.start()
+
+    def csvImportProgress(self, count):
+        """
+        Show the number of imported rows.
+        """
+        self.win.statusBar().showMessage("Importing... {0} students".format(self.csv_importer.imported))
+
+    def csvImportFinished(self, error=None):
+        """
+        Called after all rows of a CSV file were imported or if the file could not be read. Shows the rejected rows.
+        :param error: exception if the remaining rows could not be read
+        """
+        importer, self.csv_importer = self.csv_importer, None
+        self.win.statusBar().clearMessage()
+        self.win.refreshSelectedUser()
+        # The imported rows were journaled batch by batch. Replace them with a new snapshot to keep the journal short.
+        if self.journal.is_open():
+            self.compactApplicationState(wait=True)
+
+        msg = QMessageBox(self.win)
+        msg.setWindowTitle("Import CSV")
+        if error is None:
+            msg.setText("Imported {0} students.".format(importer.imported))
+        else:
+            msg.setIcon(QMessageBox.Warning)
+            msg.setText("Error reading the file: {0}. Only the first {1} students were imported.".format(
+                error, importer.imported))
+        msg.setInformativeText(format_import_report(importer, limit=5))
+        if importer.rejected:
+            msg.setDetailedText(format_import_report(importer))
+        msg.exec_()
+
+    def memoryStructures(self):
+        """
+        :return list of (name, object) tuples with all data structures which depend on the loaded data
+        """
+        structures = self.win.memoryStructures()
+        structures.append(("Header schema", self.schema))
+        structures.append(("Statistics cache", self.stats_win.stats))
+        structures.extend(self.undo_history.memoryStructures())
+        return structures
+
+    def resultsStore(self):
+        """
+        Open the results store. If no store is configured the user is asked for a path.
+        :return ResultsStore instance or None if no store is configured
+        """
+        if self.results_store is None:
+            path = self.settings.general.results_store
+            if not path:
+                path, _ = QFileDialog.getSaveFileName(self.win, "Results store:", "results.sqlite",
+                                                      "SQLite database (*.sqlite *.db)",
+                                                      options=QFileDialog.DontConfirmOverwrite)
+                if not path:
+                    return None
+                self.settings.general.results_store = path
+            try:
+                self.results_store = ResultsStore(path)
+            except Exception:
+                self.showError("Results store error.", "Error opening the results store: {0}.".format(path))
+        return self.results_store
+
+    def websiteDiff(self, headers, users):
+        """
+        Compare the website with the loaded data by the name of each student.
+        :param headers: headers of the website
+        :param users: user data of the website
+        :return RowDiff or None if the data can not be compared
+        """
+        if self.schema is None or self.settings.header.name_field not in headers:
+            return None
+        return diff_rows_by_name(self.win.user_list.allHeaders(), self.win.user_list.allData(), headers, users,
+                                 self.schema.name_index, headers.index(self.settings.header.name_field))
+
+    def websiteChanged(self, headers, users):
+        """
+        Called by the website monitor when the website changed. Differences to the loaded data are shown as a
+        notification, which can be applied.
+        :param headers: headers of the website
+        :param users: user data of the website
+        """
+        diff = self.websiteDiff(headers, users)
+        if diff is None or is_empty_diff(diff):
+            return
+        self._website_data = (headers, users)
+        text = "The website changed: {0} new, {1} removed and {2} changed students.".format(
+            len(diff.added), len(diff.removed), len(diff.changed))
+        details = format_row_diff(diff, headers, headers.index(self.settings.header.name_field))
+        # Keep the tool tip readable for large changes.
+        lines = details.splitlines()
+        if len(lines) > 40:
+            details = "\n".join(lines[:40] + ["..."])
+        self.win.showNotification(text, "Apply", self.applyWebsiteChanges, details)
+
+    def websitePollFailed(self, error):
+        """
+        Called by the website monitor when the website could not be fetched or parsed.
+        :param error: exception of the poll
+        """
+        self.win.statusBar().showMessage("The website could not be checked for changes: {0}".format(error), 10000)
+
+    def applyWebsiteChanges(self):
+        """
+        Apply the changes of the last changed website to the loaded data. The changes are compared again, because the
+        data might have been edited since the notification was shown.
+        """
+        if self._website_data is None:
+            return
+        headers, users = self._website_data
+        self._website_data = None
+        diff = self.websiteDiff(headers, users)
+        if diff is None or is_empty_diff(diff):
+            return
+
+        user_list = self.win.user_list
+        model = user_list.model()
+        self.undo_history.beginGroup("Apply website changes")
+        if diff.headers is not None and len(diff.headers) != len(user_list.allHeaders()):
+            # The columns changed, so the entries can not be updated in place.
+            user_list.updateData(headers, [list(e) for e in users], headers.index(self.settings.header.name_field),
+                                 replace=True)
+        else:
+            # Apply all changes with a single update of the model. The rows are searched by their entries, because
+            # each step might move the remaining rows.
+            changes = {id(old_entry): list(entry) for old_entry, entry in diff.changed}
+            model.setValues([(row, -1, changes[id(e)]) for row, e in enumerate(model.list_data) if id(e) in changes])
+            removed = {id(e) for e in diff.removed}
+            model.removeDataRows([row for row, e in enumerate(model.list_data) if id(e) in removed])
+            model.insertSortedRows([list(e) for e in diff.added], model.sorter().key)
+            if diff.headers is not None:
+                user_list.updateHeaders(diff.headers)
+        self.undo_history.endGroup()
+        self.undoHistoryApplied()
+
+    def openPublisher(self):
+        """
+        Open the publisher for the configured target. If no target is configured an error is shown.
+        :return Publisher instance or None if no target is configured
+        """
+        if self.publisher is None:
+            general = self.settings.general
+            if not general.publish_url:
+                self.showError("No publish target.", "Set the url of the published file in the preferences.")
+                return None
+            try:
+                self.publisher = Publisher(general.publish_url, PUBLISH_STATE_FILE,
+                                           general.publish_verify_url or general.website_url,
+                                           general.publish_compressed)
+            except PublishException as e:
+                self.showError("Publish error.", str(e))
+        return self.publisher
+
     def createMenubar(self):
         """
         Create the menubar with open, export and tools options.
@@ -92,19 +655,62 @@ class MonoidApp(QApplication):
             self.pref_win.raise_()
             self.pref_win.show()
 
+        def showStatisticsWindow():
+            """
+            Show the statistics grouped by school and grade.
+            """
+            self.stats_win.raise_()
+            self.stats_win.show()
+
+        def showProblemsWindow():
+            """
+            Show all invalid points.
+            """
+            self.problems_win.raise_()
+            self.problems_win.show()
+
+        def showMemoryWindow():
+            """
+            Show the memory used by the loaded data.
+            """
+            self.memory_win.raise_()
+            self.memory_win.show()
+
+        def showDuplicatesWindow():
+            """
+            Show the students which were entered more than once.
+            """
+            self.duplicates_win.raise_()
+            self.duplicates_win.show()
+
+        def showTableWindow():
+            """
+            Show all columns of all students in a table.
+            """
+            self.table_win.raise_()
+            self.table_win.show()
+
         def openPhpFile():
             """
             Open an existing php file.
             """
             path, _ = QFileDialog.getOpenFileName(self.win, "Open file:", "./", "Php Files(*.php)")
+            if path:
+                self.openFile(path)
+
+        def importCsvFile():
+            """
+            Add the students of a CSV file to the data.
+            """
+            if self.schema is None:
+                self.showError("No data.", "Open a php file before importing students from a CSV file.")
+                return
+            path, _ = QFileDialog.getOpenFileName(self.win, "Import file:", "./", "CSV Files(*.csv *.txt)")
             if path:
                 try:
-                    headers, data = parse_php_file(path)
-                except:
-                    self.showError("Corrupt file.", "Error parsing the file: {0}. Make sure the file is a "\
-                                   "valid php file.".format(path))
-                else:
-                    self.setData(headers, data)
+                    self.importCsv(path)
+                except (CsvImportException, OSError) as e:
+                    self.showError("Invalid file.", "Error reading the file: {0}".format(e))
 
         def export():
             """
@@ -112,9 +718,8 @@ class MonoidApp(QApplication):
             """
             path, _ = QFileDialog.getSaveFileName(self.win, "Export file:", DEFAULT_FILE)
             if path:
-                headers = self.win.user_list.allHeaders()
-                data = self.win.user_list.allData()
-                export_data_to_file(path, headers, data)
+                self.exportFile(path, self.win.user_list.allData(), export_data_to_file,
+                                self.win.user_list.model().dictionaries)
 
         def exportSelected():
             """
@@ -122,24 +727,233 @@ class MonoidApp(QApplication):
             """
             path, _ = QFileDialog.getSaveFileName(self.win, "Export file:", DEFAULT_FILE)
             if path:
-                headers = self.win.user_list.allHeaders()
-                data = self.win.user_list.selectedData()
-                export_data_to_file(path, headers, data)
+                self.exportFile(path, self.win.user_list.selectedData(), export_data_to_file,
+                                self.win.user_list.model().dictionaries)
+
+        def exportPages():
+            """
+            Export all data into multiple php files and an index page which links to them.
+            """
+            if self.schema is None:
+                self.showError("Export failed.", "The headers do not match the header settings.")
+                return
+            labels = ["Pages of equal size", "One page per grade", "One page per initial letter"]
+            label, ok = QInputDialog.getItem(self.win, "Export pages", "Split the ranking into:", labels, 0, False)
+            if not ok:
+                return
+            mode = SPLIT_MODES[labels.index(label)]
+            page_size = DEFAULT_PAGE_SIZE
+            if mode == "rows":
+                page_size, ok = QInputDialog.getInt(self.win, "Export pages", "Students per page:", DEFAULT_PAGE_SIZE,
+                                                    1, 1000000)
+                if not ok:
+                    return
+            path, _ = QFileDialog.getSaveFileName(self.win, "Export index page:", DEFAULT_FILE)
+            if not path:
+                return
+
+            def exportShards(*args, **kwargs):
+                return format_export_result(export_sharded(*args, **kwargs))
+
+            self.exportFile(path, self.win.user_list.allData(), exportShards, self.schema, mode, page_size,
+                            self.win.user_list.model().dictionaries)
+
+        def checkWebsite():
+            """
+            Check the website for changes now.
+            """
+            self.website_monitor.reset()
+            self.website_monitor.poll()
+            self.win.statusBar().showMessage("Checking the website for changes...", 5000)
+
+        def publish():
+            """
+            Upload the php file to the server on the worker thread of the job queue if the data changed since the last
+            upload.
+            """
+            publisher = self.openPublisher()
+            if publisher is None or not self.win.user_list.hasHeaders():
+                return
+            data = self.win.user_list.allData()
+            if not self.confirmExport(data):
+                return
+            # Copy the data, so it can be edited while the file is uploaded and verified.
+            headers = list(self.win.user_list.allHeaders())
+            data = [tuple(e) for e in data]
+            dictionaries = list(self.win.user_list.model().dictionaries)
+            job = self.jobs.submit("Publishing", lambda job: publisher.publish(headers, data, dictionaries))
+            job.finished.connect(publishFinished)
+            job.failed.connect(lambda error: self.showError("Publish error.", str(error)))
+
+        def publishFinished(result):
+            """
+            Show the result of an upload.
+            :param result: PublishResult
+            """
+            if result.uploaded:
+                message = "Uploaded {0} KiB{1}.".format(result.size // 1024, " and verified the published file"
+                                                        if result.verified else "")
+            else:
+                message = "The data did not change since the last upload."
+            QMessageBox.information(self.win, "Publish", message)
+
+        def openFromResultsStore():
+            """
+            Open the roster of a school year from the results store.
+            """
+            store = self.resultsStore()
+            if store is None:
+                return
+            years = store.school_years()
+            if not years:
+                self.showError("Empty results store.", "The results store does not contain any school year.")
+                return
+            year, ok = QInputDialog.getItem(self.win, "Open school year", "School year:", years, len(years)-1, False)
+            if ok:
+                self.memory_tracer.begin_load()
+                try:
+                    self.setDataSource(store.headers(year), partial(store.rows, year), store.row_count(year))
+                except SchemaException as e:
+                    self.memory_tracer.abort_load()
+                    self.showError("Invalid headers.", str(e))
+
+        def saveToResultsStore():
+            """
+            Save the current data as the roster of a school year in the results store.
+            """
+            store = self.resultsStore()
+            if store is None:
+                return
+            year, ok = QInputDialog.getText(self.win, "Save school year", "School year:",
+                                            text=format_school_year(current_school_year()))
+            if ok and year:
+                saveRoster(store, year)
+
+        def saveRoster(store, year):
+            """
+            Save the current data as the roster of a school year.
+            :param store: ResultsStore instance
+            :param year: school year as string
+            :return True if the roster was saved
+            """
+            if self.schema is None or self.schema.grade_index is None or self.schema.school_index is None:
+                self.showError("Invalid headers.", "The name, sum, grade and school fields of the header "\
+                               "settings must be part of the data.")
+                return False
+            # Save the roster sorted by name, which is the order of newly loaded data.
+            data = list(self.win.user_list.allData())
+            RowSorter([self.schema.name_index]).sort(data)
+            store.save_roster(year, data, self.schema)
+            return True
 
         def changeReleaseNumber():
             """
             Change the Monoid release number.
             """
+            if self.schema is None or not self.schema.point_indices:
+                return
             headers = self.win.user_list.allHeaders()
-            default_value = int(headers[self.settings.header.point_indices.start])
+            try:
+                default_value = int(headers[self.schema.point_indices[0]])
+            except ValueError:
+                default_value = 0
             num, ok = QInputDialog.getInt(self.win, "New release number", "Enter the first monoid "\
                                             "release number for this year:", default_value, 0)
             if ok:
                 # Change the release numbers for the whole year.
-                for i, idx in enumerate(self.settings.header.point_indices):
-                    headers[idx] = str(num + i)
-                self.win.user_list.updateHeaders(headers)
+                self.undo_history.beginGroup("Change release number")
+                self.win.user_list.updateHeaders(release_headers(headers, self.schema.point_indices, num))
+                self.undo_history.endGroup()
                 self.win.updateHeaderLabels()
+                self.stats_win.scheduleRefresh()
+
+        def schoolYearRollover():
+            """
+            Archive the current school year in the results store and prepare the data for the next school year.
+            """
+            if self.schema is None or self.schema.grade_index is None or self.schema.school_index is None:
+                self.showError("Invalid headers.", "The name, sum, grade and school fields of the header "\
+                               "settings must be part of the data.")
+                return
+            headers = self.win.user_list.allHeaders()
+            archived_year, _ = rollover_school_years()
+            year, ok = QInputDialog.getText(self.win, "School year rollover", "Archive the data as school year:",
+                                            text=format_school_year(archived_year))
+            if not ok or not year:
+                return
+            default_value = next_first_release(headers, self.schema.point_indices)
+            num, ok = QInputDialog.getInt(self.win, "School year rollover", "Enter the first monoid release number "\
+                                          "for the new year:", default_value, 0)
+            if not ok:
+                return
+
+            data = self.win.user_list.allData()
+            try:
+                plan = plan_rollover(data, self.schema, num)
+            except RolloverException as e:
+                self.showError("Invalid headers.", str(e))
+                return
+
+            # Show all changes before anything is changed.
+            msg = QMessageBox(self.win)
+            msg.setWindowTitle("School year rollover")
+            msg.setText("Archive the data as school year {0} and prepare the next school year?".format(year))
+            msg.setInformativeText(format_rollover_summary(data, plan, self.schema) + "\nAll points and sums are "\
+                                   "cleared.")
+            msg.setDetailedText(format_rollover_diff(data, plan, self.schema))
+            msg.setStandardButtons(QMessageBox.Ok | QMessageBox.Cancel)
+            if msg.exec_() != QMessageBox.Ok:
+                return
+
+            store = self.resultsStore()
+            if store is None or not saveRoster(store, year):
+                return
+
+            # Apply all changes with a single update of the model, which can be undone at once. Sorting the changed
+            # rows moves the graduated students, so they are removed by their entries.
+            model = self.win.user_list.model()
+            removed = {id(data[row]) for row in plan.removed}
+            self.undo_history.beginGroup("School year rollover")
+            model.setValues([(row, -1, entry) for row, entry in plan.changes])
+            model.removeDataRows([row for row, e in enumerate(model.list_data) if id(e) in removed])
+            self.win.user_list.updateHeaders(plan.headers)
+            self.undo_history.endGroup()
+            self.undoHistoryApplied()
+
+        def undo():
+            """
+            Revert the last change of the data.
+            """
+            self.undo_history.undo()
+            self.undoHistoryApplied()
+
+        def redo():
+            """
+            Apply the last reverted change again.
+            """
+            self.undo_history.redo()
+            self.undoHistoryApplied()
+
+        def updateUndoActions():
+            """
+            Show the name of the next change to undo and redo.
+            """
+            undo_action.setEnabled(self.undo_history.canUndo())
+            undo_action.setText("&Undo {0}".format(self.undo_history.undoText()).strip())
+            redo_action.setEnabled(self.undo_history.canRedo())
+            redo_action.setText("&Redo {0}".format(self.undo_history.redoText()).strip())
+
+        # Undo and redo actions.
+        undo_action = QAction("&Undo", self)
+        undo_action.setShortcut(QKeySequence.Undo)
+        undo_action.triggered.connect(undo)
+
+        redo_action = QAction("&Redo", self)
+        redo_action.setShortcut(QKeySequence.Redo)
+        redo_action.triggered.connect(redo)
+
+        self.undo_history.changed.connect(updateUndoActions)
+        updateUndoActions()
 
         # About window.
         about_action = QAction("&About {0}".format(self.applicationName()), self)
@@ -158,6 +972,10 @@ class MonoidApp(QApplication):
         open_php_action.setStatusTip("Open an exported php file.")
         open_php_action.triggered.connect(openPhpFile)
 
+        import_csv_action = QAction("&Import CSV file...", self)
+        import_csv_action.setStatusTip("Add the students of a CSV file, e.g. a spreadsheet export, to the data.")
+        import_csv_action.triggered.connect(importCsvFile)
+
         export_action = QAction("&Export...", self)
         export_action.setShortcut("Ctrl+E")
         export_action.setStatusTip("Export the data to a php file.")
@@ -168,60 +986,242 @@ class MonoidApp(QApplication):
         export_selected_action.setStatusTip("Export the selected data to a php file.")
         export_selected_action.triggered.connect(exportSelected)
 
+        export_pages_action = QAction("Export &pages...", self)
+        export_pages_action.setStatusTip("Export the data to multiple php files and an index page.")
+        export_pages_action.triggered.connect(exportPages)
+
+        # Cancel opening and exporting files on the worker thread.
+        cancel_jobs_action = QAction("&Cancel background jobs", self)
+        cancel_jobs_action.setStatusTip("Stop opening a file and all exports which were not written yet.")
+        cancel_jobs_action.triggered.connect(self.cancelJobs)
+        self.jobs.jobsChanged.connect(lambda: cancel_jobs_action.setEnabled(bool(self.jobs.jobs())))
+        cancel_jobs_action.setEnabled(False)
+
+        publish_action = QAction("&Publish", self)
+        publish_action.setShortcut("Ctrl+U")
+        publish_action.setStatusTip("Upload the php file to the server if the data changed.")
+        publish_action.triggered.connect(publish)
+
+        open_store_action = QAction("Open from &results store...", self)
+        open_store_action.setStatusTip("Open a school year from the results store.")
+        open_store_action.triggered.connect(openFromResultsStore)
+
+        save_store_action = QAction("&Save to results store...", self)
+        save_store_action.setStatusTip("Save the data as a school year in the results store.")
+        save_store_action.triggered.connect(saveToResultsStore)
+
         # Useful tools to change existing data.
         change_release_action = QAction("&Change monoid release number", self)
         change_release_action.setShortcut("Ctrl+R")
         change_release_action.setStatusTip("Change the monoid release number.")
         change_release_action.triggered.connect(changeReleaseNumber)
 
+        rollover_action = QAction("School &year rollover...", self)
+        rollover_action.setStatusTip("Archive the school year and prepare the data for the next school year.")
+        rollover_action.triggered.connect(schoolYearRollover)
+
+        statistics_action = QAction("&Statistics...", self)
+        statistics_action.setShortcut("Ctrl+I")
+        statistics_action.setStatusTip("Show statistics grouped by school and grade.")
+        statistics_action.triggered.connect(showStatisticsWindow)
+
+        memory_action = QAction("&Memory usage...", self)
+        memory_action.setStatusTip("Show the memory used by the loaded data.")
+        memory_action.triggered.connect(showMemoryWindow)
+
+        check_website_action = QAction("Check &website for changes", self)
+        check_website_action.setStatusTip("Compare the website with the loaded data.")
+        check_website_action.triggered.connect(checkWebsite)
+
+        duplicates_action = QAction("Find &duplicates...", self)
+        duplicates_action.setStatusTip("Find and merge students which were entered more than once.")
+        duplicates_action.triggered.connect(showDuplicatesWindow)
+
+        problems_action = QAction("Point &problems...", self)
+        problems_action.setStatusTip("Show points which are not a number, too high or do not match the sum.")
+        problems_action.triggered.connect(showProblemsWindow)
+
+        table_action = QAction("&Table editor...", self)
+        table_action.setShortcut("Ctrl+T")
+        table_action.setStatusTip("Edit all columns of all students in a table.")
+        table_action.triggered.connect(showTableWindow)
+
         menubar = self.win.menuBar()
 
         # Default file menu.
         file_menu = menubar.addMenu("&File")
         file_menu.addAction(open_php_action)
+        file_menu.addAction(import_csv_action)
         file_menu.addAction(export_action)
         file_menu.addAction(export_selected_action)
+        file_menu.addAction(export_pages_action)
+        file_menu.addAction(publish_action)
+        file_menu.addAction(cancel_jobs_action)
+        file_menu.addSeparator()
+        file_menu.addAction(open_store_action)
+        file_menu.addAction(save_store_action)
 
         # Tools menu.
         tools_menu = menubar.addMenu("&Tools")
         tools_menu.addAction(change_release_action)
+        tools_menu.addAction(rollover_action)
+        tools_menu.addAction(statistics_action)
+        tools_menu.addAction(duplicates_action)
+        tools_menu.addAction(problems_action)
+        tools_menu.addAction(table_action)
+        tools_menu.addAction(check_website_action)
+        tools_menu.addAction(memory_action)
 
         # Edit menu, which contains about and preferences menu on platforms different to macOS.
         edit_menu = menubar.addMenu("&Edit")
+        edit_menu.addAction(undo_action)
+        edit_menu.addAction(redo_action)
+        edit_menu.addSeparator()
         edit_menu.addAction(about_action)
         edit_menu.addAction(preference_action)
 
         help_menu = menubar.addMenu("&Help")
         help_menu.addAction("View Source Code", lambda: open_new_tab("https://github.com/Schlaubischlump"))
 
+    def undoHistoryApplied(self):
+        """
+        Show the changed data after an undo or redo.
+        """
+        # Filling the detailed view again must not be recorded as a new change.
+        paused = self.undo_history.isPaused()
+        self.undo_history.setPaused(True)
+        try:
+            self.win.refreshSelectedUser()
+        finally:
+            self.undo_history.setPaused(paused)
+        self.stats_win.scheduleRefresh()
+
     def showWindow(self):
         """
         Show the main Application window.
         """
         self.win.show()
 
-    def saveApplicationState(self):
+    def journalValueChanged(self, row, column, old_value, new_value):
+        """
+        Record a changed value in the journal.
         """
-        Save the current application state (including selections) in a pickle file.
+        self.journal.append("set", row, column, new_value)
+
+    def journalCheckStateChanged(self, row, state):
+        """
+        Record a changed check state in the journal.
+        """
+        self.journal.append("check", row, state == Qt.Checked)
+
+    def journalRowsInserted(self, parent, first, last):
+        """
+        Record inserted rows in the journal. Rows fetched from the row source are already part of the snapshot.
+        """
+        model = self.win.user_list.model()
+        if model.isFetching():
+            return
+        self.journal.append_many([("insert", row, model.list_data[row]) for row in range(first, last+1)])
+
+    def journalRowsAboutToBeRemoved(self, parent, first, last):
         """
+        Record removed rows in the journal.
+        """
+        self.journal.append_many([("remove", row) for row in range(last, first-1, -1)])
+
+    def journalRowsMoved(self, parent, start, end, destination, row):
+        """
+        Record an entry which was moved to its sorted position in the journal.
+        """
+        self.journal.append("move", start, row - 1 if row > start else row)
+
+    def journalLayoutChanged(self, *args):
+        """
+        The journal can not describe sorting all entries. Start with a new snapshot instead.
+        """
+        if self.journal.is_open():
+            self.compactApplicationState(wait=True)
+
+    def journalHeadersChanged(self, headers):
+        """
+        Record changed headers in the journal.
+        """
+        self.journal.append("headers", headers)
+
+    def isApplicationStateDirty(self):
+        """
+        :return True if the data changed since the last saved snapshot.
+        """
+        return self.journal.seq != self.state_writer.saved_seq
+
+    def startStateJournal(self):
+        """
+        Save the current application state and record all following changes in the journal.
+        """
+        self.journal.seq = self._journal_seq
+        self.journal.open()
+        self._journal_timer.start()
+        self.compactApplicationState(wait=True)
+        # All records of the last session are now part of the snapshot.
+        self.journal.discard()
+
+    def compactApplicationState(self, wait=False):
+        """
+        Save the current application state (including selections) in a new snapshot and clear the journal. The
+        snapshot is written on a background thread.
+        :param wait: True to block until the snapshot is written
+        :return False if the snapshot could not be written, otherwise True
+        """
+        # Only write one snapshot at a time. A skipped snapshot will be written on the next call.
+        if self.state_writer.is_busy():
+            if not wait:
+                return True
+            self.state_writer.wait()
+
         headers = self.win.user_list.allHeaders()
-        data = self.win.user_list.allData()
+        data = self.win.user_list.snapshotData()
         checked_rows = self.win.user_list.checkedRows()
-        pickle_data = {"headers": headers, "user_data": data, "checked_rows": checked_rows}
-        with open(SAVED_APP_STATE_FILE, "wb") as f:
-            pickle.dump(pickle_data, f)
+        self.state_writer.generations = self.settings.general.state_generations
+        self.state_writer.compress = self.settings.general.compress_state
+        self.state_writer.save(headers, data, checked_rows, self.journal.seq)
+
+        return self.state_writer.wait() if wait else True
+
+    def saveApplicationState(self):
+        """
+        Save the current application state if anything changed since the last snapshot. All changes are already part
+        of the journal, the snapshot only keeps the journal short.
+        """
+        if self.journal.is_open() and self.isApplicationStateDirty():
+            self.compactApplicationState()
+
+    def stopStateJournal(self):
+        """
+        Write a final snapshot if anything changed and stop recording changes.
+        """
+        self._journal_timer.stop()
+        if self.journal.is_open():
+            if self.isApplicationStateDirty():
+                self.compactApplicationState(wait=True)
+            self.journal.close()
+        self.state_writer.shutdown()
 
     def restoreApplicationState(self):
         """
-        Try to restore the last application state.
+        Try to restore the last application state by loading the last snapshot and replaying the journal.
         :return True on success False otherwise.
         """
         try:
-            pickle_in = open(SAVED_APP_STATE_FILE, "rb")
-            pickle_data = pickle.load(pickle_in)
+            headers, data, checked_rows, seq = load_state(SAVED_APP_STATE_FILE, SAVED_APP_STATE_JOURNAL_FILE,
+                                                          self.settings.general.state_generations)
             # Load the data from the last application state.
-            self.setData(pickle_data["headers"], pickle_data["user_data"])
-            self.win.user_list.setCheckedRows(pickle_data["checked_rows"])
+            self.setData(headers, data)
+            self.win.user_list.setCheckedRows(checked_rows)
+            # The snapshot keeps the order of the last session, e.g. sorted by the sum. New data is sorted by name.
+            self.win.user_list.model().sortRows()
+            self.undo_history.clear()
+            # Continue the journal after the last replayed record.
+            self._journal_seq = seq
             # Sucessfully restored the last application state.
             return True
         except:
@@ -232,8 +1232,16 @@ class MonoidApp(QApplication):
         Delete the currently save application state.
         :return True on success, otherwise False
         """
+        self.journal.delete()
         try:
             os.remove(SAVED_APP_STATE_FILE)
-            return True
         except:
             return False
+
+        # Remove all older generations as well.
+        for generation in range(1, self.settings.general.state_generations+1):
+            try:
+                os.remove(generation_path(SAVED_APP_STATE_FILE, generation))
+            except OSError:
+                pass
+        return True
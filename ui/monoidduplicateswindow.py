@@ -0,0 +1,167 @@
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QDoubleSpinBox, QPushButton, QTreeWidget, \
+                            QTreeWidgetItem, QAbstractItemView
+
+from util.duplicates import DEFAULT_THRESHOLD, find_duplicates, merge_entries
+
+
+class MonoidDuplicatesWindow(QDialog):
+    """
+    Find entries which belong to the same student and merge them. Each group of duplicates is shown with all its
+    entries. Merging keeps the selected entry (or the first entry of the group), fills its empty cells with the values
+    of the other entries and keeps the highest points of each release.
+    """
+
+    def __init__(self, app, *args, **kwargs):
+        super(MonoidDuplicatesWindow, self).__init__(*args, **kwargs)
+
+        self.setWindowTitle("Duplicate students")
+        self.resize(800, 450)
+        self.app = app
+        # Entries of each group shown in the tree. The entries are referenced directly, because the rows change with
+        # each merge.
+        self._groups = []
+
+        self.thresholdSpinner = QDoubleSpinBox()
+        self.thresholdSpinner.setRange(0.5, 1.0)
+        self.thresholdSpinner.setSingleStep(0.05)
+        self.thresholdSpinner.setValue(DEFAULT_THRESHOLD)
+        self.thresholdSpinner.setToolTip("Minimal similarity of two names. Use 1 to only find names which only differ "
+                                         "in case, umlauts, punctuation or the order of first and last name.")
+
+        search_button = QPushButton("Search")
+        search_button.clicked.connect(self.findDuplicates)
+
+        self.tree = QTreeWidget()
+        self.tree.setSelectionMode(QAbstractItemView.SingleSelection)
+
+        self.mergeButton = QPushButton("Merge")
+        self.mergeButton.setToolTip("Merge the selected group into the selected student.")
+        self.mergeButton.clicked.connect(self.mergeSelectedGroup)
+
+        self.mergeAllButton = QPushButton("Merge all")
+        self.mergeAllButton.setToolTip("Merge each group into its first student.")
+        self.mergeAllButton.clicked.connect(self.mergeAllGroups)
+
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(QLabel("Similarity:"))
+        search_layout.addWidget(self.thresholdSpinner)
+        search_layout.addStretch()
+        search_layout.addWidget(search_button)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        button_layout.addWidget(self.mergeButton)
+        button_layout.addWidget(self.mergeAllButton)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(search_layout)
+        layout.addWidget(self.tree)
+        layout.addLayout(button_layout)
+
+    def show(self, *args):
+        """
+        Search the duplicates before showing the window.
+        """
+        self.findDuplicates()
+        super(MonoidDuplicatesWindow, self).show(*args)
+
+    def displayColumns(self):
+        """
+        :return indices of the columns shown for each entry
+        """
+        schema = self.app.schema
+        columns = [schema.name_index, schema.school_index, schema.grade_index, schema.sum_index]
+        return [c for c in columns if c is not None]
+
+    def findDuplicates(self):
+        """
+        Search all duplicates and show them.
+        """
+        self._groups = []
+        if self.app.schema is not None and self.app.win.user_list.hasHeaders():
+            schema = self.app.schema
+            data = self.app.win.user_list.allData()
+            groups = find_duplicates(data, schema.name_index, schema.school_index, schema.grade_index,
+                                     self.thresholdSpinner.value())
+            self._groups = [[data[row] for row in rows] for rows in groups]
+        self.refreshTree()
+
+    def refreshTree(self):
+        """
+        Show the current groups.
+        """
+        self.tree.clear()
+        if self.app.schema is None:
+            self.tree.setColumnCount(0)
+            return
+
+        headers = self.app.win.user_list.allHeaders()
+        columns = self.displayColumns()
+        self.tree.setColumnCount(len(columns))
+        self.tree.setHeaderLabels([headers[i] for i in columns])
+
+        for entries in self._groups:
+            group_item = QTreeWidgetItem(["{0} students".format(len(entries))])
+            for entry in entries:
+                group_item.addChild(QTreeWidgetItem([entry[i] for i in columns]))
+            self.tree.addTopLevelItem(group_item)
+        self.tree.expandAll()
+        for column in range(len(columns)):
+            self.tree.resizeColumnToContents(column)
+
+        self.mergeButton.setEnabled(bool(self._groups))
+        self.mergeAllButton.setEnabled(bool(self._groups))
+
+    def mergeSelectedGroup(self):
+        """
+        Merge the group of the selected item. If a student is selected, the student is kept.
+        """
+        item = self.tree.currentItem()
+        if item is None:
+            return
+
+        parent = item.parent()
+        if parent is None:
+            group, keep = self.tree.indexOfTopLevelItem(item), 0
+        else:
+            group, keep = self.tree.indexOfTopLevelItem(parent), parent.indexOfChild(item)
+
+        entries = self._groups[group]
+        self.mergeGroups([[entries[keep]] + entries[:keep] + entries[keep+1:]])
+        del self._groups[group]
+        self.refreshTree()
+
+    def mergeAllGroups(self):
+        """
+        Merge each group into its first student.
+        """
+        self.mergeGroups(self._groups)
+        self._groups = []
+        self.refreshTree()
+
+    def mergeGroups(self, groups):
+        """
+        Replace the first entry of each group with the merged entry and remove the other entries. All groups are
+        merged with a single model update and can be undone at once.
+        :param groups: list of entry lists, the first entry of each list is kept
+        """
+        schema = self.app.schema
+        model = self.app.win.user_list.model()
+
+        rows = {id(e): row for row, e in enumerate(model.list_data)}
+        changes, removed = [], set()
+        for entries in groups:
+            # Skip entries which were removed since the search.
+            entries = [e for e in entries if id(e) in rows]
+            if len(entries) < 2:
+                continue
+            changes.append((rows[id(entries[0])], -1, merge_entries(entries, schema.point_indices, schema.sum_index)))
+            removed.update(id(e) for e in entries[1:])
+
+        self.app.undo_history.beginGroup("Merge students")
+        model.setValues(changes)
+        # Replacing the entries might have sorted the rows again.
+        model.removeDataRows([row for row, e in enumerate(model.list_data) if id(e) in removed])
+        self.app.undo_history.endGroup()
+
+        self.app.win.refreshSelectedUser()
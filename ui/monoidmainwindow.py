@@ -1,9 +1,10 @@
 from functools import partial
 
 from PyQt5.QtWidgets import QWidget, QHBoxLayout, QListWidgetItem, QGridLayout, QLabel, QLineEdit, QMainWindow, \
-                            QPushButton, QInputDialog
+                            QPushButton, QInputDialog, QComboBox
 
 from util.helper import str_to_points, points_to_str
+from util.sorting import SortColumn
 from .listview import ListView
 
 
@@ -12,13 +13,44 @@ class MonoidMainWindow(QMainWindow):
     Main monoid application window.
     """
 
+    # Name of each sort order of the user list. Each order is completed by the name of the students.
+    SORT_ORDERS = ["Sort by name", "Sort by sum", "Sort by school and grade", "Sort by grade"]
+
+    def sortColumns(self, order):
+        """
+        :param order: index of the sort order (see SORT_ORDERS)
+        :return list of SortColumn instances for the current schema or None to sort by name
+        """
+        schema = self.app.schema
+        if schema is None or order == 0:
+            return None
+
+        if order == 1:
+            columns = [SortColumn(schema.sum_index, descending=True, numeric=True)]
+        elif order == 2:
+            columns = [SortColumn(schema.school_index), SortColumn(schema.grade_index, numeric=True)]
+        else:
+            columns = [SortColumn(schema.grade_index, numeric=True)]
+
+        # Grade and school are optional.
+        columns = [c for c in columns if c.column is not None]
+        return columns + [SortColumn(schema.name_index)] if columns else None
+
+    def sortOrderChanged(self, order):
+        """
+        Called when another sort order is selected.
+        :param order: index of the sort order (see SORT_ORDERS)
+        """
+        if self.user_list.hasHeaders():
+            self.user_list.setSortOrder(self.sortColumns(order))
+
     def updateTextfieldAtPosition(self, row, value):
         """
         Update textfield information inside the grid layout.
         :param row: row inside the grid (starting at 0)
         :param value: new value
         """
-        text_field = self.user_info_grid.itemAtPosition(row+1, 1).widget()
+        text_field = self._text_fields[row]
         text_field.setText(value)
         text_field.setCursorPosition(0)
 
@@ -26,19 +58,69 @@ class MonoidMainWindow(QMainWindow):
         """
         Called when the selection inside the user list changes.
         """
-        self.selectUser(self.user_list.currentRow())
+        row = self.user_list.currentRow()
+        # The search might hide all users.
+        if row >= 0:
+            self.selectUser(row)
 
     def showAddUserDialog(self):
         """
-        Insert the a new user in alphabetical order in the sidebar.
+        Insert the a new user in the current sort order in the sidebar.
         """
         text, ok = QInputDialog.getText(self, "New student", "Enter the students name:")
         if ok:
+            # Show the new user even if it does not match the current search text.
+            self.search_field.clear()
             self.user_list.addDataInOrder(text)
 
             if self.user_list.hasData():
                 self.user_info_widget.show()
 
+    def refreshSelectedUser(self):
+        """
+        Show the data of the current user again after the data changed without a selection change, e.g. after an undo.
+        """
+        self.updateHeaderLabels()
+        if not self.user_list.hasData():
+            self.user_info_widget.hide()
+            return
+
+        self.user_info_widget.show()
+        if self.user_list.currentRow() < 0:
+            self.user_list.setCurrentRow(0)
+        self.userSelectionChanged()
+
+    def showNotification(self, text, action_text=None, action=None, details=None):
+        """
+        Show a message in the status bar until it is dismissed or replaced by the next notification.
+        :param text: message
+        :param action_text: title of the action button (None to hide the button)
+        :param action: function called when the action button is clicked, the notification is dismissed afterwards
+        :param details: optional text shown as tool tip of the message
+        """
+        self._notification_action = action
+        self._notification_label.setText(text)
+        self._notification_label.setToolTip(details or "")
+        self._notification_button.setText(action_text or "")
+        self._notification_button.setVisible(action is not None)
+        self._notification.show()
+
+    def dismissNotification(self):
+        """
+        Hide the current notification.
+        """
+        self._notification_action = None
+        self._notification.hide()
+
+    def notificationActionClicked(self):
+        """
+        Called when the action button of the notification is clicked.
+        """
+        action = self._notification_action
+        self.dismissNotification()
+        if action is not None:
+            action()
+
     def removeSelectedUser(self):
         """
         Remove the currently selected user from the list.
@@ -70,14 +152,27 @@ class MonoidMainWindow(QMainWindow):
         self.user_list.setSelectionMode(ListView.SingleSelection)
         self.user_list.setSelectionCallback(self.userSelectionChanged)
 
+        # Filter the user list by name, school and grade.
+        self.search_field = QLineEdit()
+        self.search_field.setPlaceholderText("Search")
+        self.search_field.setClearButtonEnabled(True)
+        self.search_field.textChanged.connect(self.user_list.setSearchText)
+
+        # Sort the user list, e.g. by the sum to see the ranking. Exports use the same order.
+        self.sort_option = QComboBox()
+        self.sort_option.addItems(self.SORT_ORDERS)
+        self.sort_option.currentIndexChanged.connect(self.sortOrderChanged)
+
         add_bt = QPushButton("+")
         add_bt.clicked.connect(self.showAddUserDialog)
         remove_bt = QPushButton("-")
         remove_bt.clicked.connect(self.removeSelectedUser)
 
-        list_container_grid.addWidget(self.user_list, 0, 0, 1, -1)
-        list_container_grid.addWidget(add_bt, 1, 0)
-        list_container_grid.addWidget(remove_bt, 1, 1)
+        list_container_grid.addWidget(self.search_field, 0, 0, 1, -1)
+        list_container_grid.addWidget(self.sort_option, 1, 0, 1, -1)
+        list_container_grid.addWidget(self.user_list, 2, 0, 1, -1)
+        list_container_grid.addWidget(add_bt, 3, 0)
+        list_container_grid.addWidget(remove_bt, 3, 1)
 
         # Create a widget to display detailed information about a user.
         self.user_info_widget = QWidget()
@@ -88,6 +183,31 @@ class MonoidMainWindow(QMainWindow):
         hbox.addWidget(user_list_widget)
         hbox.addWidget(self.user_info_widget)
 
+        # Notification with an optional action in the status bar, e.g. for changes of the website.
+        self._notification = QWidget()
+        notification_layout = QHBoxLayout(self._notification)
+        notification_layout.setContentsMargins(0, 0, 0, 0)
+        self._notification_label = QLabel()
+        self._notification_button = QPushButton()
+        self._notification_button.clicked.connect(self.notificationActionClicked)
+        dismiss_bt = QPushButton("Dismiss")
+        dismiss_bt.clicked.connect(self.dismissNotification)
+        notification_layout.addWidget(self._notification_label)
+        notification_layout.addWidget(self._notification_button)
+        notification_layout.addWidget(dismiss_bt)
+        self._notification_action = None
+        self._notification.hide()
+        self.statusBar().addWidget(self._notification, 1)
+
+        # Text fields of the detailed view, which are resolved once per header schema.
+        self._text_fields = []
+        self._point_fields = []
+        self._sum_field = None
+        # True while the text fields are filled with the data of another user.
+        self._selecting_user = False
+
+        app.schemaChanged.connect(self.applySchema)
+
     def populate(self, headers, users):
         """
         Fill the list with all the necessary data.
@@ -102,9 +222,11 @@ class MonoidMainWindow(QMainWindow):
             if text_field.text() == "":
                 text_field.setText("-")
 
-        # Fill the list with all user names.
-        name_idx = headers.index(self.app.settings.header.name_field)
-        self.user_list.updateData(headers, users, name_idx)
+        # Fill the list with all user names. New data is sorted by name.
+        self.user_list.updateData(headers, users, self.app.schema.name_index)
+        self.sort_option.blockSignals(True)
+        self.sort_option.setCurrentIndex(0)
+        self.sort_option.blockSignals(False)
 
         # Hide detailed view if no data is available.
         if not self.user_list.hasData():
@@ -117,39 +239,82 @@ class MonoidMainWindow(QMainWindow):
                 child.widget().deleteLater()
 
         # Add all info fields based on the current header.
-        sum_idx = headers.index(self.app.settings.header.sum_field)
+        self._text_fields = []
         for i, h in enumerate(headers, 1):
             self.user_info_grid.addWidget(QLabel(h), i, 0)
 
             widget = QLineEdit("-")
-            if i-1 in self.app.settings.header.point_indices:
-                widget.textChanged.connect(self.updateSumLabel)
-            elif i-1 == sum_idx:
-                # Disbale editing the sum field
-                widget.setReadOnly(True)
-                widget.setEnabled(False)
-                widget.setStyleSheet("QLineEdit{background-color: rgba(0, 0, 0, 0); color: black; border: 0px}")
 
             # Connect all necessary text change events and add the widget to the view hierachy.
             widget.editingFinished.connect(partial(cleanup_text, widget))
-            widget.textChanged.connect(partial(self.updateDataModel, i-1))
+            widget.textChanged.connect(partial(self.textFieldChanged, i-1))
 
             self.user_info_grid.addWidget(widget, i, 1)
+            self._text_fields.append(widget)
+
+        # Configure the point and sum fields.
+        self.applySchema(self.app.schema)
 
         # Select the first user in the list.
         self.user_list.setCurrentRow(0)
 
+    def applySchema(self, schema):
+        """
+        Resolve the point and sum fields of the detailed view for a new header schema.
+        :param schema: HeaderSchema or None if the headers do not match the header settings
+        """
+        # Search the name, school and grade of each user.
+        if schema is not None:
+            columns = [schema.name_index, schema.school_index, schema.grade_index]
+            self.user_list.setSearchColumns([c for c in columns if c is not None])
+            # The columns of the sort order might have moved.
+            self.sortOrderChanged(self.sort_option.currentIndex())
+
+        # The schema might change before the detailed view is rebuilt for new headers.
+        if schema is None or len(schema.headers) != len(self._text_fields):
+            self._point_fields = []
+            self._sum_field = None
+            return
+
+        self._point_fields = [self._text_fields[i] for i in schema.point_indices]
+        self._sum_field = self._text_fields[schema.sum_index]
+
+        for i, widget in enumerate(self._text_fields):
+            if i == schema.sum_index:
+                # Disbale editing the sum field
+                widget.setReadOnly(True)
+                widget.setEnabled(False)
+                widget.setStyleSheet("QLineEdit{background-color: rgba(0, 0, 0, 0); color: black; border: 0px}")
+            else:
+                widget.setReadOnly(False)
+                widget.setEnabled(True)
+                widget.setStyleSheet("")
+
+        self.updateSumLabel()
+
+    def memoryStructures(self):
+        """
+        :return list of (name, object) tuples with the data structures of the list and the detailed view. Only the
+                python part of the widgets and their texts is measured.
+        """
+        fields = [(field, field.text()) for field in self._text_fields]
+        return self.user_list.memoryStructures() + [("Detail widgets ({0} fields)".format(len(fields)), fields)]
+
 
     def selectUser(self, user_index):
         """
         Display detailed information about the currently selcted user
         :param data: current user data
         """
-        # Display the user information.
-        for i in range(self.user_info_grid.rowCount()-1):
-            headers = self.user_list.allHeaders()
-            value = self.user_list.data(user_index, header=headers[i])
-            self.updateTextfieldAtPosition(i, value)
+        # Display the user information. The text fields are not written back while they show a mix of the old and the
+        # new user, otherwise the intermediate sum would move the user to another row.
+        entry = list(self.user_list.data(user_index))
+        self._selecting_user = True
+        try:
+            for i in range(self.user_info_grid.rowCount()-1):
+                self.updateTextfieldAtPosition(i, entry[i])
+        finally:
+            self._selecting_user = False
 
         # Calculate new sum.
         self.updateSumLabel()
@@ -158,18 +323,15 @@ class MonoidMainWindow(QMainWindow):
         """
         Update the sum value based on the currently entered values.
         """
-        row = self.user_list.currentRow()
+        if self._sum_field is None:
+            return
 
         # Automaticlly calculate new sum value based on entered values.
-        points_field = [self.user_info_grid.itemAtPosition(i+1, 1).widget() for i in self.app.settings.header.point_indices]
-        expected = sum(str_to_points(text_field.text()) for text_field in points_field)
+        expected = sum(str_to_points(text_field.text()) for text_field in self._point_fields)
         new_value = points_to_str(expected)
 
         # Update user Interface with new value.
-        headers = self.user_list.allHeaders()
-        sum_idx = headers.index(self.app.settings.header.sum_field)
-        label = self.user_info_grid.itemAtPosition(sum_idx+1, 1).widget()
-        label.setText(new_value)
+        self._sum_field.setText(new_value)
 
     def updateHeaderLabels(self):
         """
@@ -180,6 +342,19 @@ class MonoidMainWindow(QMainWindow):
         for l, h in zip(lablels, headers):
             l.setText(h)
 
+    def textFieldChanged(self, header_index):
+        """
+        Called when the value of a textfield changes.
+        :param header_index: header index to determine the corresponding textfield and header
+        """
+        if self._selecting_user:
+            return
+        self.updateDataModel(header_index)
+
+        schema = self.app.schema
+        if schema is not None and header_index in schema.point_index_set:
+            self.updateSumLabel()
+
     def updateDataModel(self, header_index):
         """
         Update the data if the value of a textfield changes.
@@ -187,5 +362,7 @@ class MonoidMainWindow(QMainWindow):
         """
         header = self.user_list.allHeaders()[header_index]
         row = self.user_list.currentRow()
-        text_field = self.user_info_grid.itemAtPosition(header_index+1, 1).widget()
+        if row < 0:
+            return
+        text_field = self._text_fields[header_index]
         self.user_list.setData(row, text_field.text(), header=header)
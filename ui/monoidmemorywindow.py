@@ -0,0 +1,42 @@
+from PyQt5.QtGui import QFontDatabase
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QPlainTextEdit, QPushButton
+
+from util.memory import format_memory_report
+
+
+class MonoidMemoryWindow(QDialog):
+    """
+    Diagnostic window which displays the memory used by each data structure of the loaded roster and the top
+    allocation sites of the last load.
+    """
+
+    def __init__(self, app, *args, **kwargs):
+        super(MonoidMemoryWindow, self).__init__(*args, **kwargs)
+
+        self.setWindowTitle("Memory usage")
+        self.resize(700, 450)
+        self.app = app
+
+        self.report = QPlainTextEdit()
+        self.report.setReadOnly(True)
+        self.report.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refreshReport)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.report)
+        layout.addWidget(refresh_button)
+
+    def show(self, *args):
+        """
+        Measure the memory usage before showing the window.
+        """
+        self.refreshReport()
+        super(MonoidMemoryWindow, self).show(*args)
+
+    def refreshReport(self):
+        """
+        Measure all data structures again and update the report.
+        """
+        self.report.setPlainText(format_memory_report(self.app.memoryStructures(), self.app.memory_tracer))
@@ -42,6 +42,30 @@ class GeneralTab(QWidget):
         """
         self.settings.general.save_interval = value
 
+    def generationsValueChanged(self, value):
+        """
+        Called when the saved generations spin box value changes.
+        """
+        self.settings.general.state_generations = value
+
+    def undoMemoryValueChanged(self, value):
+        """
+        Called when the undo memory spin box value changes.
+        """
+        self.settings.general.undo_memory = value
+
+    def monitorIntervalValueChanged(self, value):
+        """
+        Called when the website monitor interval spin box value changes.
+        """
+        self.settings.general.monitor_interval = value
+
+    def maxPointsValueChanged(self, value):
+        """
+        Called when the maximal points spin box value changes.
+        """
+        self.settings.general.max_points = value
+
     def websiteFileFieldChanged(self, text):
         """
         Called when the text of the website / file field changes.
@@ -53,6 +77,34 @@ class GeneralTab(QWidget):
         elif self.launchOpt.currentIndex() == 1:
             self.settings.general.file_path = text
 
+    def resultsStoreFieldChanged(self, text):
+        """
+        Called when the text of the results store field changes.
+        :param text: new entered path
+        """
+        self.settings.general.results_store = text
+
+    def publishFieldChanged(self, text):
+        """
+        Called when the text of the publish target field changes.
+        :param text: new entered url
+        """
+        self.settings.general.publish_url = text
+
+    def publishVerifyFieldChanged(self, text):
+        """
+        Called when the text of the publish verification field changes.
+        :param text: new entered url
+        """
+        self.settings.general.publish_verify_url = text
+
+    def publishCompressedStateChanged(self, state):
+        """
+        Called when the compressed copy option changes.
+        :param state: new state Qt.Unchecked or Qt.Checked
+        """
+        self.settings.general.publish_compressed = (state == Qt.Checked)
+
     def enableSplashScreenStateChanged(self, state):
         """
         Called when the enable splash screen option changes.
@@ -82,6 +134,41 @@ class GeneralTab(QWidget):
         self.intervalSpinner.setMinimum(0)
         self.intervalSpinner.valueChanged.connect(self.saveIntervalValueChanged)
 
+        self.generationsSpinner = QSpinBox()
+        self.generationsSpinner.setMinimum(0)
+        self.generationsSpinner.valueChanged.connect(self.generationsValueChanged)
+
+        self.undoMemorySpinner = QSpinBox()
+        self.undoMemorySpinner.setMinimum(1)
+        self.undoMemorySpinner.setMaximum(4096)
+        self.undoMemorySpinner.valueChanged.connect(self.undoMemoryValueChanged)
+
+        self.monitorSpinner = QSpinBox()
+        self.monitorSpinner.setMinimum(0)
+        self.monitorSpinner.setMaximum(24 * 60)
+        self.monitorSpinner.valueChanged.connect(self.monitorIntervalValueChanged)
+
+        self.maxPointsSpinner = QSpinBox()
+        self.maxPointsSpinner.setMinimum(0)
+        self.maxPointsSpinner.setMaximum(1000)
+        self.maxPointsSpinner.valueChanged.connect(self.maxPointsValueChanged)
+
+        self.resultsStoreField = QLineEdit()
+        self.resultsStoreField.setPlaceholderText("Disabled")
+        self.resultsStoreField.textChanged.connect(self.resultsStoreFieldChanged)
+
+        self.publishField = QLineEdit()
+        self.publishField.setPlaceholderText("Disabled")
+        self.publishField.textChanged.connect(self.publishFieldChanged)
+
+        self.publishVerifyField = QLineEdit()
+        self.publishVerifyField.setPlaceholderText("Website url")
+        self.publishVerifyField.textChanged.connect(self.publishVerifyFieldChanged)
+
+        self.publishCompressedCheckBox = QCheckBox("Upload a compressed copy")
+        self.publishCompressedCheckBox.setToolTip("Upload a gzip compressed copy of the file with the suffix .gz.")
+        self.publishCompressedCheckBox.stateChanged.connect(self.publishCompressedStateChanged)
+
         self.splashScreenCheckBox = QCheckBox()
         self.splashScreenCheckBox.stateChanged.connect(self.enableSplashScreenStateChanged)
 
@@ -112,6 +199,44 @@ class GeneralTab(QWidget):
         layout.addWidget(label)
         layout.addWidget(self.intervalSpinner)
 
+        label = QLabel("Saved generations:")
+        label.setToolTip("Number of previous application states to keep for recovery.")
+        layout.addWidget(label)
+        layout.addWidget(self.generationsSpinner)
+
+        label = QLabel("Undo memory (MiB):")
+        label.setToolTip("Memory used to undo changes. The oldest changes are forgotten when the limit is reached.")
+        layout.addWidget(label)
+        layout.addWidget(self.undoMemorySpinner)
+
+        label = QLabel("Website monitor interval (minutes):")
+        label.setToolTip("Check the website for changes each n minutes. Choose 0 to disable the monitor.")
+        layout.addWidget(label)
+        layout.addWidget(self.monitorSpinner)
+
+        label = QLabel("Maximal points per release:")
+        label.setToolTip("Points above this limit are reported as problems before an export. Choose 0 to disable the "
+                         "limit.")
+        layout.addWidget(label)
+        layout.addWidget(self.maxPointsSpinner)
+
+        label = QLabel("Results store:")
+        label.setToolTip("Path to the SQLite database with the results of all school years.")
+        layout.addWidget(label)
+        layout.addWidget(self.resultsStoreField)
+
+        label = QLabel("Publish target:")
+        label.setToolTip("Url of the published php file: http(s)://user:password@host/path for HTTP PUT uploads, "
+                         "sftp://user@host/path or file:///path.")
+        layout.addWidget(label)
+        layout.addWidget(self.publishField)
+
+        label = QLabel("Verification url:")
+        label.setToolTip("Url to download the published file from to compare it with the uploaded data.")
+        layout.addWidget(label)
+        layout.addWidget(self.publishVerifyField)
+        layout.addWidget(self.publishCompressedCheckBox)
+
         layout.addWidget(splashScreenContainer)
 
         # Fill all the text fields.
@@ -128,6 +253,19 @@ class GeneralTab(QWidget):
 
         # Update the save interval stepper.
         self.intervalSpinner.setValue(self.settings.general.save_interval)
+        self.generationsSpinner.setValue(self.settings.general.state_generations)
+        self.undoMemorySpinner.setValue(self.settings.general.undo_memory)
+        self.monitorSpinner.setValue(self.settings.general.monitor_interval)
+        self.maxPointsSpinner.setValue(self.settings.general.max_points)
+
+        # Update the results store path.
+        self.resultsStoreField.setText(self.settings.general.results_store)
+
+        # Update the publish options.
+        self.publishField.setText(self.settings.general.publish_url)
+        self.publishVerifyField.setText(self.settings.general.publish_verify_url)
+        self.publishCompressedCheckBox.setCheckState(Qt.Checked if self.settings.general.publish_compressed else
+                                                     Qt.Unchecked)
 
         # Select the launch mode in the combo box and update the corresponding text field.
         launch_mode = self.settings.general.launch_mode
@@ -162,6 +300,20 @@ class HeaderTab(QWidget):
         """
         self.settings.header.sum_field = text
 
+    def gradeFieldChanged(self, text):
+        """
+        Called when the grade field value changes.
+        :param text: new entered text
+        """
+        self.settings.header.grade_field = text
+
+    def schoolFieldChanged(self, text):
+        """
+        Called when the school field value changes.
+        :param text: new entered text
+        """
+        self.settings.header.school_field = text
+
     def loadSettings(self):
         """
         Fill the ui with the stored values.
@@ -170,6 +322,8 @@ class HeaderTab(QWidget):
         # Update the text fields.
         self.nameField.setText(self.settings.header.name_field)
         self.sumField.setText(self.settings.header.sum_field)
+        self.gradeField.setText(self.settings.header.grade_field)
+        self.schoolField.setText(self.settings.header.school_field)
 
         # Update the Spinner to only allow valid values.
         point_fields_range = self.settings.header.point_indices
@@ -190,6 +344,13 @@ class HeaderTab(QWidget):
         self.sumField = QLineEdit()
         self.sumField.textChanged.connect(self.sumFieldChanged)
 
+        # Name of grade and school fields used to group the statistics.
+        self.gradeField = QLineEdit()
+        self.gradeField.textChanged.connect(self.gradeFieldChanged)
+
+        self.schoolField = QLineEdit()
+        self.schoolField.textChanged.connect(self.schoolFieldChanged)
+
         # Create spinner to configure point fields.
         self.lowerSpinner = QSpinBox()
         self.lowerSpinner.valueChanged.connect(self.spinnerValueChanged)
@@ -214,6 +375,10 @@ class HeaderTab(QWidget):
         layout.addWidget(self.nameField)
         layout.addWidget(QLabel("Sum field:"))
         layout.addWidget(self.sumField)
+        layout.addWidget(QLabel("Grade field:"))
+        layout.addWidget(self.gradeField)
+        layout.addWidget(QLabel("School field:"))
+        layout.addWidget(self.schoolField)
         layout.addWidget(QLabel("Point fields:"))
         layout.addWidget(spinnerContainer)
 
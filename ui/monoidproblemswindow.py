@@ -0,0 +1,205 @@
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QTreeWidget, QTreeWidgetItem, QAbstractItemView
+
+from util.validation import PointValidator, PointProblemList
+from .changebatcher import ChangeBatcher
+
+
+class MonoidProblemsWindow(QDialog):
+    """
+    List all point and sum cells which are not a number, exceed the maximal points of a release or do not add up. The
+    problems are found once when the data is loaded and updated entry by entry on each edit. Large batches of edits
+    validate all entries again instead. Double click a problem to select the student.
+    """
+
+    # Maximal number of problems shown in the list.
+    MAX_SHOWN_PROBLEMS = 1000
+
+    def __init__(self, app, *args, **kwargs):
+        super(MonoidProblemsWindow, self).__init__(*args, **kwargs)
+
+        self.setWindowTitle("Point problems")
+        self.resize(700, 400)
+        self.app = app
+        self._model = None
+        # Problems of all entries or None if the headers do not match the header settings.
+        self.problem_list = None
+        # Entry of each problem shown in the list. The entries are referenced directly, because the rows change when
+        # the data is sorted.
+        self._shown_entries = []
+
+        self.summary = QLabel()
+
+        self.tree = QTreeWidget()
+        self.tree.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.tree.setRootIsDecorated(False)
+        self.tree.setColumnCount(4)
+        self.tree.setHeaderLabels(["Name", "Column", "Value", "Problem"])
+        self.tree.itemDoubleClicked.connect(self.selectStudent)
+
+        # Coalesce multiple edits into a single list refresh.
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.timeout.connect(self.refreshTree)
+
+        # Changes since the event loop last ran. All entries are validated again after large batches.
+        self._batch = ChangeBatcher(parent=self)
+        self._batch.rebuildNeeded.connect(self.finishBatch)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.summary)
+        layout.addWidget(self.tree)
+
+        app.schemaChanged.connect(self.schemaChanged)
+
+    def show(self, *args):
+        """
+        Refresh the list before showing the window.
+        """
+        self.refreshTree()
+        super(MonoidProblemsWindow, self).show(*args)
+
+    def setSourceModel(self, model):
+        """
+        Observe a new data model and validate all entries.
+        :param model: DataModel instance of the user list
+        """
+        if self._model is not None:
+            self._model.valueChanged.disconnect(self.valueChanged)
+            self._model.rowsInserted.disconnect(self.rowsInserted)
+            self._model.rowsAboutToBeRemoved.disconnect(self.rowsAboutToBeRemoved)
+            self._model.modelReset.disconnect(self.rebuildProblems)
+
+        self._model = model
+        model.valueChanged.connect(self.valueChanged)
+        model.rowsInserted.connect(self.rowsInserted)
+        model.rowsAboutToBeRemoved.connect(self.rowsAboutToBeRemoved)
+        model.modelReset.connect(self.rebuildProblems)
+
+        self.rebuildProblems()
+
+    def rebuildProblems(self):
+        """
+        Validate all entries again, e.g. after the headers or the maximal points changed.
+        """
+        if self._model is None:
+            return
+
+        if self.app.schema is None:
+            self.problem_list = None
+        else:
+            validator = PointValidator(self.app.schema, self.app.settings.general.max_points)
+            self.problem_list = PointProblemList(validator)
+            self.problem_list.rebuild(self._model.list_data)
+        self._batch.reset()
+
+        self.scheduleRefresh()
+
+    def schemaChanged(self, schema):
+        """
+        Validate all entries again if the point or sum columns changed.
+        :param schema: HeaderSchema or None
+        """
+        validator = self.problem_list.validator if self.problem_list is not None else None
+        if schema is not None and validator is not None and validator.point_indices == tuple(schema.point_indices) \
+                and validator.sum_index == schema.sum_index:
+            return
+        self.rebuildProblems()
+
+    def problems(self, entries=None):
+        """
+        :param entries: only return the problems of these entries (None for all problems)
+        :return list of PointProblem
+        """
+        if self._batch.isStale():
+            self.rebuildProblems()
+        return [] if self.problem_list is None else self.problem_list.problems(entries)
+
+    def finishBatch(self):
+        """
+        Validate all entries again after a large batch of changes. While the window is hidden this is deferred until
+        it is shown or the problems are requested.
+        """
+        if self.isVisible():
+            self.rebuildProblems()
+
+    def valueChanged(self, row, column, old_value, new_value):
+        """
+        Validate an edited entry.
+        """
+        if self.problem_list is None or self._batch.countChanges(1):
+            return
+        if column == -1:
+            self.problem_list.remove(old_value)
+            self.problem_list.update(new_value)
+        else:
+            self.problem_list.update(self._model.list_data[row])
+        self.scheduleRefresh()
+
+    def rowsInserted(self, parent, first, last):
+        """
+        Validate the new entries.
+        """
+        if self.problem_list is None or self._batch.countChanges(last - first + 1):
+            return
+        for entry in self._model.list_data[first:last+1]:
+            self.problem_list.update(entry)
+        self.scheduleRefresh()
+
+    def rowsAboutToBeRemoved(self, parent, first, last):
+        """
+        Forget the problems of the entries before they are deleted.
+        """
+        if self.problem_list is None or self._batch.countChanges(last - first + 1):
+            return
+        for entry in self._model.list_data[first:last+1]:
+            self.problem_list.remove(entry)
+        self.scheduleRefresh()
+
+    def scheduleRefresh(self):
+        """
+        Refresh the list on the next run of the event loop if the window is visible.
+        """
+        if self.isVisible():
+            self._refresh_timer.start(0)
+
+    def refreshTree(self):
+        """
+        Fill the list with the current problems.
+        """
+        problems = self.problems()
+        self.tree.clear()
+        self._shown_entries = []
+        if self.problem_list is None:
+            self.summary.setText("The headers do not match the header settings.")
+            return
+
+        headers = self.app.win.user_list.allHeaders()
+        name_index = self.app.schema.name_index
+        if not problems:
+            self.summary.setText("All points are valid.")
+        elif len(problems) > self.MAX_SHOWN_PROBLEMS:
+            self.summary.setText("{0} problems, the first {1} are shown.".format(len(problems),
+                                                                                  self.MAX_SHOWN_PROBLEMS))
+        else:
+            self.summary.setText("{0} problems".format(len(problems)))
+
+        for problem in problems[:self.MAX_SHOWN_PROBLEMS]:
+            item = QTreeWidgetItem([problem.entry[name_index], headers[problem.column], problem.entry[problem.column],
+                                    problem.reason])
+            self.tree.addTopLevelItem(item)
+            self._shown_entries.append(problem.entry)
+        for column in range(self.tree.columnCount()):
+            self.tree.resizeColumnToContents(column)
+
+    def selectStudent(self, item):
+        """
+        Select the student of a problem in the main window.
+        """
+        entry = self._shown_entries[self.tree.indexOfTopLevelItem(item)]
+        for row, e in enumerate(self._model.list_data):
+            if e is entry:
+                self.app.win.user_list.setCurrentRow(row)
+                self.app.win.raise_()
+                self.app.win.activateWindow()
+                return
@@ -0,0 +1,182 @@
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QComboBox, QTableWidget, QTableWidgetItem, QAbstractItemView
+
+from util.statistics import RosterStatistics, TOTAL_GROUP, TOTAL_TITLE, statistics_columns, format_points
+from .changebatcher import ChangeBatcher
+
+
+class MonoidStatisticsWindow(QDialog):
+    """
+    Statistics panel which displays count, mean, median and top scorer for each release and the sum grouped by school
+    and grade. The statistics are computed once when the data is loaded and updated incrementally on each edit. Large
+    batches of edits compute them again instead.
+    """
+
+    # Title and group columns (as offset into the [school, grade] list) for each grouping option.
+    GROUPINGS = [("School and grade", [0, 1]), ("School", [0]), ("Grade", [1])]
+
+    def __init__(self, app, *args, **kwargs):
+        super(MonoidStatisticsWindow, self).__init__(*args, **kwargs)
+
+        self.setWindowTitle("Statistics")
+        self.resize(800, 400)
+        self.app = app
+        self.stats = None
+        self._model = None
+
+        self.groupingOpt = QComboBox()
+        self.groupingOpt.addItems([title for title, _ in self.GROUPINGS])
+        self.groupingOpt.currentIndexChanged.connect(self.rebuildStatistics)
+
+        self.table = QTableWidget()
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+
+        # Coalesce multiple edits into a single table refresh.
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.timeout.connect(self.refreshTable)
+
+        # Changes since the event loop last ran. The statistics are computed again after large batches.
+        self._batch = ChangeBatcher(parent=self)
+        self._batch.rebuildNeeded.connect(self.finishBatch)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.groupingOpt)
+        layout.addWidget(self.table)
+
+        app.schemaChanged.connect(self.rebuildStatistics)
+
+    def show(self, *args):
+        """
+        Refresh the table before showing the window.
+        """
+        self.refreshTable()
+        super(MonoidStatisticsWindow, self).show(*args)
+
+    def setSourceModel(self, model):
+        """
+        Observe a new data model and recompute all statistics.
+        :param model: DataModel instance of the user list
+        """
+        if self._model is not None:
+            self._model.valueChanged.disconnect(self.valueChanged)
+            self._model.rowsInserted.disconnect(self.rowsInserted)
+            self._model.rowsAboutToBeRemoved.disconnect(self.rowsAboutToBeRemoved)
+            self._model.modelReset.disconnect(self.rebuildStatistics)
+
+        self._model = model
+        model.valueChanged.connect(self.valueChanged)
+        model.rowsInserted.connect(self.rowsInserted)
+        model.rowsAboutToBeRemoved.connect(self.rowsAboutToBeRemoved)
+        model.modelReset.connect(self.rebuildStatistics)
+
+        self.rebuildStatistics()
+
+    def rebuildStatistics(self):
+        """
+        Recompute the statistics for the current grouping.
+        """
+        if self._model is None:
+            return
+
+        try:
+            name_idx, group_indices, value_indices = statistics_columns(self.app.schema)
+        except (AttributeError, ValueError):
+            # There is no valid schema or the configured header fields do not exist in the loaded data.
+            self.stats = None
+        else:
+            _, offsets = self.GROUPINGS[self.groupingOpt.currentIndex()]
+            group_indices = [group_indices[i] for i in offsets]
+            self.stats = RosterStatistics(self._model.list_data, name_idx, group_indices, value_indices)
+        self._batch.reset()
+
+        self.scheduleRefresh()
+
+    def finishBatch(self):
+        """
+        Compute the statistics again after a large batch of changes. While the window is hidden this is deferred until
+        it is shown.
+        """
+        if self.isVisible():
+            self.rebuildStatistics()
+
+    def valueChanged(self, row, column, old_value, new_value):
+        """
+        Update the statistics after an edit.
+        """
+        if self.stats is None or self._batch.countChanges(1):
+            return
+        if column == -1:
+            self.stats.remove_entry(old_value)
+            self.stats.add_entry(new_value)
+        else:
+            self.stats.update_value(self._model.list_data[row], column, old_value)
+        self.scheduleRefresh()
+
+    def rowsInserted(self, parent, first, last):
+        """
+        Include the new rows in the statistics.
+        """
+        if self.stats is None or self._batch.countChanges(last - first + 1):
+            return
+        for entry in self._model.list_data[first:last+1]:
+            self.stats.add_entry(entry)
+        self.scheduleRefresh()
+
+    def rowsAboutToBeRemoved(self, parent, first, last):
+        """
+        Remove the rows from the statistics before they are deleted.
+        """
+        if self.stats is None or self._batch.countChanges(last - first + 1):
+            return
+        for entry in self._model.list_data[first:last+1]:
+            self.stats.remove_entry(entry)
+        self.scheduleRefresh()
+
+    def scheduleRefresh(self):
+        """
+        Refresh the table on the next run of the event loop if the window is visible.
+        """
+        if self.isVisible():
+            self._refresh_timer.start(0)
+
+    def refreshTable(self):
+        """
+        Fill the table with the current statistics.
+        """
+        if self._batch.isStale():
+            self.rebuildStatistics()
+        self.table.clear()
+        if self.stats is None:
+            self.table.setRowCount(0)
+            self.table.setColumnCount(0)
+            return
+
+        headers = self.app.win.user_list.allHeaders()
+        group_titles = [headers[i] for i in self.stats.group_indices]
+        value_titles = [headers[i] for i in self.stats.value_indices]
+
+        column_titles = group_titles + ["Count"]
+        for title in value_titles:
+            column_titles += [title + " count", title + " mean", title + " median", title + " top"]
+
+        groups = self.stats.groups() + [TOTAL_GROUP]
+        self.table.setColumnCount(len(column_titles))
+        self.table.setHorizontalHeaderLabels(column_titles)
+        self.table.setRowCount(len(groups))
+
+        for row, key in enumerate(groups):
+            titles = [TOTAL_TITLE] if key is TOTAL_GROUP else list(key)
+            cells = titles + [""]*(len(group_titles)-len(titles)) + [str(self.stats.count(key))]
+            for col in self.stats.statistics(key):
+                top = "{0} ({1})".format(col.top_scorer, format_points(col.top_points)) if col.count else "-"
+                cells += [str(col.count), format_points(col.mean), format_points(col.median), top]
+
+            for column, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if column >= len(group_titles):
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+        self.table.resizeColumnsToContents()
@@ -0,0 +1,107 @@
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QAction
+
+from .tableview import TableModel, TableView
+
+
+class MonoidTableWindow(QDialog):
+    """
+    Edit all columns of all students in a table. A block of cells copied from a spreadsheet can be pasted at the current
+    cell, it is applied as a single change which is undone at once.
+    """
+
+    def __init__(self, app, *args, **kwargs):
+        super(MonoidTableWindow, self).__init__(*args, **kwargs)
+
+        self.setWindowTitle("Table editor")
+        self.resize(1000, 600)
+        self.app = app
+        self._model = None
+
+        self.table = TableView()
+
+        def createAction(text, shortcut, slot):
+            action = QAction(text, self.table)
+            action.setShortcut(shortcut)
+            action.setShortcutContext(Qt.WidgetWithChildrenShortcut)
+            action.triggered.connect(slot)
+            self.table.addAction(action)
+
+        createAction("&Copy", QKeySequence.Copy, self.table.copySelection)
+        createAction("&Paste", QKeySequence.Paste, self.pasteBlock)
+        createAction("&Delete", QKeySequence.Delete, self.clearCells)
+        createAction("&Undo", QKeySequence.Undo, self.undo)
+        createAction("&Redo", QKeySequence.Redo, self.redo)
+        self.table.setContextMenuPolicy(Qt.ActionsContextMenu)
+
+        app.win.user_list.headersChanged.connect(self.headersChanged)
+        app.schemaChanged.connect(self.schemaChanged)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.table)
+
+    def setSourceModel(self, model):
+        """
+        Show the entries of a new data model.
+        :param model: DataModel instance of the user list
+        """
+        old_model = self._model
+        self._model = TableModel(model, self)
+        self._model.setHeaders(self.app.win.user_list.allHeaders())
+        self._model.setSchema(self.app.schema)
+        self.table.setModel(self._model)
+        if old_model is not None:
+            old_model.deleteLater()
+
+    def headersChanged(self, headers):
+        """
+        Show the new headers as columns.
+        :param headers: all header fields
+        """
+        if self._model is not None:
+            self._model.setHeaders(headers)
+
+    def schemaChanged(self, schema):
+        """
+        Update the point and sum columns.
+        :param schema: HeaderSchema or None
+        """
+        if self._model is not None:
+            self._model.setSchema(schema)
+
+    def pasteBlock(self):
+        """
+        Paste the cells of the clipboard as a single change.
+        """
+        self.app.undo_history.beginGroup("Paste")
+        try:
+            self.table.pasteBlock()
+        finally:
+            self.app.undo_history.endGroup()
+        self.app.win.refreshSelectedUser()
+
+    def clearCells(self):
+        """
+        Clear the selected cells as a single change.
+        """
+        self.app.undo_history.beginGroup("Clear cells")
+        try:
+            self.table.clearCells()
+        finally:
+            self.app.undo_history.endGroup()
+        self.app.win.refreshSelectedUser()
+
+    def undo(self):
+        """
+        Revert the last change of the data.
+        """
+        self.app.undo_history.undo()
+        self.app.undoHistoryApplied()
+
+    def redo(self):
+        """
+        Apply the last reverted change again.
+        """
+        self.app.undo_history.redo()
+        self.app.undoHistoryApplied()
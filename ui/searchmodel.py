@@ -0,0 +1,220 @@
+import bisect
+
+from PyQt5.QtCore import QAbstractProxyModel, QModelIndex, QPersistentModelIndex
+
+from util.search import SearchIndex
+
+
+class SearchFilterModel(QAbstractProxyModel):
+    """
+    Proxy model which only shows the entries of a DataModel which match a search text. The rows of the DataModel
+    stay unchanged. Without a search text all rows are shown and every change of the source model is forwarded
+    row by row. While a search text is set the matching rows are kept as a sorted list of source rows.
+
+    The SearchIndex is built on the first search and afterwards updated incrementally with each change of the data.
+    """
+
+    def __init__(self, source_model, parent=None):
+        super(SearchFilterModel, self).__init__(parent)
+
+        self._columns = ()
+        self._text = ""
+        self._index = None
+        # Sorted source rows of all matching entries or None if all rows are shown.
+        self._rows = None
+        # id(entry) -> source row, built on demand after the rows changed.
+        self._row_of = None
+        # Persistent indices of this model and of the source model during a layout change of the source model.
+        self._layout_indices = None
+
+        self.setSourceModel(source_model)
+
+    def setSourceModel(self, source_model):
+        super(SearchFilterModel, self).setSourceModel(source_model)
+
+        source_model.dataChanged.connect(self.sourceDataChanged)
+        source_model.valueChanged.connect(self.sourceValueChanged)
+        source_model.rowsAboutToBeInserted.connect(self.sourceRowsAboutToBeInserted)
+        source_model.rowsInserted.connect(self.sourceRowsInserted)
+        source_model.rowsAboutToBeRemoved.connect(self.sourceRowsAboutToBeRemoved)
+        source_model.rowsRemoved.connect(self.sourceRowsRemoved)
+        source_model.rowsAboutToBeMoved.connect(self.sourceLayoutAboutToBeChanged)
+        source_model.rowsMoved.connect(self.sourceLayoutChanged)
+        source_model.layoutAboutToBeChanged.connect(self.sourceLayoutAboutToBeChanged)
+        source_model.layoutChanged.connect(self.sourceLayoutChanged)
+        source_model.modelAboutToBeReset.connect(self.beginResetModel)
+        source_model.modelReset.connect(self.sourceModelReset)
+
+    def setSearchColumns(self, columns):
+        """
+        Change the columns which are searched.
+        :param columns: indices of the columns to search
+        """
+        columns = tuple(columns)
+        if columns != self._columns:
+            self._columns = columns
+            self._index = None
+            self.setSearchText(self._text, force=True)
+
+    def searchText(self):
+        """
+        :return current search text
+        """
+        return self._text
+
+    def setSearchText(self, text, force=False):
+        """
+        Only show the entries which contain a word starting with each word of the text.
+        :param text: search text (an empty text shows all entries)
+        :param force: True to filter the entries even if the text did not change
+        """
+        if text == self._text and not force:
+            return
+        self._text = text
+
+        self.beginResetModel()
+        self._rows = self._matchingRows()
+        self.endResetModel()
+
+    def _matchingRows(self):
+        if not self._text.strip() or not self._columns:
+            return None
+
+        data = self.sourceModel().list_data
+        if self._index is None:
+            self._index = SearchIndex(self._columns, data)
+
+        ids = self._index.search(self._text)
+        if ids is None:
+            return None
+        if self._row_of is None:
+            self._row_of = {id(entry): row for row, entry in enumerate(data)}
+        return sorted(self._row_of[i] for i in ids)
+
+    def isFiltered(self):
+        """
+        :return True if only a part of the entries is shown
+        """
+        return self._rows is not None
+
+    # Mapping between source and proxy rows.
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        row = proxy_index.row() if self._rows is None else self._rows[proxy_index.row()]
+        return self.sourceModel().index(row)
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = source_index.row()
+        if self._rows is not None:
+            pos = bisect.bisect_left(self._rows, row)
+            if pos == len(self._rows) or self._rows[pos] != row:
+                return QModelIndex()
+            row = pos
+        return self.index(row, 0)
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if parent.isValid() or not 0 <= row < self.rowCount() or column != 0:
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.sourceModel().rowCount() if self._rows is None else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return self.sourceModel().canFetchMore()
+
+    def fetchMore(self, parent=QModelIndex()):
+        self.sourceModel().fetchMore()
+
+    # Source model changes.
+
+    def sourceDataChanged(self, top_left, bottom_right, roles=()):
+        first, last = top_left.row(), bottom_right.row()
+        if self._rows is not None:
+            # Entries which do not match the search text anymore stay visible until the search text changes.
+            first = bisect.bisect_left(self._rows, first)
+            last = bisect.bisect_right(self._rows, last) - 1
+            if first > last:
+                return
+        self.dataChanged.emit(self.index(first), self.index(last), list(roles))
+
+    def sourceValueChanged(self, row, column, old_value, new_value):
+        if self._index is None:
+            return
+        if column == -1:
+            self._row_of = None
+            self._index.remove_entry(old_value)
+            self._index.add_entry(new_value)
+        else:
+            self._index.update_value(self.sourceModel().list_data[row], column, old_value)
+
+    def sourceRowsAboutToBeInserted(self, parent, first, last):
+        if self._rows is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+        else:
+            self.beginResetModel()
+
+    def sourceRowsInserted(self, parent, first, last):
+        self._row_of = None
+        if self._index is not None:
+            for entry in self.sourceModel().list_data[first:last+1]:
+                self._index.add_entry(entry)
+
+        if self._rows is None:
+            self.endInsertRows()
+        else:
+            self._rows = self._matchingRows()
+            self.endResetModel()
+
+    def sourceRowsAboutToBeRemoved(self, parent, first, last):
+        if self._index is not None:
+            for entry in self.sourceModel().list_data[first:last+1]:
+                self._index.remove_entry(entry)
+
+        if self._rows is None:
+            self.beginRemoveRows(QModelIndex(), first, last)
+        else:
+            self.beginResetModel()
+
+    def sourceRowsRemoved(self, parent, first, last):
+        self._row_of = None
+        if self._rows is None:
+            self.endRemoveRows()
+        else:
+            self._rows = self._matchingRows()
+            self.endResetModel()
+
+    def sourceLayoutAboutToBeChanged(self, *args):
+        # The source rows of the matching entries change, e.g. after sorting. Remember the source index of each
+        # persistent index, the source model updates them.
+        self.layoutAboutToBeChanged.emit()
+        indices = self.persistentIndexList()
+        self._layout_indices = (indices, [QPersistentModelIndex(self.mapToSource(i)) for i in indices])
+
+    def sourceLayoutChanged(self, *args):
+        self._row_of = None
+        self._rows = self._matchingRows()
+
+        indices, source_indices = self._layout_indices
+        self._layout_indices = None
+        source = self.sourceModel()
+        self.changePersistentIndexList(indices, [self.mapFromSource(source.index(i.row())) for i in source_indices])
+        self.layoutChanged.emit()
+
+    def sourceModelReset(self):
+        self._index = None
+        self._row_of = None
+        self._rows = self._matchingRows()
+        self.endResetModel()
@@ -0,0 +1,120 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class StreamLoader(QObject):
+    """
+    Load the row batches of a streaming parser (see stream_table) into a ListView while the event loop keeps running.
+    Each batch is merged into the already loaded rows in sorted order, so the first rows are visible immediately and
+    the user interface stays responsive while the remaining document is parsed.
+    """
+
+    # Emitted with the number of loaded rows after each batch.
+    progress = pyqtSignal(int)
+    # Emitted after the last batch was loaded.
+    finished = pyqtSignal()
+    # Emitted with the exception if a batch could not be parsed. The rows loaded so far are kept.
+    failed = pyqtSignal(object)
+    # Emitted before and after the rows of a batch are inserted into the model.
+    mergeStarted = pyqtSignal()
+    mergeFinished = pyqtSignal()
+
+    def __init__(self, batches, list_view, parent=None):
+        """
+        :param batches: iterator which yields (headers, rows) tuples
+        :param list_view: ListView which already contains the model for the headers
+        :param parent: parent QObject
+        """
+        super(StreamLoader, self).__init__(parent)
+
+        self._batches = batches
+        self._list_view = list_view
+        # Sorter of the model and the sort key for each loaded row. The keys are computed again before the next batch
+        # if the rows were changed by anything else than this loader.
+        self._sorter = None
+        self._keys = []
+        self._stale = True
+        # True while a batch is inserted.
+        self._merging = False
+
+        model = list_view.model()
+        model.valueChanged.connect(self.valueChanged)
+        model.rowsInserted.connect(self.invalidateKeys)
+        model.rowsRemoved.connect(self.invalidateKeys)
+        model.rowsMoved.connect(self.invalidateKeys)
+        model.layoutChanged.connect(self.invalidateKeys)
+        model.modelReset.connect(self.invalidateKeys)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.loadNextBatch)
+
+    def isRunning(self):
+        """
+        :return True if there are more batches to load
+        """
+        return self._timer.isActive()
+
+    def start(self):
+        """
+        Load the remaining batches on each run of the event loop.
+        """
+        self._timer.start()
+
+    def cancel(self):
+        """
+        Stop loading further batches.
+        """
+        self._timer.stop()
+        self._batches = iter(())
+
+    def invalidateKeys(self, *args):
+        """
+        Compute the sort keys again before the next batch, because the rows were changed while loading, e.g. a new
+        user was added or the rows were sorted in another order.
+        """
+        if not self._merging:
+            self._stale = True
+
+    def valueChanged(self, row, column, old_value, new_value):
+        """
+        Invalidate the sort keys if a value of a sort column was edited while loading.
+        """
+        if column == -1 or self._sorter is None or column in self._sorter.column_set:
+            self.invalidateKeys()
+
+    def mergeRows(self, rows):
+        """
+        Insert rows in the sort order of the model. See DataModel.insertSortedRows.
+        :param rows: list of new entries
+        """
+        model = self._list_view.model()
+        if self._stale or model.sorter() is not self._sorter:
+            self._sorter = model.sorter()
+            self._keys = sorted(self._sorter.key(e) for e in model.list_data)
+            self._stale = False
+
+        self._merging = True
+        self.mergeStarted.emit()
+        try:
+            model.insertSortedRows(rows, self._sorter.key, self._keys)
+        finally:
+            self._merging = False
+            self.mergeFinished.emit()
+
+    def loadNextBatch(self):
+        """
+        Parse and merge the next batch.
+        """
+        try:
+            _, rows = next(self._batches)
+        except StopIteration:
+            self._timer.stop()
+            self.finished.emit()
+            return
+        except Exception as e:
+            self._timer.stop()
+            self.failed.emit(e)
+            return
+
+        self.mergeRows(rows)
+        self.progress.emit(len(self._keys))
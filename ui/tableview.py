@@ -0,0 +1,275 @@
+from PyQt5.QtCore import QAbstractProxyModel, QModelIndex, QPersistentModelIndex, Qt
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QTableView, QHeaderView, QAbstractItemView, QApplication
+
+from util.helper import str_to_points, points_to_str
+
+
+def split_block(text):
+    """
+    Split a block of cells copied from a spreadsheet (tab separated cells, one row per line).
+    :param text: text of the clipboard
+    :return list of rows, each a list of cell values
+    """
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    # Spreadsheets end the last row with a line break.
+    if len(lines) > 1 and lines[-1] == "":
+        lines.pop()
+    return [line.split("\t") for line in lines]
+
+
+def join_block(rows):
+    """
+    :param rows: list of rows, each a list of cell values
+    :return text with tab separated cells and one row per line
+    """
+    return "\n".join("\t".join(row) for row in rows) + "\n"
+
+
+class TableModel(QAbstractProxyModel):
+    """
+    Proxy model which shows each header of a DataModel as a column. The rows are the rows of the DataModel, every
+    change of the source model is forwarded. Cells are only formatted when the view asks for them, so only the visible
+    cells are ever formatted.
+
+    All edits are written with DataModel.setValues. The sum of each edited row is calculated again in the same batch,
+    so an edit of many cells, e.g. a paste, is a single model update.
+    """
+
+    def __init__(self, source_model, parent=None):
+        super(TableModel, self).__init__(parent)
+
+        self._headers = []
+        self._sum_index = None
+        self._point_indices = ()
+        self._right_aligned = frozenset()
+        self._bold = QFont()
+        self._bold.setBold(True)
+        # Persistent indices of this model and of the source model during a layout change of the source model.
+        self._layout_indices = None
+
+        self.setSourceModel(source_model)
+
+    def setSourceModel(self, source_model):
+        super(TableModel, self).setSourceModel(source_model)
+
+        source_model.dataChanged.connect(self.sourceDataChanged)
+        source_model.rowsAboutToBeInserted.connect(self.sourceRowsAboutToBeInserted)
+        source_model.rowsInserted.connect(self.endInsertRows)
+        source_model.rowsAboutToBeRemoved.connect(self.sourceRowsAboutToBeRemoved)
+        source_model.rowsRemoved.connect(self.endRemoveRows)
+        source_model.rowsAboutToBeMoved.connect(self.sourceLayoutAboutToBeChanged)
+        source_model.rowsMoved.connect(self.sourceLayoutChanged)
+        source_model.layoutAboutToBeChanged.connect(self.sourceLayoutAboutToBeChanged)
+        source_model.layoutChanged.connect(self.sourceLayoutChanged)
+        source_model.modelAboutToBeReset.connect(self.beginResetModel)
+        source_model.modelReset.connect(self.endResetModel)
+
+    def setHeaders(self, headers):
+        """
+        Change the columns.
+        :param headers: all header fields
+        """
+        headers = list(headers)
+        if len(headers) != len(self._headers):
+            self.beginResetModel()
+            self._headers = headers
+            self.endResetModel()
+        else:
+            self._headers = headers
+            self.headerDataChanged.emit(Qt.Horizontal, 0, len(headers) - 1)
+
+    def setSchema(self, schema):
+        """
+        Change the point and sum columns.
+        :param schema: HeaderSchema or None if the headers do not match the header settings
+        """
+        self._sum_index = None if schema is None else schema.sum_index
+        self._point_indices = () if schema is None else schema.point_indices
+        self._right_aligned = frozenset(self._point_indices) | ({self._sum_index} - {None})
+        if self._headers:
+            self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, self.columnCount() - 1))
+
+    # Mapping between source and proxy rows.
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(proxy_index.row())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        return self.index(source_index.row(), 0)
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if parent.isValid() or not 0 <= row < self.rowCount() or not 0 <= column < self.columnCount():
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().rowCount()
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return self.sourceModel().canFetchMore()
+
+    def fetchMore(self, parent=QModelIndex()):
+        self.sourceModel().fetchMore()
+
+    # Data.
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._headers[section] if 0 <= section < len(self._headers) else None
+        return section + 1
+
+    def flags(self, index):
+        flags = Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        if index.column() != self._sum_index:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.sourceModel().list_data[index.row()][index.column()]
+        elif role == Qt.TextAlignmentRole and index.column() in self._right_aligned:
+            return Qt.AlignRight | Qt.AlignVCenter
+        elif role == Qt.FontRole and index.column() == self._sum_index:
+            return self._bold
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        self.setValues([(index.row(), index.column(), value)])
+        return True
+
+    def setValues(self, changes):
+        """
+        Change multiple cells with a single model update. Empty values are stored as "-", the sum column can not be
+        changed and the sum of each row with changed points is calculated again.
+        :param changes: list of (row, column, value) tuples
+        """
+        source = self.sourceModel()
+        point_set = frozenset(self._point_indices)
+
+        values = {}
+        for row, column, value in changes:
+            if column != self._sum_index:
+                values[(row, column)] = value.strip() or "-"
+
+        if self._sum_index is not None:
+            for row in {row for row, column in values if column in point_set}:
+                entry = source.list_data[row]
+                total = sum(str_to_points(values.get((row, i), entry[i])) for i in self._point_indices)
+                values[(row, self._sum_index)] = points_to_str(total)
+
+        source.setValues([(row, column, value) for (row, column), value in values.items()])
+
+    # Source model changes.
+
+    def sourceDataChanged(self, top_left, bottom_right, roles=()):
+        if self._headers:
+            self.dataChanged.emit(self.index(top_left.row(), 0), self.index(bottom_right.row(), len(self._headers) - 1),
+                                  list(roles))
+
+    def sourceRowsAboutToBeInserted(self, parent, first, last):
+        self.beginInsertRows(QModelIndex(), first, last)
+
+    def sourceRowsAboutToBeRemoved(self, parent, first, last):
+        self.beginRemoveRows(QModelIndex(), first, last)
+
+    def sourceLayoutAboutToBeChanged(self, *args):
+        # The rows of the entries change, e.g. after sorting. Remember the source index of each persistent index, the
+        # source model updates them.
+        self.layoutAboutToBeChanged.emit()
+        indices = self.persistentIndexList()
+        self._layout_indices = (indices, [QPersistentModelIndex(self.mapToSource(i)) for i in indices])
+
+    def sourceLayoutChanged(self, *args):
+        indices, source_indices = self._layout_indices
+        self._layout_indices = None
+        self.changePersistentIndexList(indices, [self.index(s.row(), i.column()) if s.isValid() else QModelIndex()
+                                                 for i, s in zip(indices, source_indices)])
+        self.layoutChanged.emit()
+
+
+class TableView(QTableView):
+    """
+    Spreadsheet like view of a TableModel. All rows have the same height and the columns are not sized to their
+    contents, so the view only touches the visible cells and stays fast for large rosters. Blocks of cells can be
+    copied, pasted and cleared.
+    """
+
+    def __init__(self, parent=None):
+        super(TableView, self).__init__(parent)
+
+        self.setWordWrap(False)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed |
+                             QAbstractItemView.AnyKeyPressed)
+
+        # Uniform row heights: the position of each row is calculated instead of measured.
+        vertical_header = self.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(self.fontMetrics().height() + 6)
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+
+    def selectedBlock(self):
+        """
+        :return (first row, first column, last row, last column) of the bounding box of the selection or None
+        """
+        ranges = self.selectionModel().selection() if self.selectionModel() else []
+        if not ranges:
+            return None
+        return (min(r.top() for r in ranges), min(r.left() for r in ranges),
+                max(r.bottom() for r in ranges), max(r.right() for r in ranges))
+
+    def copySelection(self):
+        """
+        Copy the selected cells as tab separated text.
+        """
+        block = self.selectedBlock()
+        if block is None:
+            return
+        top, left, bottom, right = block
+        data = self.model().sourceModel().list_data
+        QApplication.clipboard().setText(join_block([data[row][left:right+1] for row in range(top, bottom + 1)]))
+
+    def pasteBlock(self, text=None):
+        """
+        Paste a block of tab separated cells at the current cell with a single model update. A single value is pasted
+        into every selected cell. Cells outside of the table are ignored. The pasted block is not selected, selecting
+        a large block is expensive.
+        :param text: text to paste (None to paste the text of the clipboard)
+        """
+        model = self.model()
+        current = self.currentIndex()
+        if model is None or not current.isValid():
+            return
+        rows = split_block(QApplication.clipboard().text() if text is None else text)
+
+        if len(rows) == 1 and len(rows[0]) == 1:
+            value = rows[0][0]
+            changes = [(i.row(), i.column(), value) for i in self.selectedIndexes()]
+        else:
+            row_count, column_count = model.rowCount(), model.columnCount()
+            changes = [(row, column, value)
+                       for row, cells in enumerate(rows, current.row()) if row < row_count
+                       for column, value in enumerate(cells, current.column()) if column < column_count]
+        model.setValues(changes)
+
+    def clearCells(self):
+        """
+        Clear the values of all selected cells with a single model update.
+        """
+        if self.model() is not None:
+            self.model().setValues([(i.row(), i.column(), "") for i in self.selectedIndexes()])
@@ -0,0 +1,369 @@
+import sys
+import time
+from collections import deque
+from itertools import groupby
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+
+# Estimated memory of a single recorded change without the removed or inserted entries.
+_DELTA_SIZE = 120
+
+# Text of the undo and redo actions for groups which were not started with a name.
+_DELTA_TEXTS = {"set": "Edit", "check": "Check", "insert": "Add student", "remove": "Remove student",
+                "headers": "Change headers"}
+
+# Consecutive edits of the same student within this number of seconds are undone at once, e.g. each typed character.
+MERGE_INTERVAL = 2.0
+
+
+class _Group(object):
+    """
+    All changes of a single user action.
+    """
+
+    __slots__ = ("text", "key", "deltas", "size", "time")
+
+    def __init__(self, text, key=None):
+        self.text = text
+        self.key = key
+        self.deltas = []
+        self.size = 0
+        self.time = time.monotonic()
+
+    def edited_entry(self):
+        """
+        :return the entry if all changes are edits of the same entry, otherwise None
+        """
+        entries = {id(d[1]) for d in self.deltas if d[0] == "set" and d[2] != -1}
+        if len(entries) != 1 or any(d[0] != "set" or d[2] == -1 for d in self.deltas):
+            return None
+        return self.deltas[0][1]
+
+
+class UndoHistory(QObject):
+    """
+    Undo and redo all changes of the DataModel of a ListView. The history observes the change signals of the model,
+    so every mutation is recorded without changing the code which edits the data.
+
+    Each change is stored as a compact delta which references the changed entry instead of its row, so sorting the
+    entries does not invalidate the history:
+    - ("set", entry, column, old value, new value), entry is None if column -1 replaced the whole entry
+    - ("check", entry, old state, new state)
+    - ("insert", entry)
+    - ("remove", entry, check state)
+    - ("headers", old headers, new headers)
+
+    All changes of a user action form a group, which is undone at once. Without an explicit group (see beginGroup)
+    all changes made during one run of the event loop form a group. Consecutive changes of the same kind are applied
+    with the bulk methods of the DataModel, so undoing an operation on thousands of rows is a single model update.
+    The oldest groups are dropped when the estimated memory of the history exceeds a limit.
+    """
+
+    # Emitted whenever the undo or redo stack changes.
+    changed = pyqtSignal()
+
+    def __init__(self, list_view, max_memory=16*1024*1024, parent=None):
+        """
+        :param list_view: ListView which holds the observed DataModel
+        :param max_memory: estimated number of bytes after which the oldest groups are dropped
+        :param parent: parent QObject
+        """
+        super(UndoHistory, self).__init__(parent)
+
+        self._list_view = list_view
+        self._model = None
+        self._headers = ()
+        self.max_memory = max_memory
+
+        self._undo = deque()
+        self._redo = []
+        self._memory = 0
+        # Group which receives the next changes and the nesting depth of beginGroup.
+        self._group = None
+        self._depth = 0
+        # True while the history applies changes itself or recording is paused.
+        self._paused = False
+
+        # Closes the implicit group on the next run of the event loop.
+        self._close_timer = QTimer(self)
+        self._close_timer.setSingleShot(True)
+        self._close_timer.setInterval(0)
+        self._close_timer.timeout.connect(self._closeGroup)
+
+        list_view.headersChanged.connect(self.headersChanged)
+
+    def setModel(self, model):
+        """
+        Observe a new model and clear the history.
+        :param model: DataModel of the list view
+        """
+        if self._model is not None:
+            self._model.valueChanged.disconnect(self.valueChanged)
+            self._model.checkStateChanged.disconnect(self.checkStateChanged)
+            self._model.rowsInserted.disconnect(self.rowsInserted)
+            self._model.rowsAboutToBeRemoved.disconnect(self.rowsAboutToBeRemoved)
+
+        self._model = model
+        model.valueChanged.connect(self.valueChanged)
+        model.checkStateChanged.connect(self.checkStateChanged)
+        model.rowsInserted.connect(self.rowsInserted)
+        model.rowsAboutToBeRemoved.connect(self.rowsAboutToBeRemoved)
+
+        self.clear()
+
+    def clear(self):
+        """
+        Remove all groups from the history.
+        """
+        self._close_timer.stop()
+        self._undo.clear()
+        self._redo = []
+        self._memory = 0
+        self._group = None
+        self._depth = 0
+        self._headers = tuple(self._list_view.allHeaders()) if self._list_view.hasHeaders() else ()
+        self.changed.emit()
+
+    def setPaused(self, paused):
+        """
+        Stop or continue recording changes, e.g. while a file is loaded.
+        :param paused: True to ignore all changes
+        """
+        self._paused = paused
+
+    def isPaused(self):
+        """
+        :return True if changes are not recorded
+        """
+        return self._paused
+
+    def memoryStructures(self):
+        """
+        :return list of (name, object) tuples with the recorded groups for a memory report
+        """
+        return [("Undo groups", list(self._undo)), ("Redo groups", self._redo)]
+
+    def memoryUsage(self):
+        """
+        :return estimated number of bytes used by all groups
+        """
+        return self._memory
+
+    # Grouping.
+
+    def beginGroup(self, text, key=None):
+        """
+        Record all changes until the matching endGroup call as a single group. Groups can be nested, the outermost
+        group is recorded.
+        :param text: name of the user action, e.g. "Change release number"
+        :param key: object which identifies a user action which is recorded in several steps, e.g. the batches of an
+                    import. The changes are added to the last group if it has the same key. None to start a new group.
+        """
+        if self._depth == 0:
+            self._closeGroup()
+            self._group = _Group(text, key)
+        self._depth += 1
+
+    def endGroup(self):
+        """
+        Finish the group started by beginGroup.
+        """
+        self._depth -= 1
+        if self._depth == 0:
+            self._closeGroup()
+
+    def _record(self, delta, size=_DELTA_SIZE):
+        if self._paused:
+            return
+        if self._group is None:
+            self._group = _Group(_DELTA_TEXTS[delta[0]])
+        if self._depth == 0:
+            self._close_timer.start()
+        self._group.deltas.append(delta)
+        self._group.size += size
+
+    def _closeGroup(self):
+        self._close_timer.stop()
+        group, self._group = self._group, None
+        if group is None or not group.deltas:
+            return
+
+        # Merge consecutive edits of the same entry, e.g. each typed character of a name, and the steps of an action
+        # which were not interrupted by other changes.
+        last = self._undo[-1] if self._undo and not self._redo else None
+        entry = group.edited_entry()
+        if last is not None and group.key is not None and last.key is group.key:
+            last.deltas.extend(group.deltas)
+            last.size += group.size
+            last.time = group.time
+            self._memory += group.size
+        elif last is not None and entry is not None and last.edited_entry() is entry and \
+                group.time - last.time < MERGE_INTERVAL:
+            self._mergeInto(last, group)
+        else:
+            self._undo.append(group)
+            self._memory += group.size
+
+        self._redo = []
+        self._limitMemory()
+        self.changed.emit()
+
+    def _mergeInto(self, last, group):
+        # Keep the first old value and the last new value of each column.
+        deltas = {}
+        for d in last.deltas + group.deltas:
+            first = deltas.get(d[2])
+            deltas[d[2]] = d if first is None else (d[0], d[1], d[2], first[3], d[4])
+        self._memory -= last.size
+        last.deltas = list(deltas.values())
+        last.size = len(last.deltas) * _DELTA_SIZE
+        last.time = group.time
+        self._memory += last.size
+
+    def _limitMemory(self):
+        # Always keep the last group, even if it alone exceeds the limit.
+        while self._memory > self.max_memory and len(self._undo) > 1:
+            self._memory -= self._undo.popleft().size
+
+    # Recording.
+
+    def valueChanged(self, row, column, old_value, new_value):
+        if column == -1:
+            self._record(("set", None, -1, old_value, new_value), _DELTA_SIZE + self._entrySize(old_value))
+        else:
+            self._record(("set", self._model.list_data[row], column, old_value, new_value))
+
+    def checkStateChanged(self, row, state):
+        old_state = Qt.Unchecked if state == Qt.Checked else Qt.Checked
+        self._record(("check", self._model.list_data[row], old_state, state))
+
+    def rowsInserted(self, parent, first, last):
+        for entry in self._model.list_data[first:last+1]:
+            self._record(("insert", entry), _DELTA_SIZE + self._entrySize(entry))
+
+    def rowsAboutToBeRemoved(self, parent, first, last):
+        for row in range(first, last+1):
+            entry = self._model.list_data[row]
+            self._record(("remove", entry, self._model.checkState(row)), _DELTA_SIZE + self._entrySize(entry))
+
+    def headersChanged(self, headers):
+        old_headers, self._headers = self._headers, tuple(headers)
+        if old_headers and old_headers != self._headers:
+            self._record(("headers", old_headers, self._headers), _DELTA_SIZE + 2 * sys.getsizeof(old_headers))
+
+    @staticmethod
+    def _entrySize(entry):
+        return sys.getsizeof(entry) + sum(sys.getsizeof(v) for v in entry)
+
+    # Undo and redo.
+
+    def canUndo(self):
+        """
+        :return True if there is a group to undo
+        """
+        return bool(self._undo) or (self._group is not None and bool(self._group.deltas))
+
+    def canRedo(self):
+        """
+        :return True if there is a group to redo
+        """
+        return bool(self._redo)
+
+    def undoText(self):
+        """
+        :return name of the group which is undone next or an empty string
+        """
+        return self._undo[-1].text if self._undo else ""
+
+    def redoText(self):
+        """
+        :return name of the group which is redone next or an empty string
+        """
+        return self._redo[-1].text if self._redo else ""
+
+    def undo(self):
+        """
+        Revert the last group.
+        """
+        self._closeGroup()
+        if not self._undo:
+            return
+        group = self._undo.pop()
+        self._memory -= group.size
+        self._apply(reversed(group.deltas), undo=True)
+        self._redo.append(group)
+        self.changed.emit()
+
+    def redo(self):
+        """
+        Apply the last undone group again.
+        """
+        if not self._redo:
+            return
+        group = self._redo.pop()
+        self._apply(group.deltas, undo=False)
+        self._undo.append(group)
+        self._memory += group.size
+        self._limitMemory()
+        self.changed.emit()
+
+    def _apply(self, deltas, undo):
+        """
+        Apply the deltas in order. Consecutive deltas of the same kind are applied with a single model update.
+        """
+        paused = self._paused
+        self._paused = True
+        try:
+            for kind, batch in groupby(deltas, key=lambda d: d[0]):
+                batch = list(batch)
+                if kind == "headers":
+                    self._list_view.updateHeaders(list(batch[-1][1] if undo else batch[-1][2]))
+                elif kind == "set":
+                    self._applyValues(batch, undo)
+                elif kind == "check":
+                    rows = self._rows([d[1] for d in batch])
+                    self._model.setCheckStates([(rows[id(d[1])], d[2] if undo else d[3]) for d in batch])
+                elif (kind == "insert") == undo:
+                    rows = self._rows([d[1] for d in batch])
+                    self._model.removeDataRows(rows.values())
+                else:
+                    self._insertEntries(batch)
+        finally:
+            self._paused = paused
+
+    def _applyValues(self, batch, undo):
+        targets = []
+        for _, entry, column, old_value, new_value in batch:
+            if column == -1:
+                # The whole entry was replaced, search for the entry which is currently part of the model.
+                entry = new_value if undo else old_value
+            targets.append(entry)
+
+        rows = self._rows(targets)
+        changes = []
+        for entry, (_, _, column, old_value, new_value) in zip(targets, batch):
+            value = old_value if undo else new_value
+            row = rows[id(entry)]
+            if column == -1:
+                # Later changes of the batch refer to the new entry.
+                rows[id(value)] = row
+            changes.append((row, column, value))
+        self._model.setValues(changes)
+
+    def _insertEntries(self, batch):
+        entries = [d[1] for d in batch]
+        self._model.insertSortedRows(entries, self._model.sorter().key)
+
+        # Removed entries get back their check state.
+        checked = [d[1] for d in batch if d[0] == "remove" and d[2] == Qt.Checked]
+        if checked:
+            rows = self._rows(checked)
+            self._model.setCheckStates([(row, Qt.Checked) for row in rows.values()])
+
+    def _rows(self, entries):
+        """
+        :return dictionary id(entry) -> current row for all entries
+        """
+        ids = {id(e) for e in entries}
+        return {id(e): row for row, e in enumerate(self._model.list_data) if id(e) in ids}
@@ -0,0 +1,117 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from util.monitor import WebsitePoller
+
+
+class WebsiteMonitor(QObject):
+    """
+    Poll the monoid website in the background. The requests and the parsing of a changed page run on a worker thread,
+    the GUI thread only starts a poll and receives the result. Unchanged pages are answered with a 304 response (see
+    WebsitePoller), so a poll is cheap.
+    """
+
+    # Emitted on the GUI thread with the headers and the user data of the website whenever the page changed.
+    pageChanged = pyqtSignal(object, object)
+    # Emitted on the GUI thread with the exception if a poll failed.
+    pollFailed = pyqtSignal(object)
+
+    # Internal signal to pass the result of the worker thread to the GUI thread.
+    _pollFinished = pyqtSignal(object, object)
+
+    def __init__(self, url, interval=0, parent=None):
+        """
+        :param url: url of the website
+        :param interval: minutes between two polls (0 to disable the monitor)
+        :param parent: parent QObject
+        """
+        super(WebsiteMonitor, self).__init__(parent)
+
+        self.poller = WebsitePoller(url)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future = None
+        # Set by shutdown. The lock makes sure that no result is emitted after shutdown returned.
+        self._closed = False
+        self._lock = threading.Lock()
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.poll)
+        self._pollFinished.connect(self._finishPoll)
+
+        self.setInterval(interval)
+
+    def setUrl(self, url):
+        """
+        Poll another website. The next poll reports the page even if it did not change. The url is changed on the
+        worker thread after a running poll.
+        :param url: url of the website
+        """
+        def change_url():
+            self.poller.url = url
+            self.poller.reset()
+        self._executor.submit(change_url)
+
+    def reset(self):
+        """
+        Report the page on the next poll even if it did not change. The poller is reset on the worker thread after a
+        running poll.
+        """
+        self._executor.submit(self.poller.reset)
+
+    def setInterval(self, interval):
+        """
+        Change the time between two polls.
+        :param interval: minutes between two polls (0 to disable the monitor)
+        """
+        if interval > 0:
+            self._timer.start(interval * 60 * 1000)
+        else:
+            self._timer.stop()
+
+    def isActive(self):
+        """
+        :return True if the website is polled on a schedule
+        """
+        return self._timer.isActive()
+
+    def isPolling(self):
+        """
+        :return True if a poll is running
+        """
+        return self._future is not None and not self._future.done()
+
+    def poll(self):
+        """
+        Start a poll on the worker thread unless the last poll is still running.
+        """
+        if self.isPolling():
+            return
+        self._future = self._executor.submit(self.poller.poll)
+        self._future.add_done_callback(self._pollDone)
+
+    def _pollDone(self, future):
+        # Called on the worker thread or, for a poll cancelled by shutdown, on the GUI thread. The signal is queued to
+        # the thread of the monitor.
+        with self._lock:
+            if self._closed:
+                return
+            error = future.exception()
+            self._pollFinished.emit(None if error is not None else future.result(), error)
+
+    def _finishPoll(self, result, error):
+        if error is not None:
+            self.pollFailed.emit(error)
+        elif result is not None:
+            self.pageChanged.emit(*result)
+
+    def shutdown(self):
+        """
+        Stop polling. Queued polls are cancelled and a running poll is not waited for, its result is dropped. No signal
+        is emitted after this returns, so the monitor can be deleted.
+        """
+        self._timer.stop()
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
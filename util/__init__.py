@@ -1,3 +1,3 @@
-from .config import DEFAULT_FILE, TEMPLATE_FILE, SAVED_APP_STATE_FILE
+from .config import DEFAULT_FILE, TEMPLATE_FILE, SAVED_APP_STATE_FILE, SAVED_APP_STATE_JOURNAL_FILE
 
-__all__ = ["DEFAULT_FILE", "TEMPLATE_FILE", "SAVED_APP_STATE_FILE"]
+__all__ = ["DEFAULT_FILE", "TEMPLATE_FILE", "SAVED_APP_STATE_FILE", "SAVED_APP_STATE_JOURNAL_FILE"]
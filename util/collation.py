@@ -0,0 +1,51 @@
+import unicodedata
+
+
+# Primary level of DIN 5007-1: umlauts are sorted like their base letter and ß like "ss".
+_PRIMARY_TRANSLITERATION = str.maketrans({"ß": "ss", "ẞ": "ss"})
+
+# Separates the levels of a collation key. It is smaller than any character of the text, so a shorter level always
+# sorts first like in a tuple.
+_LEVEL_SEPARATOR = "\x00"
+
+
+def _strip_accents(text):
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def collation_key(text):
+    """
+    Compute a sort key which orders german text like a dictionary (DIN 5007-1). The key has three levels:
+    the letters without case and accents ("Müller" is sorted like "muller", "Weiß" like "weiss"), then the accents
+    ("Muller" before "Müller") and at last the case (lower case first). E.g. "Öl" is sorted between "Oktober" and
+    "Olaf", while str.lower sorts it behind "Zoe".
+    :param text: text to sort
+    :return key string, which can be compared with the keys of other texts
+    """
+    # str.casefold would already replace ß, which belongs to the second level.
+    lower = text.lower()
+    primary = _strip_accents(lower.translate(_PRIMARY_TRANSLITERATION))
+    return _LEVEL_SEPARATOR.join((primary, lower, text.swapcase()))
+
+
+class CollationCache(dict):
+    """
+    Map each text to its collation key. The key of each distinct text is only computed once. Since many rows share
+    equal values (e.g. the schools), the cache usually holds far less keys than there are rows.
+    """
+
+    __slots__ = ("max_size",)
+
+    def __init__(self, max_size=None):
+        """
+        :param max_size: number of keys after which the cache is cleared (None for no limit)
+        """
+        super(CollationCache, self).__init__()
+        self.max_size = max_size
+
+    def __missing__(self, text):
+        # Drop the keys of old values, e.g. of each intermediate text while a name is typed.
+        if self.max_size is not None and len(self) >= self.max_size:
+            self.clear()
+        key = self[text] = collation_key(text)
+        return key
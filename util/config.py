@@ -10,6 +10,10 @@ DEFAULT_FILE = "loeser.php"
 TEMPLATE_FILE = "template.php"
 # Default file for the last saved application state.
 SAVED_APP_STATE_FILE = "savedApplicationState.dat"
+# Default file for the journal of all changes since the last saved application state.
+SAVED_APP_STATE_JOURNAL_FILE = "savedApplicationState.journal"
+# Default file with the content hash of the last publish to each target.
+PUBLISH_STATE_FILE = "publishState.json"
 # Default settings file.
 SETTINGS_FILE = "preferences.ini"
 
@@ -36,6 +40,56 @@ class Map(defaultdict):
     __delattr__ = defaultdict.__delitem__
 
 
+class SettingsSection(Map):
+    """
+    Map with all settings of a section, which informs the observers of the settings about each changed value.
+    """
+
+    def __init__(self, name, observers):
+        super(SettingsSection, self).__init__()
+        # Bypass __setattr__, which would store these attributes as settings.
+        self.__dict__["_name"] = name
+        self.__dict__["_observers"] = observers
+
+    def __setitem__(self, key, value):
+        old_value = self.get(key)
+        super(SettingsSection, self).__setitem__(key, value)
+        if old_value != value:
+            for callback in list(self._observers):
+                callback(self._name, key, value)
+
+    __setattr__ = __setitem__
+
+
+class Settings(Map):
+    """
+    Map of all settings sections. Use subscribe to get informed about changed values.
+    """
+
+    def __init__(self):
+        super(Settings, self).__init__()
+        self.__dict__["_observers"] = []
+
+    def __missing__(self, key):
+        section = SettingsSection(key, self._observers)
+        defaultdict.__setitem__(self, key, section)
+        return section
+
+    def subscribe(self, callback):
+        """
+        Call a function whenever a setting changes.
+        :param callback: function (section, key, value)
+        """
+        self._observers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        Stop calling a function when a setting changes.
+        :param callback: function passed to subscribe
+        """
+        self._observers.remove(callback)
+
+
 def load_settings():
     """
     Load all settings and store them inside of a dictionary.
@@ -47,15 +101,26 @@ def load_settings():
         "launch_mode": (int, 0),
         "website_url": (str, "http://monoid.mathematik.uni-mainz.de/loeser.php"),
         "file_path": (str, ""),
+        "results_store": (str, ""),
         "save_interval": (int, 60),
+        "state_generations": (int, 3),
+        "compress_state": (bool, True),
+        "undo_memory": (int, 16),
+        "publish_url": (str, ""),
+        "publish_verify_url": (str, ""),
+        "publish_compressed": (bool, False),
+        "monitor_interval": (int, 0),
+        "max_points": (int, 20),
         "enable_splashscreen": (bool, True),
         "Header/name_field": (str, "Name"),
         "Header/sum_field": (str, "Summe"),
+        "Header/grade_field": (str, "Stufe"),
+        "Header/school_field": (str, "Schule"),
         "Header/point_indices": (range, range(3,7))
     }
 
     # Construct a dictionary with subdictionaries for each section.
-    prefs_dict = Map(Map)
+    prefs_dict = Settings()
 
     for k, v in key_types_dict.items():
         split_k = k.split("/")
@@ -0,0 +1,240 @@
+import csv
+import codecs
+from collections import namedtuple
+
+from .helper import POINTS_PATTERN, fold_words, points_to_str
+from .rollover import EMPTY_CELL
+
+
+# Number of students imported at once.
+CSV_BATCH_SIZE = 1000
+
+# Number of bytes read to detect the encoding and the delimiter of a file.
+CSV_SAMPLE_SIZE = 64 * 1024
+
+# Delimiters of spreadsheet exports. German spreadsheets use a semicolon, because the comma is the decimal separator.
+CSV_DELIMITERS = ";,\t"
+
+# Maximal number of distinct point cells remembered by the validation.
+_MAX_CACHED_POINTS = 10000
+
+
+class CsvImportException(Exception):
+    pass
+
+
+# A row of the CSV file which was not imported:
+# - line: line number of the row inside the file (the header line is line 1)
+# - cells: all cells of the row
+# - reason: why the row was rejected
+RejectedRow = namedtuple("RejectedRow", ["line", "cells", "reason"])
+
+
+def detect_csv_format(sample):
+    """
+    Detect the encoding and the delimiter of a CSV file. Files with a byte order mark or valid UTF-8 are read as UTF-8,
+    all other files as Windows-1252, the encoding of older spreadsheet exports.
+    :param sample: first bytes of the file
+    :return encoding, csv dialect
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    else:
+        try:
+            sample.decode("utf-8")
+            encoding = "utf-8"
+        except UnicodeDecodeError as e:
+            # The sample might end inside of a multi-byte character.
+            encoding = "utf-8" if e.start >= len(sample) - 3 else "cp1252"
+
+    text = sample.decode(encoding, errors="ignore")
+    # Only look at complete lines.
+    if "\n" in text:
+        text = text[:text.rindex("\n")]
+    try:
+        dialect = csv.Sniffer().sniff(text, CSV_DELIMITERS)
+    except csv.Error:
+        dialect = csv.excel
+    return encoding, dialect
+
+
+def map_columns(csv_headers, headers):
+    """
+    Find the column of the CSV file for each header. The headers are compared independent of case, umlauts and
+    punctuation.
+    :param csv_headers: header line of the CSV file
+    :param headers: headers of the loaded data
+    :return list with the index of the CSV column for each header or None if the file has no such column
+    """
+    positions = {}
+    for i, header in enumerate(csv_headers):
+        positions.setdefault(" ".join(fold_words(header)), i)
+    return [positions.get(" ".join(fold_words(header))) for header in headers]
+
+
+def normalize_points(text):
+    """
+    :param text: content of a point cell
+    :return points in the format of the website (e.g. "2,5" or "-" for no points) or None if the text is not a number
+    """
+    text = text.strip()
+    if not text or text == EMPTY_CELL:
+        return EMPTY_CELL
+    if POINTS_PATTERN.fullmatch(text) is None:
+        return None
+    return points_to_str(float(text.replace(",", ".")))
+
+
+class CsvImporter(object):
+    """
+    Import students from a CSV file, e.g. the export of a spreadsheet. The columns of the file are mapped onto the
+    headers of the loaded data by their names. Columns which do not exist in the file are left empty, additional
+    columns of the file are ignored. If the file contains point columns, the sum is calculated from the points.
+
+    The file is read in batches, so that only a single batch is held in memory. The point cells of a batch are
+    validated column by column and each distinct cell is only checked once. Rows with missing cells, without a name
+    or with invalid points are collected in rejected instead of aborting the import.
+    """
+
+    def __init__(self, path, headers, schema, batch_size=CSV_BATCH_SIZE):
+        """
+        Read the header line of the file and map its columns.
+        :param path: path of the CSV file
+        :param headers: headers of the loaded data
+        :param schema: HeaderSchema of the headers
+        :param batch_size: number of students yielded at once by batches
+        :raise CsvImportException if the file has no name column
+        """
+        self.path = path
+        self.headers = list(headers)
+        self.schema = schema
+        self.batch_size = batch_size
+
+        with open(path, "rb") as f:
+            self.encoding, self.dialect = detect_csv_format(f.read(CSV_SAMPLE_SIZE))
+        with open(path, "r", encoding=self.encoding, errors="replace", newline="") as f:
+            self.csv_headers = next(csv.reader(f, self.dialect), None)
+        if not self.csv_headers:
+            raise CsvImportException("The file {0} is empty.".format(path))
+
+        self.columns = map_columns(self.csv_headers, self.headers)
+        if self.columns[schema.name_index] is None:
+            raise CsvImportException("The file has no column {0}.".format(self.headers[schema.name_index]))
+
+        self.rejected = []
+        self.imported = 0
+
+    def missing_headers(self):
+        """
+        :return headers which do not exist in the file
+        """
+        return [h for h, column in zip(self.headers, self.columns) if column is None]
+
+    def ignored_headers(self):
+        """
+        :return headers of the file which are not imported
+        """
+        used = set(self.columns)
+        return [h for i, h in enumerate(self.csv_headers) if i not in used]
+
+    def batches(self):
+        """
+        Read all students of the file. The rows are yielded in the order of the file, they are not sorted.
+        :return generator which yields the headers and a list of new entries for each batch
+        """
+        schema = self.schema
+        columns = self.columns
+        width = max(c for c in columns if c is not None) + 1
+        point_indices = [i for i in schema.point_indices if columns[i] is not None]
+        # Without point columns the sum of the file is imported.
+        if point_indices:
+            number_indices = point_indices
+        else:
+            number_indices = [schema.sum_index] if columns[schema.sum_index] is not None else []
+
+        # Normalized points (or None if invalid) of each distinct cell.
+        points_cache = {}
+
+        with open(self.path, "r", encoding=self.encoding, errors="replace", newline="") as f:
+            reader = csv.reader(f, self.dialect)
+            next(reader, None)
+
+            while True:
+                entries, lines = [], []
+                for cells in reader:
+                    if not "".join(cells).strip():
+                        continue
+                    if len(cells) < width:
+                        self.rejected.append(RejectedRow(reader.line_num, cells, "missing cells"))
+                        continue
+                    entries.append([(cells[c].strip() or EMPTY_CELL) if c is not None else EMPTY_CELL
+                                    for c in columns])
+                    lines.append((reader.line_num, cells))
+                    if len(entries) >= self.batch_size:
+                        break
+
+                if len(points_cache) > _MAX_CACHED_POINTS:
+                    points_cache.clear()
+                batch = self._validate(entries, lines, number_indices, points_cache)
+                if point_indices:
+                    for entry in batch:
+                        entry[schema.sum_index] = points_to_str(sum(
+                            float(entry[i].replace(",", ".")) for i in schema.point_indices if entry[i] != EMPTY_CELL))
+
+                self.imported += len(batch)
+                yield self.headers, batch
+
+                if len(entries) < self.batch_size:
+                    return
+
+    def _validate(self, entries, lines, number_indices, points_cache):
+        """
+        Validate and normalize the numeric cells of a batch column by column.
+        :return list of valid entries, all other entries are rejected
+        """
+        reasons = {}
+        name_index = self.schema.name_index
+        for pos, entry in enumerate(entries):
+            if entry[name_index] == EMPTY_CELL:
+                reasons[pos] = "missing name"
+
+        for column in number_indices:
+            for pos, entry in enumerate(entries):
+                text = entry[column]
+                try:
+                    points = points_cache[text]
+                except KeyError:
+                    points = points_cache[text] = normalize_points(text)
+                if points is None:
+                    reasons.setdefault(pos, "invalid points {0!r} in column {1}".format(text, self.headers[column]))
+                else:
+                    entry[column] = points
+
+        if not reasons:
+            return entries
+        for pos in sorted(reasons):
+            line, cells = lines[pos]
+            self.rejected.append(RejectedRow(line, cells, reasons[pos]))
+        return [entry for pos, entry in enumerate(entries) if pos not in reasons]
+
+
+def format_import_report(importer, limit=None):
+    """
+    Create a text report of a CSV import.
+    :param importer: CsvImporter after all batches were read
+    :param limit: maximal number of rejected rows to list (None to list all)
+    :return report as string
+    """
+    lines = ["Imported {0} students, rejected {1} rows.".format(importer.imported, len(importer.rejected))]
+    if importer.missing_headers():
+        lines.append("Columns not in the file: {0}".format(", ".join(importer.missing_headers())))
+    if importer.ignored_headers():
+        lines.append("Ignored columns: {0}".format(", ".join(importer.ignored_headers())))
+    rejected = sorted(importer.rejected)
+    if limit is not None:
+        rejected = rejected[:limit]
+    lines.extend("Line {0} ({1}): {2}".format(r.line, r.reason, importer.dialect.delimiter.join(r.cells))
+                 for r in rejected)
+    if len(rejected) < len(importer.rejected):
+        lines.append("... and {0} more rows".format(len(importer.rejected) - len(rejected)))
+    return "\n".join(lines)
@@ -0,0 +1,53 @@
+def diff_sorted_rows(old_rows, new_rows, key):
+    """
+    Compare two lists of rows which are both sorted by the same key in a single linear pass. Rows with equal keys are
+    matched in order, so duplicate keys are supported.
+    :param old_rows: current rows
+    :param new_rows: new rows
+    :param key: function which returns the sort key of a row
+    :return list of (tag, i1, i2, j1, j2) tuples like difflib.SequenceMatcher.get_opcodes, where tag is one of
+            "equal", "replace" (rows with equal keys but different values), "delete" and "insert". Consecutive
+            operations with the same tag are combined into a single range.
+    """
+    old_keys = [key(e) for e in old_rows]
+    new_keys = [key(e) for e in new_rows]
+    n, m = len(old_rows), len(new_rows)
+
+    opcodes = []
+
+    def add(tag, i1, i2, j1, j2):
+        if opcodes:
+            last = opcodes[-1]
+            if last[0] == tag and last[2] == i1 and last[4] == j1:
+                opcodes[-1] = (tag, last[1], i2, last[3], j2)
+                return
+        opcodes.append((tag, i1, i2, j1, j2))
+
+    i = j = 0
+    while i < n or j < m:
+        if i < n and j < m and old_keys[i] == new_keys[j]:
+            add("equal" if old_rows[i] == new_rows[j] else "replace", i, i+1, j, j+1)
+            i += 1
+            j += 1
+        elif j == m or (i < n and old_keys[i] < new_keys[j]):
+            add("delete", i, i+1, j, j)
+            i += 1
+        else:
+            add("insert", i, i, j, j+1)
+            j += 1
+    return opcodes
+
+
+def contiguous_ranges(rows):
+    """
+    Combine row numbers into contiguous ranges.
+    :param rows: iterable of row numbers
+    :return sorted list of (first, last) tuples
+    """
+    ranges = []
+    for row in sorted(set(rows)):
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1] = (ranges[-1][0], row)
+        else:
+            ranges.append((row, row))
+    return ranges
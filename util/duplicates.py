@@ -0,0 +1,175 @@
+import math
+from collections import defaultdict
+
+from .helper import normalize_name, points_to_str
+from .statistics import cell_points
+
+
+# Length of the character n-grams which are compared.
+NGRAM_SIZE = 3
+
+# Minimal similarity (Dice coefficient of the name n-grams) of two names of the same student.
+DEFAULT_THRESHOLD = 0.8
+
+
+def ngrams(text, n=NGRAM_SIZE):
+    """
+    Split a normalized text into overlapping character n-grams. The text is padded with spaces, so that the start and
+    the end of the text form n-grams as well.
+    :param text: normalized text (see normalize_name)
+    :param n: length of each n-gram
+    :return frozenset of n-grams
+    """
+    text = " {0} ".format(text)
+    return frozenset(text[i:i+n] for i in range(max(1, len(text) - n + 1)))
+
+
+class _UnionFind(object):
+
+    __slots__ = ("parent",)
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        parent = self.parent
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        # Compress the path.
+        while x != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def similar_pairs(grams, threshold):
+    """
+    Find all pairs of n-gram sets with a similarity of at least threshold without comparing all pairs. Each set is
+    only indexed by its rarest n-grams (prefix filtering): two sets which are similar enough must share at least one
+    of them. Only the pairs found this way are compared.
+    :param grams: list of n-gram sets
+    :param threshold: minimal similarity between 0 and 1
+    :return list of (i, j, similarity) tuples with i < j
+    """
+    frequency = defaultdict(int)
+    for g in grams:
+        for gram in g:
+            frequency[gram] += 1
+
+    # Minimal overlap of a set with any other set with the required similarity is threshold / (2 - threshold) of its
+    # size, so the set shares one of its first size - overlap + 1 rarest n-grams with each similar set.
+    ratio = threshold / (2.0 - threshold)
+    sizes = [len(g) for g in grams]
+    index = defaultdict(list)
+    pairs = []
+    for i, g in enumerate(grams):
+        size = sizes[i]
+        ordered = sorted(g, key=lambda gram: (frequency[gram], gram))
+        prefix = ordered[:size - int(math.ceil(ratio * size - 1e-9)) + 1]
+
+        candidates = set()
+        for gram in prefix:
+            candidates.update(index[gram])
+        # Length filter: much shorter or longer sets can not be similar enough.
+        min_size, max_size = ratio * size, size / ratio
+        for j in sorted(candidates):
+            total = size + sizes[j]
+            if min_size <= sizes[j] <= max_size:
+                overlap = len(g & grams[j])
+                if 2.0 * overlap >= threshold * total:
+                    pairs.append((j, i, 2.0 * overlap / total))
+        for gram in prefix:
+            index[gram].append(i)
+    return pairs
+
+
+def find_duplicates(user_data, name_index, school_index=None, grade_index=None, threshold=DEFAULT_THRESHOLD):
+    """
+    Find entries which probably belong to the same student, e.g. "Müller, Anna" and "Mueller Anna". Names are
+    compared independent of case, umlauts, punctuation and word order (see normalize_name) and with the similarity of
+    their n-grams to find small typos. The entries are split into blocks by grade and normalized school, only the
+    names inside of a block are compared.
+    :param user_data: data for each student
+    :param name_index: index of the name column
+    :param school_index: index of the school column (None to ignore the school)
+    :param grade_index: index of the grade column (None to ignore the grade)
+    :param threshold: minimal similarity of two names between 0 and 1
+    :return list of groups, each group is a sorted list with the rows of all entries of the same student
+    """
+    # Each distinct normalized name is compared only once per block.
+    blocks = defaultdict(lambda: defaultdict(list))
+    block_keys = {}
+    for row, entry in enumerate(user_data):
+        key = tuple(entry[i] for i in (grade_index, school_index) if i is not None)
+        block = block_keys.get(key)
+        if block is None:
+            block = block_keys[key] = tuple(normalize_name(value) for value in key)
+        blocks[block][normalize_name(entry[name_index])].append(row)
+
+    groups = _UnionFind()
+    for names in blocks.values():
+        rows = list(names.values())
+        for same_name in rows:
+            for row in same_name[1:]:
+                groups.union(same_name[0], row)
+        if len(rows) > 1:
+            for i, j, _ in similar_pairs([ngrams(name) for name in names], threshold):
+                groups.union(rows[i][0], rows[j][0])
+
+    members = defaultdict(set)
+    for row in list(groups.parent):
+        root = groups.find(row)
+        members[root].update((row, root))
+    return sorted(sorted(rows) for rows in members.values() if len(rows) > 1)
+
+
+def merge_entries(entries, point_indices, sum_index=None):
+    """
+    Combine the entries of the same student into a single entry. The first entry is the base: its empty cells are
+    filled with the first value of the other entries. Point cells keep the highest points of all entries and the sum
+    is calculated again.
+    :param entries: list of entries, the first entry is kept
+    :param point_indices: indices of the point columns
+    :param sum_index: index of the sum column (None to keep the sum of the first entry)
+    :return new merged entry
+    """
+    merged = list(entries[0])
+    for i, value in enumerate(merged):
+        if value.strip() in ("", "-"):
+            merged[i] = next((e[i] for e in entries[1:] if e[i].strip() not in ("", "-")), value)
+
+    total = 0
+    for i in point_indices:
+        points = [(cell_points(e[i]), e[i]) for e in entries]
+        points = [p for p in points if p[0] is not None]
+        if points:
+            best = max(points, key=lambda p: p[0])
+            merged[i] = best[1]
+            total += best[0]
+
+    if sum_index is not None:
+        merged[sum_index] = points_to_str(float(total))
+    return merged
+
+
+def format_duplicates_report(user_data, groups, name_index, school_index=None, grade_index=None):
+    """
+    Create a text report with all entries of each duplicate group.
+    :param user_data: data for each student
+    :param groups: list of row groups (see find_duplicates)
+    :return report as string
+    """
+    lines = ["{0} groups of duplicate students".format(len(groups))]
+    for rows in groups:
+        lines.append("")
+        for row in rows:
+            entry = user_data[row]
+            details = [entry[i] for i in (school_index, grade_index) if i is not None]
+            lines.append("{0:>6}  {1}{2}".format(row, entry[name_index],
+                                                 " ({0})".format(", ".join(details)) if details else ""))
+    return "\n".join(lines)
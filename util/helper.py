@@ -1,6 +1,16 @@
+import re
+import unicodedata
+
 from .parser import create_php_data
 
 
+# Transliteration of german special characters used to normalize names.
+_NAME_TRANSLITERATION = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+# Points are a non-negative number with a comma or a point as decimal separator, e.g. "3", "2,5" or "1.5".
+POINTS_PATTERN = re.compile(r"\d+(?:[.,]\d+)?")
+
+
 def str_to_points(point_str):
     """
     Convert a string of point to the corresponding integer.
@@ -30,11 +40,39 @@ def points_to_str(points):
         return str(points).replace(".", ",")
 
 
-def export_data_to_file(path, headers, data):
+def fold_words(text):
+    """
+    Split a text into words independent of case, umlauts, accents and punctuation. E.g. "Müller, Zoë" is folded to
+    ["mueller", "zoe"].
+    :param text: text to fold
+    :return list of folded words in the order of the text
+    """
+    text = text.casefold().translate(_NAME_TRANSLITERATION)
+    # Remove all remaining accents.
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return re.findall(r"\w+", text)
+
+
+def normalize_name(name):
+    """
+    Normalize a name to compare names independent of case, umlauts, punctuation and the order of first and last
+    name. E.g. "Müller, Anna" and "anna mueller" are both normalized to "anna mueller".
+    :param name: name of a student
+    :return normalized name
+    """
+    return " ".join(sorted(fold_words(name)))
+
+
+def export_data_to_file(path, headers, data, dictionaries=None, progress=None):
     """
     Create a new php file with all the data at the given path.
     :param path: path to php file.
+    :param dictionaries: column dictionaries of the data (see create_php_data)
+    :param progress: function which is called with the number of entries after the file content was created and before
+                     the file is written (None to ignore)
     """
-    php_data = create_php_data(headers, data)
+    php_data = create_php_data(headers, data, dictionaries)
+    if progress is not None:
+        progress(len(data))
     with open(path, "w+") as f:
         f.write(php_data)
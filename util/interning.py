@@ -0,0 +1,84 @@
+# Columns with more distinct values than this fraction of all rows (e.g. the names) are not interned. Their dictionary
+# would use more memory than sharing the few duplicates saves.
+MAX_DISTINCT_RATIO = 0.5
+
+# Minimum number of rows to detect the columns with mostly distinct values. In a smaller sample, e.g. a single
+# inserted row, every column looks distinct.
+MIN_SAMPLE_ROWS = 1000
+
+
+class ColumnDictionary(object):
+    """
+    Dictionary of all distinct values of a single column. Each value is stored once and receives a code, so that equal
+    cells of different rows share the same string object.
+    """
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        """
+        :param value: cell value
+        :return code of the value, a new code is assigned for unknown values
+        """
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def intern(self, value):
+        """
+        :param value: cell value
+        :return the shared string object which is equal to value
+        """
+        return self.values[self.code(value)]
+
+
+def intern_row(dictionaries, row):
+    """
+    Intern all values of a row in place.
+    :param dictionaries: list with a ColumnDictionary (or None) for each column
+    :param row: list with all values of a row
+    :return row
+    """
+    for i, (dictionary, value) in enumerate(zip(dictionaries, row)):
+        if dictionary is not None:
+            row[i] = dictionary.intern(value)
+    return row
+
+
+def intern_rows(rows, dictionaries=None):
+    """
+    Replace equal values of each column with the same string object. The rows are modified in place.
+    :param rows: list of lists with the values of each row
+    :param dictionaries: existing dictionaries to extend (None to create new ones)
+    :return list with a ColumnDictionary for each column or None for columns which are not interned
+    """
+    if dictionaries is None:
+        dictionaries = [ColumnDictionary() for _ in range(len(rows[0]) if rows else 0)]
+
+    for row in rows:
+        intern_row(dictionaries, row)
+    return dictionaries
+
+
+def drop_distinct_columns(dictionaries, row_count, max_distinct_ratio=MAX_DISTINCT_RATIO, min_rows=MIN_SAMPLE_ROWS):
+    """
+    Stop interning the columns with mostly distinct values.
+    :param dictionaries: list with a ColumnDictionary (or None) for each column
+    :param row_count: number of interned rows
+    :param max_distinct_ratio: dictionaries with more distinct values than this fraction of the rows are dropped
+    :param min_rows: minimum number of rows, no dictionary is dropped for less rows
+    :return list with a ColumnDictionary for each column or None for columns with mostly distinct values
+    """
+    if row_count < min_rows:
+        return dictionaries
+    limit = max_distinct_ratio * row_count
+    return [d if d is not None and len(d) <= limit else None for d in dictionaries]
@@ -0,0 +1,208 @@
+import os
+import json
+import threading
+
+
+class StateJournal(object):
+    """
+    Append-only journal of data model mutations. Each mutation is written as a single json line. Appending only
+    buffers the record, call sync regularly (e.g. on a background thread) to write the buffered records to the disc,
+    so that only the records since the last sync are lost if the application crashes. Each record has a sequence
+    number, which allows skipping records that are already part of a snapshot. All methods are thread safe, which
+    allows syncing and discarding records from the thread that writes the snapshot.
+
+    Records have the format [seq, operation, *arguments]. Supported operations:
+    - ["set", row, column, value]: change a value (column -1 replaces the whole entry)
+    - ["check", row, state]: change the check state of a row
+    - ["insert", row, entry]: insert a new entry
+    - ["remove", row]: remove an entry
+    - ["move", row, to]: move an entry and its check state to another row
+    - ["headers", headers]: replace all headers
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Sequence number of the last record.
+        self.seq = 0
+        self._file = None
+        # True if records were appended since the last sync.
+        self._unsynced = False
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        """
+        :return True if records are currently written to the journal.
+        """
+        return self._file is not None
+
+    def open(self):
+        """
+        Start appending records to the journal file.
+        """
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+
+    def append(self, operation, *args):
+        """
+        Append a new record to the journal. This is a noop if the journal is closed.
+        :param operation: operation name
+        :param args: arguments for the operation
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self.seq += 1
+            self._file.write(json.dumps([self.seq, operation] + list(args), ensure_ascii=False) + "\n")
+            self._unsynced = True
+
+    def append_many(self, records):
+        """
+        Append multiple records to the journal.
+        :param records: list of (operation, *arguments) tuples
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            lines = []
+            for record in records:
+                self.seq += 1
+                lines.append(json.dumps([self.seq] + list(record), ensure_ascii=False) + "\n")
+            self._file.write("".join(lines))
+            self._unsynced = True
+
+    def discard(self, seq=None):
+        """
+        Remove all records up to a sequence number. Call this after a snapshot containing these records was written.
+        :param seq: sequence number of the last record to remove (None to remove all records)
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+
+            # Rewrite the journal with the remaining records and atomically replace the old one.
+            records = [r for r in read_journal(self.path) if seq is not None and r[0] > seq]
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._unsynced = False
+
+    def is_synced(self):
+        """
+        :return True if all appended records were synced to the disc.
+        """
+        return not self._unsynced
+
+    def sync(self):
+        """
+        Write all buffered records to the disc. Records can be appended while the file is synced, only writing the
+        buffer holds the lock.
+        """
+        with self._lock:
+            if self._file is None or not self._unsynced:
+                return
+            self._file.flush()
+            self._unsynced = False
+            # Sync a duplicate of the file descriptor, which stays valid if the journal is closed meanwhile.
+            fd = os.dup(self._file.fileno())
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """
+        Sync all buffered records and stop writing records to the journal.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+                self._unsynced = False
+
+    def delete(self):
+        """
+        Close and remove the journal file.
+        :return True on success, otherwise False
+        """
+        self.close()
+        try:
+            os.remove(self.path)
+            return True
+        except OSError:
+            return False
+
+
+def read_journal(path):
+    """
+    Read all records from a journal file. A torn or corrupt record ends the journal, because all following records
+    depend on it.
+    :param path: path to the journal file
+    :return list of records
+    """
+    records = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+    except OSError:
+        pass
+    return records
+
+
+def replay_journal(records, headers, user_data, checked, after_seq=0):
+    """
+    Apply journal records to the raw application state. The lists are modified in place.
+    :param records: journal records
+    :param headers: list of all headers
+    :param user_data: data for each student
+    :param checked: check state for each row as bool
+    :param after_seq: ignore all records with a sequence number smaller or equal to this value
+    :return sequence number of the last applied record
+    """
+    seq = after_seq
+    for record in records:
+        if record[0] <= after_seq:
+            continue
+        # Stop at a gap. The missing records were discarded after a newer snapshot was written, which means the
+        # following records do not belong to this snapshot.
+        if record[0] != seq + 1:
+            break
+        seq, operation, args = record[0], record[1], record[2:]
+
+        if operation == "set":
+            row, column, value = args
+            if column == -1:
+                user_data[row] = value
+            else:
+                user_data[row][column] = value
+        elif operation == "check":
+            row, state = args
+            checked[row] = state
+        elif operation == "insert":
+            row, entry = args
+            user_data.insert(row, entry)
+            checked.insert(row, False)
+        elif operation == "remove":
+            row, = args
+            user_data.pop(row)
+            checked.pop(row)
+        elif operation == "move":
+            row, to = args
+            user_data.insert(to, user_data.pop(row))
+            checked.insert(to, checked.pop(row))
+        elif operation == "headers":
+            headers[:] = args[0]
+    return seq
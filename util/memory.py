@@ -0,0 +1,152 @@
+import sys
+import types
+import tracemalloc
+
+
+# Objects which are never part of the loaded data and are not measured.
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Approximate the memory used by an object and everything it references. Objects which are already part of seen
+    are not counted again, which allows sharing seen between multiple calls to count shared objects only once.
+    Only the python part of Qt objects is measured.
+    :param obj: object to measure
+    :param seen: set with the ids of all objects which were already counted
+    :return size in bytes
+    """
+    if seen is None:
+        seen = set()
+
+    size = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SKIPPED_TYPES):
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+
+        if isinstance(o, (str, bytes, bytearray, int, float, bool, range)) or o is None:
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        else:
+            if hasattr(o, "__dict__") and not hasattr(o, "metaObject"):
+                stack.append(o.__dict__)
+            for slot in getattr(type(o), "__slots__", ()):
+                if hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return size
+
+
+def format_size(size):
+    """
+    :param size: size in bytes
+    :return human readable size
+    """
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return "{0:.1f} {1}".format(size, unit) if unit != "B" else "{0} B".format(size)
+        size /= 1024
+    return "{0:.1f} GiB".format(size)
+
+
+class MemoryTracer(object):
+    """
+    Record the allocation sites of the last load with tracemalloc. Tracing slows down the application and is therefore
+    only active after calling start.
+    """
+
+    def __init__(self):
+        self._before = None
+        self._load_snapshot = None
+
+    def is_tracing(self):
+        """
+        :return True if allocations are traced
+        """
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=1):
+        """
+        Start tracing allocations.
+        :param frames: number of frames stored for each allocation
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._before = self._take_snapshot()
+
+    def _take_snapshot(self):
+        snapshot = tracemalloc.take_snapshot()
+        # Ignore the allocations of the tracer itself.
+        return snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                       tracemalloc.Filter(False, "<frozen importlib._bootstrap>")])
+
+    def begin_load(self):
+        """
+        Call this before new data is loaded.
+        """
+        if tracemalloc.is_tracing():
+            self._before = self._take_snapshot()
+
+    def end_load(self):
+        """
+        Call this after new data was loaded. The allocations are compared to the last call of begin_load (or start),
+        which allows calling end_load multiple times for a load which happens in several steps.
+        """
+        if tracemalloc.is_tracing() and self._before is not None:
+            self._load_snapshot = (self._before, self._take_snapshot())
+
+    def abort_load(self):
+        """
+        Call this instead of end_load if the load failed or was cancelled. The allocation sites of the last successful
+        load are kept and the snapshot taken by begin_load is released.
+        """
+        self._before = None
+
+    def top_allocations(self, limit=10):
+        """
+        :param limit: maximum number of allocation sites
+        :return list of tracemalloc.StatisticDiff for the allocation sites of the last load
+        """
+        if self._load_snapshot is None or self._load_snapshot[0] is None:
+            return []
+        before, after = self._load_snapshot
+        return after.compare_to(before, "lineno")[:limit]
+
+
+def format_memory_report(structures, tracer=None, limit=10):
+    """
+    Create a plain text report with the memory used by each structure and the top allocation sites of the last load.
+    :param structures: list of (name, object) tuples. Objects shared with an earlier structure are only counted once.
+    :param tracer: MemoryTracer instance or None
+    :param limit: maximum number of allocation sites
+    :return report as string
+    """
+    seen = set()
+    lines = ["Memory used by the loaded data:"]
+    total = 0
+    for name, obj in structures:
+        size = deep_sizeof(obj, seen)
+        total += size
+        lines.append("    {0:<32} {1:>12}".format(name, format_size(size)))
+    lines.append("    {0:<32} {1:>12}".format("Total", format_size(total)))
+
+    if tracer is None or not tracer.is_tracing():
+        lines.append("\nAllocation tracing is disabled. Start the application with --trace-memory to record the "
+                     "allocation sites of the last load.")
+    else:
+        lines.append("\nTop allocation sites of the last load:")
+        for stat in tracer.top_allocations(limit):
+            frame = stat.traceback[0]
+            lines.append("    {0}:{1}: {2} ({3:+d} blocks)".format(frame.filename, frame.lineno,
+                                                                   format_size(stat.size_diff), stat.count_diff))
+        current, peak = tracemalloc.get_traced_memory()
+        lines.append("\nTraced memory: {0} (peak {1})".format(format_size(current), format_size(peak)))
+
+    return "\n".join(lines)
@@ -0,0 +1,198 @@
+import hashlib
+from collections import namedtuple, defaultdict
+
+import requests
+
+from .parser import STREAM_CHUNK_SIZE, CorruptDataException, stream_table
+from .helper import normalize_name
+
+
+# Seconds to wait for the website before a poll fails.
+POLL_TIMEOUT = 30
+
+
+# Changes between two rosters matched by name:
+# - added: list of new entries
+# - removed: list of entries which do not exist anymore
+# - changed: list of (old entry, new entry) tuples
+# - headers: new headers or None if the headers did not change
+RowDiff = namedtuple("RowDiff", ["added", "removed", "changed", "headers"])
+
+
+def diff_rows_by_name(old_headers, old_rows, new_headers, new_rows, name_index, new_name_index=None):
+    """
+    Compare two rosters by the name of each student. Students with the same name are matched in order.
+    :param old_headers: headers of the current roster
+    :param old_rows: entries of the current roster
+    :param new_headers: headers of the new roster
+    :param new_rows: entries of the new roster
+    :param name_index: index of the name column in the current roster
+    :param new_name_index: index of the name column in the new roster (None if it equals name_index)
+    :return RowDiff
+    """
+    if new_name_index is None:
+        new_name_index = name_index
+
+    # Name index of the current roster: name -> entries with this name.
+    by_name = defaultdict(list)
+    for entry in old_rows:
+        by_name[entry[name_index]].append(entry)
+
+    added, changed = [], []
+    for entry in new_rows:
+        matches = by_name.get(entry[new_name_index])
+        if not matches:
+            added.append(entry)
+            continue
+        old_entry = matches.pop(0)
+        if list(old_entry) != list(entry):
+            changed.append((old_entry, entry))
+
+    removed = [e for entries in by_name.values() for e in entries]
+    headers = None if list(old_headers) == list(new_headers) else list(new_headers)
+    return RowDiff(added, removed, changed, headers)
+
+
+def _column_index(headers, field):
+    try:
+        return headers.index(field)
+    except ValueError:
+        raise CorruptDataException("The data has no column {0}.".format(field))
+
+
+def diff_roster_batches(old_batches, new_batches, name_field):
+    """
+    Compare two rosters by the normalized name of each student (see normalize_name), so "Müller, Anna" and
+    "anna mueller" are the same student. Only the current roster is held in a hash table, the new roster is compared
+    batch by batch while it is parsed, so the comparison runs in linear time. Students with the same name are matched
+    in order. If the headers differ, the columns are matched by their header and columns which do not exist in the
+    current roster are empty.
+    :param old_batches: iterable which yields the headers and a list of entries of the current roster (see stream_table)
+    :param new_batches: iterable which yields the headers and a list of entries of the new roster
+    :param name_field: header of the name column
+    :return headers of the new roster, RowDiff (removed and changed entries of the current roster have the columns of
+            the new headers)
+    :raise CorruptDataException if a roster has no name column
+    """
+    # Normalized name of each distinct name, many students share the same name.
+    keys = {}
+
+    def name_key(name):
+        try:
+            return keys[name]
+        except KeyError:
+            key = keys[name] = normalize_name(name)
+            return key
+
+    old_headers, by_name = [], {}
+    for old_headers, batch in old_batches:
+        name_index = _column_index(old_headers, name_field)
+        for entry in batch:
+            by_name.setdefault(name_key(entry[name_index]), []).append(entry)
+
+    new_headers, added, changed = [], [], []
+    project = list
+    for new_headers, batch in new_batches:
+        name_index = _column_index(new_headers, name_field)
+        if list(new_headers) != list(old_headers):
+            positions = {h: i for i, h in enumerate(old_headers)}
+            columns = [positions.get(h) for h in new_headers]
+            project = lambda e: [e[i] if i is not None else "" for i in columns]
+        for entry in batch:
+            matches = by_name.get(name_key(entry[name_index]))
+            if not matches:
+                added.append(entry)
+                continue
+            old_entry = project(matches.pop(0))
+            if old_entry != list(entry):
+                changed.append((old_entry, entry))
+
+    removed = [project(e) for entries in by_name.values() for e in entries]
+    headers = None if list(old_headers) == list(new_headers) else list(new_headers)
+    return list(new_headers), RowDiff(added, removed, changed, headers)
+
+
+def is_empty_diff(diff):
+    """
+    :param diff: RowDiff
+    :return True if the rosters are equal
+    """
+    return not (diff.added or diff.removed or diff.changed or diff.headers)
+
+
+def format_row_diff(diff, headers, name_index):
+    """
+    Create a text report with all changes of a RowDiff.
+    :param diff: RowDiff
+    :param headers: headers of the new roster
+    :param name_index: index of the name column
+    :return report as string
+    """
+    lines = ["{0} new, {1} removed and {2} changed students".format(len(diff.added), len(diff.removed),
+                                                                  len(diff.changed))]
+    if diff.headers is not None:
+        lines.append("Headers: {0}".format(", ".join(diff.headers)))
+    lines.extend("+ {0}".format(e[name_index]) for e in diff.added)
+    lines.extend("- {0}".format(e[name_index]) for e in diff.removed)
+    for old_entry, entry in diff.changed:
+        cells = ["{0} {1} -> {2}".format(h, old, new) for h, old, new in zip(headers, old_entry, entry) if old != new]
+        lines.append("~ {0}: {1}".format(entry[name_index], "; ".join(cells)))
+    return "\n".join(lines)
+
+
+class WebsitePoller(object):
+    """
+    Poll a website with conditional requests. The validators (ETag and Last-Modified) of the last response are sent
+    with each request, so an unchanged page is answered with a short 304 response. Servers which ignore the validators
+    send the full page, which is compared by its hash. The page is only parsed if it changed.
+    """
+
+    def __init__(self, url, session=None):
+        """
+        :param url: url of the website
+        :param session: requests.Session to reuse its connections (None to create a session)
+        """
+        self.url = url
+        self.session = session if session is not None else requests.Session()
+        self.etag = None
+        self.last_modified = None
+        self.content_hash = None
+
+    def reset(self):
+        """
+        Forget the last response, so the next poll returns the page even if it did not change.
+        """
+        self.etag = self.last_modified = self.content_hash = None
+
+    def poll(self):
+        """
+        Fetch the website if it changed since the last poll.
+        :return None if the page did not change, otherwise the headers and all user data in the order of the page
+        """
+        request_headers = {}
+        if self.etag:
+            request_headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            request_headers["If-Modified-Since"] = self.last_modified
+
+        response = self.session.get(self.url, headers=request_headers, timeout=POLL_TIMEOUT, allow_redirects=True)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        if digest != self.content_hash:
+            text = content.decode(response.encoding or "utf-8", errors="replace")
+            chunks = (text[i:i+STREAM_CHUNK_SIZE] for i in range(0, len(text), STREAM_CHUNK_SIZE))
+            headers, rows = None, []
+            for headers, batch in stream_table(chunks):
+                rows.extend(batch)
+
+        # Only remember the page after it was parsed, a broken page is fetched again on the next poll.
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        if digest == self.content_hash:
+            return None
+        self.content_hash = digest
+        return headers, rows
@@ -1,11 +1,22 @@
 import html
 import requests
 import datetime
+from operator import getitem
+from html.parser import HTMLParser
 try:
     from BeautifulSoup import BeautifulSoup
 except ImportError:
     from bs4 import BeautifulSoup
 
+from .collation import collation_key
+
+
+# Number of rows yielded at once by the streaming parser.
+STREAM_BATCH_SIZE = 200
+
+# Number of characters read from a file at once by the streaming parser.
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class CorruptDataException(Exception):
     pass
@@ -19,20 +30,52 @@ def escape_html(text):
     return text.encode("ascii", "xmlcharrefreplace").decode("utf-8")
 
 
-def create_php_data(headers, user_data):
+def current_school_year(today=None):
     """
-    Create valid php file data from the user data list.
-    :param headers: all header fields 
-    :param user_data: data for each student
+    Determine the school year for a specific date.
+    :param today: date inside the school year (None for today)
+    :return tuple with the first and the second year of the school year
     """
-    today = datetime.date.today()
+    if today is None:
+        today = datetime.date.today()
     # This date was always part of the summer break. We just use this as a reference date to change the school year
     # You could of course make this more complex and correct by using an api for the exact date of the summer break.
     reference_date = datetime.date(day=30, month=7, year=today.year)
     if today > reference_date:
-        school_year = (today.year, today.year + 1)
-    else:
-        school_year = (today.year-1, today.year)
+        return (today.year, today.year + 1)
+    return (today.year-1, today.year)
+
+
+class _EscapeCache(dict):
+    """
+    Escaped value for each distinct value of a column. Each value is only escaped once.
+    """
+
+    def __missing__(self, value):
+        escaped = self[value] = escape_html(value)
+        return escaped
+
+
+class _NoEscapeCache(object):
+    """
+    Escape each value without caching it. Used for columns with mostly distinct values.
+    """
+
+    def __getitem__(self, value):
+        return escape_html(value)
+
+
+def create_php_data(headers, user_data, dictionaries=None):
+    """
+    Create valid php file data from the user data list.
+    :param headers: all header fields 
+    :param user_data: data for each student
+    :param dictionaries: list with a ColumnDictionary for each column (see intern_rows). Values of columns without a
+                         dictionary (None) have mostly distinct values and are escaped for each cell instead of being
+                         cached. None to escape each distinct value once for all columns.
+    """
+    today = datetime.date.today()
+    school_year = current_school_year(today)
 
     header = """<?php include 'top.php';?>
 
@@ -89,8 +132,15 @@ def create_php_data(headers, user_data):
 <?php include 'bottom.php';?>
 """
 
-    # Write the user list to the php file.
-    body = "".join(body_element.format(*map(escape_html, data)) for data in user_data)
+    # Write the user list to the php file. Each distinct value is escaped once when it is first exported. The
+    # dictionaries are not used to fill the caches, because they keep all values which were ever part of the data.
+    caches = [_EscapeCache() for _ in headers]
+    if dictionaries is not None:
+        for i, dictionary in enumerate(dictionaries[:len(caches)]):
+            if dictionary is None:
+                caches[i] = _NoEscapeCache()
+
+    body = "".join(body_element.format(*map(getitem, caches, data)) for data in user_data)
 
     return header + body + footer
 
@@ -122,8 +172,134 @@ def _parse_table(table_data):
     # Sanity check: Make sure that each entry contains all necessary information.
     if not all(len(e) == len(headers) for e in entries):
         raise CorruptDataException("Some data entries missing requiered fields.")
-    # Return the headers and the sorted data.
-    return headers, sorted(entries, key=lambda e: e[0].lower())
+    # Return the headers and the data sorted by name in dictionary order.
+    return headers, sorted(entries, key=lambda e: collation_key(e[0]))
+
+
+class _TableStreamParser(HTMLParser):
+    """
+    Incremental html parser which collects the rows of the first table with a header row (<th> cells). Rows of other
+    tables, e.g. of a surrounding layout table, are ignored. Call feed with chunks of the document and collect the
+    finished rows with pop_rows.
+    """
+
+    def __init__(self):
+        super(_TableStreamParser, self).__init__(convert_charrefs=True)
+        self.headers = None
+        self._rows = []
+        # Nesting depth of tables and the depth of the table which contains the data.
+        self._depth = 0
+        self._table_depth = None
+        self._row = None
+        self._row_depth = None
+        self._cell = None
+        self._is_header_row = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._depth += 1
+        elif tag == "tr" and self._table_depth in (None, self._depth):
+            # Rows of a surrounding layout table are dropped when a nested table starts a new row.
+            self._row = []
+            self._cell = None
+            self._row_depth = self._depth
+            self._is_header_row = False
+        elif tag in ("td", "th") and self._row is not None and self._depth == self._row_depth:
+            # A new cell implicitly closes an unclosed cell.
+            self._finish_cell()
+            self._cell = []
+            self._is_header_row = self._is_header_row or tag == "th"
+
+    def handle_endtag(self, tag):
+        if tag == "table":
+            if self._depth == self._row_depth:
+                self._finish_row()
+            self._depth -= 1
+        elif tag == "tr" and self._depth == self._row_depth:
+            self._finish_row()
+        elif tag in ("td", "th") and self._depth == self._row_depth:
+            self._finish_cell()
+
+    def handle_data(self, data):
+        if self._cell is not None and self._depth == self._row_depth:
+            self._cell.append(data)
+
+    def _finish_cell(self):
+        if self._cell is not None:
+            self._row.append("".join(self._cell))
+            self._cell = None
+
+    def _finish_row(self):
+        if self._row is None:
+            return
+        self._finish_cell()
+        row, self._row = self._row, None
+        if self.headers is None:
+            if self._is_header_row:
+                self.headers = row
+                self._table_depth = self._row_depth
+        elif row:
+            self._rows.append(row)
+
+    def pop_rows(self):
+        """
+        :return all rows which were completed since the last call
+        """
+        rows, self._rows = self._rows, []
+        return rows
+
+
+def stream_table(chunks, batch_size=STREAM_BATCH_SIZE):
+    """
+    Parse the html table which contains all headers and students incrementally. The rows are yielded in the order of
+    the document, they are not sorted.
+    :param chunks: iterable with the html source code in chunks of strings
+    :param batch_size: minimum number of rows yielded at once (except for the last batch)
+    :return generator which yields the headings and a list of user data for each batch
+    """
+    parser = _TableStreamParser()
+    pending = []
+
+    def finish_batch():
+        nonlocal pending
+        if parser.headers is None:
+            raise CorruptDataException("The data does not contain a table header.")
+        if not all(len(e) == len(parser.headers) for e in pending):
+            raise CorruptDataException("Some data entries missing requiered fields.")
+        batch, pending = pending, []
+        return parser.headers, batch
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        pending.extend(parser.pop_rows())
+        if len(pending) >= batch_size:
+            yield finish_batch()
+
+    parser.close()
+    pending.extend(parser.pop_rows())
+    yield finish_batch()
+
+
+def read_chunks(path, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Read a text file in chunks, e.g. for stream_table.
+    :param path: path to the file
+    :param chunk_size: number of characters read at once
+    :return generator which yields the chunks as strings
+    """
+    with open(path, "r") as f:
+        for chunk in iter(lambda: f.read(chunk_size), ""):
+            yield chunk
+
+
+def stream_php_file(path, batch_size=STREAM_BATCH_SIZE):
+    """
+    Parse an exported php file incrementally. See stream_table.
+    :param path: path to exported php file.
+    :param batch_size: minimum number of rows yielded at once
+    :return generator which yields the headings and a list of user data for each batch
+    """
+    return stream_table(read_chunks(path), batch_size)
 
 
 def parse_website_data(data):
@@ -138,16 +314,17 @@ def parse_website_data(data):
     return _parse_table(str(table))
 
 
-def parse_php_file(path):
+def parse_php_file(path, progress=None):
     """
     Parse an exported php file.
     :param path: path to exported php file.
+    :param progress: function which is called with the number of parsed entries after each batch (None to ignore)
     :return list of headings, list of all user data
     """
-    php_file = open(path, "r")
-    content = php_file.read()
-    php_file.close()
-
-    parsed_html = BeautifulSoup(content, "html5lib")
-    table = parsed_html.body.find("table")
-    return _parse_table(str(table))
+    headers, entries = None, []
+    for headers, batch in stream_php_file(path):
+        entries.extend(batch)
+        if progress is not None:
+            progress(len(entries))
+    # Return the headers and the data sorted by name in dictionary order.
+    return headers, sorted(entries, key=lambda e: collation_key(e[0]))
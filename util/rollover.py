@@ -0,0 +1,169 @@
+import re
+import datetime
+from collections import namedtuple
+
+from .parser import current_school_year
+
+
+# Students which would be promoted beyond this grade graduate and are removed from the roster.
+MAX_GRADE = 13
+
+# Value of an empty point or sum cell.
+EMPTY_CELL = "-"
+
+_GRADE_PATTERN = re.compile(r"^(\s*)(\d+)(.*)$", re.DOTALL)
+
+
+class RolloverException(Exception):
+    pass
+
+
+class RolloverPlan(namedtuple("RolloverPlan", ["headers", "changes", "removed"])):
+    """
+    All changes of a school year rollover:
+    - headers: new headers with the release numbers of the new school year
+    - changes: list of (row, new entry) tuples for all changed rows
+    - removed: sorted list with the rows of the graduated students
+    """
+    __slots__ = ()
+
+
+def rollover_school_years(today=None):
+    """
+    Determine which school year is archived and which school year is prepared by a rollover. The school years use the
+    same boundary as create_php_data (see current_school_year): after the summer break the data belongs to the past
+    school year, before the summer break to the current one.
+    :param today: date of the rollover (None for today)
+    :return tuple with the archived and the new school year, each as a tuple with the first and the second year
+    """
+    if today is None:
+        today = datetime.date.today()
+    first, second = current_school_year(today)
+    if today.year == first:
+        # The new school year has already started.
+        return (first - 1, first), (first, second)
+    return (first, second), (second, second + 1)
+
+
+def promote_grade(grade, max_grade=MAX_GRADE):
+    """
+    Move a grade to the next school year, e.g. "7" to "8" or "10b" to "11b".
+    :param grade: grade as string
+    :param max_grade: highest grade of a school
+    :return promoted grade, None if the student graduated or the unchanged grade if it does not start with a number
+    """
+    match = _GRADE_PATTERN.match(grade)
+    if match is None:
+        return grade
+    number = int(match.group(2)) + 1
+    if number > max_grade:
+        return None
+    return "{0}{1}{2}".format(match.group(1), number, match.group(3))
+
+
+def release_headers(headers, point_indices, first_release):
+    """
+    Number the point columns with consecutive release numbers.
+    :param headers: all header fields
+    :param point_indices: indices of the point columns
+    :param first_release: release number of the first point column
+    :return new list of headers
+    """
+    headers = list(headers)
+    for i, idx in enumerate(point_indices):
+        headers[idx] = str(first_release + i)
+    return headers
+
+
+def next_first_release(headers, point_indices):
+    """
+    :param headers: all header fields
+    :param point_indices: indices of the point columns
+    :return release number following the last release of the headers or 0 if the headers are no release numbers
+    """
+    releases = [int(headers[idx]) for idx in point_indices if headers[idx].strip().isdigit()]
+    return max(releases) + 1 if releases else 0
+
+
+def plan_rollover(user_data, schema, first_release, max_grade=MAX_GRADE):
+    """
+    Calculate all changes to prepare the data for the next school year: the point columns get the next release
+    numbers, all points and sums are cleared, all grades are promoted and graduated students are removed. The data is
+    not changed.
+    :param user_data: data for each student
+    :param schema: HeaderSchema of the data, which must contain a grade field
+    :param first_release: release number of the first point column in the new school year
+    :param max_grade: highest grade of a school
+    :return RolloverPlan
+    """
+    if schema.grade_index is None:
+        raise RolloverException("The grade field of the header settings must be part of the data.")
+
+    grade_idx = schema.grade_index
+    cleared = list(schema.point_indices) + [schema.sum_index]
+
+    # Each distinct grade is only promoted once and all students of a grade share the new value.
+    grades = {grade: promote_grade(grade, max_grade) for grade in {e[grade_idx] for e in user_data}}
+
+    changes, removed = [], []
+    for row, entry in enumerate(user_data):
+        grade = grades[entry[grade_idx]]
+        if grade is None:
+            removed.append(row)
+            continue
+        new_entry = list(entry)
+        for i in cleared:
+            new_entry[i] = EMPTY_CELL
+        new_entry[grade_idx] = grade
+        if new_entry != entry:
+            changes.append((row, new_entry))
+
+    return RolloverPlan(release_headers(schema.headers, schema.point_indices, first_release), changes, removed)
+
+
+def apply_rollover(user_data, plan):
+    """
+    :param user_data: data for each student
+    :param plan: RolloverPlan of the data
+    :return new list with the data for each student of the new school year
+    """
+    new_data = list(user_data)
+    for row, entry in plan.changes:
+        new_data[row] = entry
+    removed = set(plan.removed)
+    return [e for row, e in enumerate(new_data) if row not in removed]
+
+
+def format_rollover_summary(user_data, plan, schema):
+    """
+    :param user_data: data for each student
+    :param plan: RolloverPlan of the data
+    :param schema: HeaderSchema of the data
+    :return short description of the rollover as string
+    """
+    old_releases = ", ".join(schema.headers[i] for i in schema.point_indices)
+    new_releases = ", ".join(plan.headers[i] for i in schema.point_indices)
+    return "Releases: {0} -> {1}\n{2} of {3} students change, {4} students graduate.".format(
+        old_releases, new_releases, len(plan.changes), len(user_data), len(plan.removed))
+
+
+def format_rollover_diff(user_data, plan, schema):
+    """
+    Create a text report with all changes of a rollover, which is shown before the changes are applied.
+    :param user_data: data for each student
+    :param plan: RolloverPlan of the data
+    :param schema: HeaderSchema of the data
+    :return report as string with one line for each changed student
+    """
+    headers, name_idx = schema.headers, schema.name_index
+    lines = [format_rollover_summary(user_data, plan, schema), ""]
+
+    for row in plan.removed:
+        entry = user_data[row]
+        lines.append("- {0}: graduates from grade {1}".format(entry[name_idx], entry[schema.grade_index]))
+    for row, new_entry in plan.changes:
+        entry = user_data[row]
+        cells = ["{0} {1} -> {2}".format(headers[i], old, new)
+                 for i, (old, new) in enumerate(zip(entry, new_entry)) if old != new]
+        lines.append("~ {0}: {1}".format(entry[name_idx], "; ".join(cells)))
+    return "\n".join(lines)
@@ -0,0 +1,42 @@
+class SchemaException(ValueError):
+    pass
+
+
+class HeaderSchema(object):
+    """
+    Column indices of all special header fields (name, sum, grade, school and points). The indices are resolved and
+    validated once whenever the headers or the header settings change, so that no code has to search the headers
+    on each access.
+    """
+
+    __slots__ = ("headers", "name_index", "sum_index", "grade_index", "school_index", "point_indices",
+                 "point_index_set")
+
+    def __init__(self, headers, header_settings):
+        """
+        :param headers: all header fields
+        :param header_settings: header section of the application settings
+        """
+        self.headers = tuple(headers)
+
+        self.name_index = self._index(header_settings.name_field, required=True)
+        self.sum_index = self._index(header_settings.sum_field, required=True)
+        # Grade and school are only required for some features, e.g. the statistics.
+        self.grade_index = self._index(header_settings.grade_field)
+        self.school_index = self._index(header_settings.school_field)
+
+        self.point_indices = tuple(header_settings.point_indices)
+        if any(not 0 <= i < len(self.headers) for i in self.point_indices):
+            raise SchemaException("Point fields {0}-{1} are outside of the headers.".format(
+                header_settings.point_indices.start, header_settings.point_indices.stop))
+        if self.name_index in self.point_indices or self.sum_index in self.point_indices:
+            raise SchemaException("The name and sum field can not be point fields.")
+        self.point_index_set = frozenset(self.point_indices)
+
+    def _index(self, field, required=False):
+        try:
+            return self.headers.index(field)
+        except ValueError:
+            if required:
+                raise SchemaException("Missing header field: {0}".format(field))
+            return None
@@ -0,0 +1,114 @@
+import bisect
+
+from .helper import fold_words
+
+
+class SearchIndex(object):
+    """
+    Word prefix index over some columns of the data entries. Each entry is identified by id(entry), so the index does
+    not depend on the position of an entry. The words are folded (see fold_words), so that "mue" finds "Müller".
+
+    The index is two-level: each distinct (column, value) pair stores the ids of its entries and each distinct word
+    stores the (column, value) pairs which contain it. Values which are shared by many entries, like schools and
+    grades, are therefore only split into words once.
+    """
+
+    def __init__(self, columns, user_data=()):
+        """
+        :param columns: indices of the columns to index
+        :param user_data: initial data entries
+        """
+        self.columns = tuple(columns)
+        # (column, value) -> set with the ids of all entries with this value
+        self._value_ids = {}
+        # word -> set of (column, value) keys which contain this word
+        self._word_keys = {}
+        # Sorted list of all distinct words for the prefix search.
+        self._words = []
+
+        for entry in user_data:
+            self.add_entry(entry)
+
+    def _add_value(self, key, entry_id):
+        ids = self._value_ids.get(key)
+        if ids is None:
+            ids = self._value_ids[key] = set()
+            for word in fold_words(key[1]):
+                keys = self._word_keys.get(word)
+                if keys is None:
+                    keys = self._word_keys[word] = set()
+                    bisect.insort(self._words, word)
+                keys.add(key)
+        ids.add(entry_id)
+
+    def _remove_value(self, key, entry_id):
+        ids = self._value_ids.get(key)
+        if ids is None:
+            return
+        ids.discard(entry_id)
+        if ids:
+            return
+
+        # Drop the value and all words which are not used anymore.
+        del self._value_ids[key]
+        for word in fold_words(key[1]):
+            keys = self._word_keys.get(word)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._word_keys[word]
+                del self._words[bisect.bisect_left(self._words, word)]
+
+    def add_entry(self, entry):
+        """
+        :param entry: new data entry
+        """
+        for column in self.columns:
+            self._add_value((column, entry[column]), id(entry))
+
+    def remove_entry(self, entry):
+        """
+        :param entry: data entry to remove
+        """
+        for column in self.columns:
+            self._remove_value((column, entry[column]), id(entry))
+
+    def update_value(self, entry, column, old_value):
+        """
+        Update the index after a single value of an entry changed.
+        :param entry: data entry which already contains the new value
+        :param column: index of the changed value
+        :param old_value: value before the change
+        """
+        if column in self.columns:
+            self._remove_value((column, old_value), id(entry))
+            self._add_value((column, entry[column]), id(entry))
+
+    def _prefix_ids(self, prefix):
+        keys = set()
+        words = self._words
+        for i in range(bisect.bisect_left(words, prefix), len(words)):
+            if not words[i].startswith(prefix):
+                break
+            keys.update(self._word_keys[words[i]])
+
+        ids = set()
+        for key in keys:
+            ids.update(self._value_ids[key])
+        return ids
+
+    def search(self, text):
+        """
+        Find all entries which contain a word starting with each word of the search text.
+        :param text: search text
+        :return set with the ids of all matching entries or None if the text does not contain any word
+        """
+        # Start with the longest word, which usually matches the fewest entries.
+        result = None
+        for prefix in sorted(set(fold_words(text)), key=len, reverse=True):
+            ids = self._prefix_ids(prefix)
+            result = ids if result is None else result & ids
+            if not result:
+                break
+        return result
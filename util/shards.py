@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import datetime
+from functools import partial
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .parser import create_php_data, escape_html, current_school_year
+from .publish import content_hash
+from .state import write_file_atomic
+from .helper import fold_words
+
+
+# Ways to split the ranking into pages: pages with a fixed number of students, one page per grade or one page per
+# initial letter of the name.
+SPLIT_MODES = ("rows", "grade", "letter")
+
+# Number of students on each page if the ranking is split by rows.
+DEFAULT_PAGE_SIZE = 500
+
+# Number of pages rendered and written at the same time.
+EXPORT_WORKERS = 4
+
+# Suffix of the file next to the index page which contains the content hash of each exported page.
+MANIFEST_SUFFIX = ".pages.json"
+
+# Key and title of the page for names which do not start with a letter.
+OTHER_KEY = "other"
+OTHER_TITLE = "#"
+
+
+class ShardException(Exception):
+    pass
+
+
+# A single page of the ranking:
+# - key: part of the file name, e.g. "3" or "a"
+# - title: link text on the index page
+# - rows: students on this page in the order of the ranking
+Shard = namedtuple("Shard", ["key", "title", "rows"])
+
+# Result of an export:
+# - written: file names of the pages which were written
+# - skipped: file names of the pages which did not change since the last export
+# - removed: file names of the pages of the last export which do not exist anymore
+ShardExportResult = namedtuple("ShardExportResult", ["written", "skipped", "removed"])
+
+
+def _grade_order(grade):
+    match = re.match(r"\s*(\d+)", grade)
+    return (0, int(match.group(1)), grade) if match else (1, 0, grade)
+
+
+def initial_letter(name):
+    """
+    :param name: name of a student
+    :return first letter of the name without umlauts and accents as upper case letter, e.g. "O" for "Ömer", or None
+            if the name does not start with a letter
+    """
+    words = fold_words(name)
+    letter = words[0][0].upper() if words else ""
+    return letter if "A" <= letter <= "Z" else None
+
+
+def split_ranking(user_data, schema, mode, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Split the ranking into pages. The students keep the order of the ranking on each page.
+    :param user_data: data for each student in the order of the ranking
+    :param schema: HeaderSchema of the data
+    :param mode: one of SPLIT_MODES
+    :param page_size: number of students on each page for the mode "rows"
+    :return list of Shard
+    """
+    if mode == "rows":
+        if page_size < 1:
+            raise ShardException("A page must contain at least one student.")
+        starts = range(0, len(user_data), page_size) or [0]
+        return [Shard(str(i), "Seite {0}".format(i), user_data[start:start+page_size])
+                for i, start in enumerate(starts, 1)]
+
+    if mode == "grade":
+        if schema.grade_index is None:
+            raise ShardException("The data has no grade column.")
+        grade_index = schema.grade_index
+        groups = {}
+        for entry in user_data:
+            groups.setdefault(entry[grade_index], []).append(entry)
+        return [Shard(grade, "Klassenstufe {0}".format(grade), groups[grade])
+                for grade in sorted(groups, key=_grade_order)]
+
+    if mode == "letter":
+        name_index = schema.name_index
+        groups = {}
+        for entry in user_data:
+            groups.setdefault(initial_letter(entry[name_index]), []).append(entry)
+        shards = [Shard(letter.lower(), letter, groups[letter]) for letter in sorted(k for k in groups if k)]
+        if None in groups:
+            shards.append(Shard(OTHER_KEY, OTHER_TITLE, groups[None]))
+        return shards
+
+    raise ShardException("Unknown split mode: {0}".format(mode))
+
+
+def page_file_names(path, shards):
+    """
+    :param path: path of the index page, e.g. "loeser.php"
+    :param shards: list of Shard
+    :return unique file name of each page next to the index page, e.g. "loeser_3.php"
+    """
+    stem, ext = os.path.splitext(os.path.basename(path))
+    names, used = [], set()
+    for shard in shards:
+        key = re.sub(r"[^0-9A-Za-z]+", "-", shard.key).strip("-") or OTHER_KEY
+        name = "{0}_{1}{2}".format(stem, key, ext or ".php")
+        # Different grades might only differ in characters which are not allowed in a file name.
+        i = 2
+        while name.lower() in used:
+            name = "{0}_{1}-{2}{3}".format(stem, key, i, ext or ".php")
+            i += 1
+        used.add(name.lower())
+        names.append(name)
+    return names
+
+
+def _page_file_pattern(path):
+    """
+    :param path: path of the index page, e.g. "loeser.php"
+    :return compiled pattern which matches all file names created by page_file_names for this index page
+    """
+    stem, ext = os.path.splitext(os.path.basename(path))
+    return re.compile(r"{0}_[0-9A-Za-z-]+{1}".format(re.escape(stem), re.escape(ext or ".php")))
+
+
+def create_index_page(pages):
+    """
+    Create the php page which links to all pages of the ranking.
+    :param pages: list of (file name, title, number of students) tuples
+    """
+    today = datetime.date.today()
+    links = "".join("""
+    <li><a href="{0}">{1}</a> ({2})</li>""".format(escape_html(name), escape_html(title), count)
+                    for name, title, count in pages)
+
+    return """<?php include 'top.php';?>
+
+<head>
+<h2 style="color:firebrick">Rubrik der L&ouml;serinnen und L&ouml;ser</h2>
+<p><i>Stand: {0}</i></p> <!-- aktuelles Datum im Format %d.%m.%Y -->
+<p><i>Die Klassenangaben beziehen sich auf das Schuljahr {1}/{2}.</i></p> <!-- Schuljahr im Format 2018/2019 -->
+<p>
+</head>
+
+<ul style="margin-left:10%;">{3}
+</ul>
+
+<?php include 'bottom.php';?>
+""".format(today.strftime("%d.%m.%Y"), *current_school_year(today), links)
+
+
+def _load_manifest(path):
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def _write_page(directory, name, render, last_hash):
+    """
+    Render a page and write it unless it did not change since the last export.
+    :return file name, content hash, True if the file was written
+    """
+    data = render().encode("utf-8")
+    digest = content_hash(data)
+    path = os.path.join(directory, name)
+    if digest == last_hash and os.path.exists(path):
+        return name, digest, False
+    write_file_atomic(path, data)
+    return name, digest, True
+
+
+def export_sharded(path, headers, user_data, schema, mode, page_size=DEFAULT_PAGE_SIZE, dictionaries=None,
+                   workers=EXPORT_WORKERS, progress=None):
+    """
+    Export the ranking into one php file per page and an index page which links to all pages. Each page contains the
+    top.php and bottom.php includes like a single export. The pages are rendered and written in parallel. Pages which
+    did not change since the last export (compared by content_hash, so the date of the export is ignored) are not
+    written again and pages of the last export which do not exist anymore are removed. Only file names which were
+    created for this index page are removed, other names in a modified manifest are ignored.
+    :param path: path of the index page, the pages are written next to it
+    :param headers: all header fields
+    :param user_data: data for each student in the order of the ranking
+    :param schema: HeaderSchema of the data
+    :param mode: one of SPLIT_MODES
+    :param page_size: number of students on each page for the mode "rows"
+    :param dictionaries: column dictionaries of the data (see create_php_data)
+    :param workers: number of pages rendered and written at the same time
+    :param progress: function which is called with the number of entries before the pages are written (None to ignore)
+    :return ShardExportResult
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    index_name = os.path.basename(path)
+    manifest_path = os.path.join(directory, os.path.splitext(index_name)[0] + MANIFEST_SUFFIX)
+    last_hashes = _load_manifest(manifest_path)
+
+    shards = split_ranking(user_data, schema, mode, page_size)
+    if progress is not None:
+        progress(len(user_data))
+    names = page_file_names(path, shards)
+    jobs = [(name, partial(create_php_data, headers, shard.rows, dictionaries)) for name, shard in zip(names, shards)]
+    pages = [(name, shard.title, len(shard.rows)) for name, shard in zip(names, shards)]
+    jobs.append((index_name, partial(create_index_page, pages)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda job: _write_page(directory, job[0], job[1], last_hashes.get(job[0])), jobs))
+
+    current = {name for name, _ in jobs}
+    page_pattern = _page_file_pattern(path)
+    removed = []
+    for name in last_hashes:
+        if name not in current and page_pattern.fullmatch(name) and os.path.exists(os.path.join(directory, name)):
+            os.remove(os.path.join(directory, name))
+            removed.append(name)
+
+    write_file_atomic(manifest_path, json.dumps({name: digest for name, digest, _ in results}, indent=1)
+                      .encode("utf-8"))
+    return ShardExportResult([name for name, _, written in results if written],
+                             [name for name, _, written in results if not written], removed)
+
+
+def format_export_result(result):
+    """
+    :param result: ShardExportResult
+    :return one line summary
+    """
+    return "Wrote {0} pages, {1} unchanged, {2} removed.".format(len(result.written), len(result.skipped),
+                                                                 len(result.removed))
@@ -0,0 +1,153 @@
+from collections import namedtuple
+
+from .collation import CollationCache
+from .helper import str_to_points
+
+
+class SortColumn(namedtuple("SortColumn", ("column", "descending", "numeric"))):
+    """
+    A single column of a sort order.
+    :param column: index of the column
+    :param descending: True to sort the largest value first
+    :param numeric: True to compare the points of the values (see str_to_points) instead of the text
+    """
+    __slots__ = ()
+
+    def __new__(cls, column, descending=False, numeric=False):
+        return super(SortColumn, cls).__new__(cls, column, descending, numeric)
+
+
+class _Descending(object):
+    """
+    Wrapper which reverses the order of a text key inside a composite key.
+    """
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __gt__(self, other):
+        return other.key > self.key
+
+    def __le__(self, other):
+        return other.key <= self.key
+
+    def __ge__(self, other):
+        return other.key >= self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+class _PointsCache(dict):
+    """
+    Map each value to its points. Like CollationCache the points of each distinct value are only computed once.
+    """
+
+    __slots__ = ("max_size",)
+
+    def __init__(self, max_size=None):
+        super(_PointsCache, self).__init__()
+        self.max_size = max_size
+
+    def __missing__(self, text):
+        if self.max_size is not None and len(self) >= self.max_size:
+            self.clear()
+        key = self[text] = str_to_points(text)
+        return key
+
+
+class RowSorter(object):
+    """
+    Sort rows by one or more columns, e.g. by the sum in descending order and then by the name. The keys of each column
+    are cached per distinct value, so sorting again after an edit only computes the keys of the changed values.
+    """
+
+    # Minimal number of cached keys per column. The caches are cleared if they hold more than twice as many keys as
+    # there are rows, so that the keys of old values do not pile up.
+    MIN_CACHE_SIZE = 4096
+
+    def __init__(self, columns):
+        """
+        :param columns: list of SortColumn instances or column indices, the most significant column first
+        """
+        self.columns = tuple(c if isinstance(c, SortColumn) else SortColumn(c) for c in columns)
+        if not self.columns:
+            raise ValueError("A sort order requires at least one column.")
+        self.column_set = frozenset(c.column for c in self.columns)
+        self._caches = [(_PointsCache if c.numeric else CollationCache)(self.MIN_CACHE_SIZE) for c in self.columns]
+
+        # Function which returns the composite sort key of an entry. Build it once for the configured columns.
+        parts = []
+        for c, cache in zip(self.columns, self._caches):
+            if c.numeric and c.descending:
+                parts.append(lambda e, i=c.column, cache=cache: -cache[e[i]])
+            elif c.descending:
+                parts.append(lambda e, i=c.column, cache=cache: _Descending(cache[e[i]]))
+            else:
+                parts.append(lambda e, i=c.column, cache=cache: cache[e[i]])
+        if len(parts) == 1:
+            self.key = parts[0]
+        else:
+            self.key = lambda e: tuple(part(e) for part in parts)
+
+    def __eq__(self, other):
+        return isinstance(other, RowSorter) and self.columns == other.columns
+
+    def __hash__(self):
+        return hash(self.columns)
+
+    def _limit_caches(self, num_rows):
+        size = max(self.MIN_CACHE_SIZE, 2 * num_rows)
+        for cache in self._caches:
+            cache.max_size = size
+
+    def order(self, rows):
+        """
+        Sort the row numbers of the rows. The sort is stable, rows with equal keys keep their order.
+        :param rows: list of data entries
+        :return list with the row number of each entry in sorted order
+        """
+        self._limit_caches(len(rows))
+        order = list(range(len(rows)))
+        # Sort by the least significant column first. Each pass is stable, so the result is sorted by all columns
+        # without building a composite key for each row.
+        for c, cache in reversed(list(zip(self.columns, self._caches))):
+            keys = [cache[e[c.column]] for e in rows]
+            order.sort(key=keys.__getitem__, reverse=c.descending)
+        return order
+
+    def sort(self, rows):
+        """
+        Sort rows in place. See order.
+        :param rows: list of data entries
+        """
+        rows[:] = [rows[i] for i in self.order(rows)]
+
+    def insert_position(self, rows, entry, lo=0, hi=None):
+        """
+        Find the position of an entry inside sorted rows behind all entries with an equal key.
+        :param rows: list of data entries sorted by this sorter
+        :param entry: data entry
+        :param lo: first row to consider
+        :param hi: row behind the last row to consider (None for the end of the rows)
+        :return insert position
+        """
+        if hi is None:
+            hi = len(rows)
+        key = self.key
+        entry_key = key(entry)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if entry_key < key(rows[mid]):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
@@ -0,0 +1,183 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .journal import read_journal, replay_journal
+from .stateformat import encode_state, is_encoded_state, read_state_file, read_legacy_state_file
+
+
+def generation_path(path, generation):
+    """
+    :param path: path to the state file
+    :param generation: 0 for the current snapshot, 1 for the previous one, ...
+    :return path to a specific generation of the state file
+    """
+    return path if generation == 0 else "{0}.{1}".format(path, generation)
+
+
+def write_file_atomic(path, data, generations=0):
+    """
+    Write data to a temporary file, sync it to the disc and atomically rename it. The previous versions of the file are
+    kept as path.1, path.2, ..., path.n.
+    :param path: destination path
+    :param data: bytes to write
+    :param generations: number of previous versions to keep
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+    if generations > 0 and os.path.exists(path):
+        # Shift all older generations and drop the oldest one.
+        for i in range(generations-1, 0, -1):
+            older = generation_path(path, i)
+            if os.path.exists(older):
+                os.replace(older, generation_path(path, i+1))
+        # Keep the current file in place until it is replaced to never leave the path without a valid file.
+        previous = generation_path(path, 1)
+        if os.path.exists(previous):
+            os.remove(previous)
+        try:
+            os.link(path, previous)
+        except OSError:
+            with open(path, "rb") as src, open(previous, "wb") as dst:
+                dst.write(src.read())
+
+    os.replace(tmp_path, path)
+
+    # Persist the rename. This is not supported on every platform.
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+
+def save_state(path, headers, user_data, checked_rows, journal_seq=0, generations=0, compress=True):
+    """
+    Atomically write a snapshot of the application state to a file.
+    :param path: path to the state file
+    :param headers: all header fields
+    :param user_data: data for each student
+    :param checked_rows: indices of all checked rows
+    :param journal_seq: sequence number of the last journal record included in this snapshot
+    :param generations: number of previous snapshots to keep
+    :param compress: True to compress the snapshot
+    """
+    write_file_atomic(path, encode_state(headers, user_data, checked_rows, journal_seq, compress), generations)
+
+
+def _load_snapshot(path):
+    with open(path, "rb") as f:
+        magic = f.read(8)
+
+    if is_encoded_state(magic):
+        return read_state_file(path)
+    # Migrate pickled states written by older versions. The next snapshot is written in the binary format.
+    return read_legacy_state_file(path)
+
+
+def load_state(path, journal_path=None, generations=0):
+    """
+    Load the last snapshot of the application state and replay all journal records written after it. If the snapshot
+    is missing or corrupt, the previous generations are tried in order.
+    :param path: path to the state file
+    :param journal_path: path to the journal file (None to ignore the journal)
+    :param generations: number of previous snapshots to try
+    :return headers, user data, indices of all checked rows, sequence number of the last applied journal record
+    """
+    error = None
+    for generation in range(generations+1):
+        try:
+            headers, user_data, checked_rows, seq = _load_snapshot(generation_path(path, generation))
+            break
+        except Exception as e:
+            error = e
+    else:
+        raise error
+
+    if journal_path:
+        checked = [False]*len(user_data)
+        for row in checked_rows:
+            if 0 <= row < len(checked):
+                checked[row] = True
+
+        seq = replay_journal(read_journal(journal_path), headers, user_data, checked, seq)
+        checked_rows = [row for row, state in enumerate(checked) if state]
+
+    return headers, user_data, checked_rows, seq
+
+
+class StateWriter(object):
+    """
+    Write snapshots of the application state on a background thread. The caller only pays for an immutable copy of the
+    data, serializing and writing the snapshot happens in the background. After a snapshot was written, the journal
+    records it contains are discarded. The same thread syncs the journal records, so edits never wait for the disc.
+    """
+
+    def __init__(self, path, journal, generations=0, compress=True):
+        """
+        :param path: path to the state file
+        :param journal: StateJournal with all changes since the last snapshot
+        :param generations: number of previous snapshots to keep
+        :param compress: True to compress the snapshots
+        """
+        self.path = path
+        self.journal = journal
+        self.generations = generations
+        self.compress = compress
+        # Sequence number of the last journal record which is part of a written snapshot.
+        self.saved_seq = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future = None
+
+    def is_busy(self):
+        """
+        :return True if a snapshot is currently being written.
+        """
+        return self._future is not None and not self._future.done()
+
+    def save(self, headers, user_data, checked_rows, seq):
+        """
+        Write a new snapshot in the background.
+        :param headers: all header fields
+        :param user_data: data for each student
+        :param checked_rows: indices of all checked rows
+        :param seq: sequence number of the last journal record included in this snapshot
+        """
+        # Copy the data while we are still on the calling thread. The model might change while we are writing.
+        snapshot = (tuple(headers), tuple(tuple(e) for e in user_data), tuple(checked_rows))
+        self._future = self._executor.submit(self._write, snapshot, seq)
+
+    def _write(self, snapshot, seq):
+        headers, user_data, checked_rows = snapshot
+        save_state(self.path, headers, user_data, checked_rows, seq, self.generations, self.compress)
+        self.journal.discard(seq)
+        self.saved_seq = seq
+
+    def sync_journal(self):
+        """
+        Sync the buffered records of the journal to the disc in the background.
+        """
+        if not self.journal.is_synced():
+            self._executor.submit(self.journal.sync)
+
+    def wait(self):
+        """
+        Wait until the current snapshot is written.
+        :return True if the last snapshot was written successfully, otherwise False
+        """
+        if self._future is None:
+            return True
+        return self._future.exception() is None
+
+    def shutdown(self):
+        """
+        Wait for the current snapshot and stop the background thread.
+        """
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,205 @@
+"""
+Versioned binary format for the saved application state.
+
+Layout (all integers are little endian):
+
+    header      magic (8 bytes), version (uint16), flags (uint16), number of headers (uint32), number of rows (uint32),
+                number of strings (uint32), number of checked rows (uint32), journal sequence number (uint64),
+                payload length (uint32), payload crc32 (uint32)
+    payload     string lengths (uint32 * strings), utf-8 string data, header codes (uint32 * headers),
+                one column of string codes per header (uint32 * rows), checked rows (uint32 * checked rows)
+
+Every distinct string is stored once inside the string table, all other values refer to it by its index. The payload
+is optionally compressed with zlib. The fixed size header can be validated without reading the payload.
+"""
+
+import sys
+import mmap
+import zlib
+import struct
+import pickle
+from array import array
+
+
+MAGIC = b"MONOIDST"
+VERSION = 1
+
+# Payload is zlib compressed.
+FLAG_COMPRESSED = 1
+
+_HEADER = struct.Struct("<8sHHIIIIQII")
+
+
+class CorruptStateException(Exception):
+    pass
+
+
+# Array typecode for unsigned 32 bit integers.
+_UINT32 = "I" if array("I").itemsize == 4 else "L"
+
+
+def _pack_uint32(values):
+    packed = array(_UINT32, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack_uint32(data, offset, count):
+    end = offset + 4*count
+    if end > len(data):
+        raise CorruptStateException("Payload is truncated.")
+    values = array(_UINT32)
+    values.frombytes(data[offset:end])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, end
+
+
+def encode_state(headers, user_data, checked_rows, journal_seq=0, compress=True):
+    """
+    Encode the application state in the binary state format.
+    :param headers: all header fields
+    :param user_data: data for each student
+    :param checked_rows: indices of all checked rows
+    :param journal_seq: sequence number of the last journal record included in this snapshot
+    :param compress: True to compress the payload
+    :return encoded state as bytes
+    """
+    codes = {}
+    strings = []
+
+    def code(value):
+        c = codes.get(value)
+        if c is None:
+            c = codes[value] = len(strings)
+            strings.append(value)
+        return c
+
+    header_codes = [code(h) for h in headers]
+    columns = [[code(entry[i]) for entry in user_data] for i in range(len(headers))]
+
+    encoded = [s.encode("utf-8") for s in strings]
+    payload = b"".join([_pack_uint32(len(s) for s in encoded), b"".join(encoded), _pack_uint32(header_codes)] +
+                       [_pack_uint32(column) for column in columns] + [_pack_uint32(checked_rows)])
+
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload)
+        flags |= FLAG_COMPRESSED
+
+    header = _HEADER.pack(MAGIC, VERSION, flags, len(headers), len(user_data), len(strings), len(checked_rows),
+                          journal_seq, len(payload), zlib.crc32(payload))
+    return header + payload
+
+
+def is_encoded_state(data):
+    """
+    :param data: file content or the first bytes of it
+    :return True if the data starts with the magic bytes of the binary state format
+    """
+    return data[:len(MAGIC)] == MAGIC
+
+
+def read_header(data):
+    """
+    Read and validate the fixed size header.
+    :param data: file content (bytes or mmap)
+    :return version, flags, number of headers, number of rows, number of strings, number of checked rows, journal seq,
+            payload checksum
+    """
+    if len(data) < _HEADER.size:
+        raise CorruptStateException("File is too small.")
+
+    magic, version, flags, num_headers, num_rows, num_strings, num_checked, seq, length, crc = \
+        _HEADER.unpack_from(data, 0)
+
+    if magic != MAGIC:
+        raise CorruptStateException("Not a saved application state.")
+    if version > VERSION:
+        raise CorruptStateException("Unsupported state version: {0}.".format(version))
+    if _HEADER.size + length != len(data):
+        raise CorruptStateException("Payload length does not match the file size.")
+
+    return version, flags, num_headers, num_rows, num_strings, num_checked, seq, crc
+
+
+def decode_state(data):
+    """
+    Decode the binary state format. The payload is read in place, a memory mapped file is never copied as a whole.
+    :param data: file content (bytes or mmap)
+    :return headers, user data, indices of all checked rows, journal sequence number
+    """
+    _, flags, num_headers, num_rows, num_strings, num_checked, seq, crc = read_header(data)
+
+    # The view is released before returning, otherwise the mmap could not be closed.
+    with memoryview(data)[_HEADER.size:] as view:
+        if zlib.crc32(view) != crc:
+            raise CorruptStateException("Payload checksum mismatch.")
+        if flags & FLAG_COMPRESSED:
+            payload, offset = zlib.decompress(view), 0
+        else:
+            payload, offset = data, _HEADER.size
+
+    # Rebuild the string table. Each distinct value exists only once in memory.
+    lengths, offset = _unpack_uint32(payload, offset, num_strings)
+    strings = []
+    for length in lengths:
+        strings.append(payload[offset:offset+length].decode("utf-8"))
+        offset += length
+
+    try:
+        header_codes, offset = _unpack_uint32(payload, offset, num_headers)
+        headers = [strings[c] for c in header_codes]
+
+        columns = []
+        for _ in range(num_headers):
+            codes, offset = _unpack_uint32(payload, offset, num_rows)
+            columns.append([strings[c] for c in codes])
+    except IndexError:
+        raise CorruptStateException("Invalid string reference.")
+
+    checked_rows, offset = _unpack_uint32(payload, offset, num_checked)
+    if offset != len(payload):
+        raise CorruptStateException("Unexpected data after the payload.")
+
+    user_data = [list(entry) for entry in zip(*columns)] if num_headers else [[] for _ in range(num_rows)]
+    return headers, user_data, list(checked_rows), seq
+
+
+def read_state_file(path):
+    """
+    Read a state file. The file is memory mapped and validated before it is decoded.
+    :param path: path to the state file
+    :return headers, user data, indices of all checked rows, journal sequence number
+    """
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return decode_state(data)
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """
+    Unpickler for state files written before the binary format existed. These files only contain builtin containers
+    and strings, every other object is rejected.
+    """
+
+    def find_class(self, module, name):
+        raise CorruptStateException("Forbidden object in legacy state: {0}.{1}".format(module, name))
+
+
+def read_legacy_state_file(path):
+    """
+    Read a pickled state file written by an older version of this application.
+    :param path: path to the state file
+    :return headers, user data, indices of all checked rows, journal sequence number
+    """
+    with open(path, "rb") as f:
+        pickle_data = _LegacyUnpickler(f).load()
+
+    headers = list(pickle_data["headers"])
+    user_data = [list(e) for e in pickle_data["user_data"]]
+    checked_rows = list(pickle_data["checked_rows"])
+    # Snapshots written before the journal existed do not contain a sequence number.
+    seq = pickle_data.get("journal_seq", 0)
+    return headers, user_data, checked_rows, seq
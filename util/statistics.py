@@ -0,0 +1,232 @@
+import bisect
+from collections import namedtuple
+
+from .helper import str_to_points, points_to_str
+from .schema import SchemaException
+
+
+# Group key used for the aggregate over all students. A unique object, so it can not collide with the key of a
+# group, e.g. of a school named "Total".
+TOTAL_GROUP = object()
+
+# Title of the aggregate over all students.
+TOTAL_TITLE = "Total"
+
+# Aggregated values for a single column of a group.
+ColumnStatistics = namedtuple("ColumnStatistics", ["count", "mean", "median", "top_scorer", "top_points"])
+
+
+def cell_points(value):
+    """
+    Convert a cell to its points. Empty cells and "-" mean that the student did not participate and are ignored.
+    :param value: cell value as string
+    :return points as float or None if the cell is empty
+    """
+    if value is None or value.strip() in ("", "-"):
+        return None
+    return str_to_points(value)
+
+
+def statistics_columns(schema):
+    """
+    Resolve the column indices required to compute the statistics.
+    :param schema: HeaderSchema of the data
+    :return name index, list of group indices (school, grade), list of value indices (points, sum)
+    """
+    if schema.school_index is None or schema.grade_index is None:
+        raise SchemaException("The statistics require a school and a grade field.")
+    return schema.name_index, [schema.school_index, schema.grade_index], list(schema.point_indices) + [schema.sum_index]
+
+
+class _ColumnAggregate(object):
+    """
+    Sorted (points, name) pairs of a single column inside a group. Keeping the pairs sorted allows reading the median
+    and the top scorer directly and updating both in O(log n) search time when a single value changes.
+    """
+
+    __slots__ = ("pairs", "total")
+
+    def __init__(self, pairs=None):
+        self.pairs = sorted(pairs) if pairs else []
+        self.total = sum(p for p, _ in self.pairs)
+
+    def add(self, points, name):
+        bisect.insort(self.pairs, (points, name))
+        self.total += points
+
+    def remove(self, points, name):
+        i = bisect.bisect_left(self.pairs, (points, name))
+        if i < len(self.pairs) and self.pairs[i] == (points, name):
+            del self.pairs[i]
+            self.total -= points
+
+    def statistics(self):
+        """
+        :return ColumnStatistics for this column
+        """
+        n = len(self.pairs)
+        if n == 0:
+            return ColumnStatistics(0, None, None, None, None)
+
+        mid = n // 2
+        if n % 2:
+            median = self.pairs[mid][0]
+        else:
+            median = (self.pairs[mid-1][0] + self.pairs[mid][0]) / 2
+
+        # Use the alphabetically first student if several students share the best result.
+        top_points = self.pairs[-1][0]
+        top_scorer = self.pairs[bisect.bisect_left(self.pairs, (top_points,))][1]
+
+        return ColumnStatistics(n, self.total / n, median, top_scorer, top_points)
+
+
+class RosterStatistics(object):
+    """
+    Count, mean, median and top scorer for each value column grouped by arbitrary columns (e.g. school and grade).
+    The statistics are built in a single pass over all rows and are afterwards updated incrementally by calling
+    add_entry, remove_entry and update_value whenever the underlying data changes.
+    """
+
+    def __init__(self, user_data, name_index, group_indices, value_indices):
+        """
+        :param user_data: data for each student
+        :param name_index: index of the name inside an entry
+        :param group_indices: indices of the columns to group by
+        :param value_indices: indices of the columns to aggregate
+        """
+        self.name_index = name_index
+        self.group_indices = list(group_indices)
+        self.value_indices = list(value_indices)
+        self.rebuild(user_data)
+
+    def group_key(self, entry):
+        """
+        :return the group key of a data entry
+        """
+        return tuple(entry[i] for i in self.group_indices)
+
+    def rebuild(self, user_data):
+        """
+        Recompute all statistics from scratch with a single pass over the data.
+        :param user_data: data for each student
+        """
+        # Collect the raw (points, name) pairs for each group and column and sort each collection only once.
+        counts = {}
+        pairs = {}
+        for entry in user_data:
+            name = entry[self.name_index]
+            for key in (self.group_key(entry), TOTAL_GROUP):
+                counts[key] = counts.get(key, 0) + 1
+                columns = pairs.setdefault(key, [[] for _ in self.value_indices])
+                for values, idx in zip(columns, self.value_indices):
+                    points = cell_points(entry[idx])
+                    if points is not None:
+                        values.append((points, name))
+
+        self._counts = counts
+        self._groups = {key: [_ColumnAggregate(v) for v in columns] for key, columns in pairs.items()}
+
+    def _apply(self, entry, add):
+        name = entry[self.name_index]
+        for key in (self.group_key(entry), TOTAL_GROUP):
+            if add:
+                self._counts[key] = self._counts.get(key, 0) + 1
+                columns = self._groups.setdefault(key, [_ColumnAggregate() for _ in self.value_indices])
+            else:
+                self._counts[key] -= 1
+                columns = self._groups[key]
+
+            for column, idx in zip(columns, self.value_indices):
+                points = cell_points(entry[idx])
+                if points is None:
+                    continue
+                if add:
+                    column.add(points, name)
+                else:
+                    column.remove(points, name)
+
+            # Drop empty groups.
+            if not add and self._counts[key] == 0:
+                del self._counts[key]
+                del self._groups[key]
+
+    def add_entry(self, entry):
+        """
+        Include a new data entry in the statistics.
+        :param entry: new data entry
+        """
+        self._apply(entry, True)
+
+    def remove_entry(self, entry):
+        """
+        Remove a data entry from the statistics.
+        :param entry: data entry to remove
+        """
+        self._apply(entry, False)
+
+    def update_value(self, entry, column, old_value):
+        """
+        Update the statistics after a single value of an entry changed.
+        :param entry: data entry which already contains the new value
+        :param column: index of the changed value
+        :param old_value: value before the change
+        """
+        if column not in self.value_indices and column not in self.group_indices and column != self.name_index:
+            return
+        old_entry = list(entry)
+        old_entry[column] = old_value
+        self.remove_entry(old_entry)
+        self.add_entry(entry)
+
+    def groups(self):
+        """
+        :return a sorted list of all group keys excluding the total group
+        """
+        return sorted(k for k in self._groups if k is not TOTAL_GROUP)
+
+    def count(self, key):
+        """
+        :param key: group key
+        :return number of students inside the group
+        """
+        return self._counts.get(key, 0)
+
+    def statistics(self, key):
+        """
+        :param key: group key
+        :return list of ColumnStatistics in the order of the value indices
+        """
+        columns = self._groups.get(key, [_ColumnAggregate() for _ in self.value_indices])
+        return [c.statistics() for c in columns]
+
+
+def format_points(points):
+    """
+    Convert an aggregated value to a readable string.
+    :param points: points as float or None
+    """
+    if points is None:
+        return "-"
+    return points_to_str(float(round(points, 2)))
+
+
+def format_statistics_report(headers, stats):
+    """
+    Create a plain text report of the statistics.
+    :param headers: all header fields
+    :param stats: RosterStatistics instance
+    :return report as string
+    """
+    group_names = " / ".join(headers[i] for i in stats.group_indices)
+    lines = []
+    for key in stats.groups() + [TOTAL_GROUP]:
+        if key is TOTAL_GROUP:
+            lines.append("All: {0} ({1} students)".format(TOTAL_TITLE, stats.count(key)))
+        else:
+            lines.append("{0}: {1} ({2} students)".format(group_names, " / ".join(key), stats.count(key)))
+        for idx, col in zip(stats.value_indices, stats.statistics(key)):
+            top = "{0} ({1})".format(col.top_scorer, format_points(col.top_points)) if col.count else "-"
+            lines.append("    {0:<12} count: {1:<5} mean: {2:<6} median: {3:<6} top: {4}".format(
+                headers[idx], col.count, format_points(col.mean), format_points(col.median), top))
+    return "\n".join(lines)
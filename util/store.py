@@ -0,0 +1,178 @@
+import json
+import sqlite3
+
+from .helper import str_to_points, normalize_name
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rosters (
+    school_year TEXT PRIMARY KEY,
+    headers TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY,
+    school_year TEXT NOT NULL REFERENCES rosters(school_year) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_norm TEXT NOT NULL,
+    school TEXT,
+    grade TEXT,
+    total REAL,
+    entry TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+    release INTEGER NOT NULL,
+    points TEXT NOT NULL,
+    PRIMARY KEY (student_id, release)
+);
+CREATE INDEX IF NOT EXISTS students_position ON students(school_year, position);
+CREATE INDEX IF NOT EXISTS students_name ON students(name_norm);
+CREATE INDEX IF NOT EXISTS students_school ON students(school_year, school);
+CREATE INDEX IF NOT EXISTS students_grade ON students(school_year, grade, total DESC);
+CREATE INDEX IF NOT EXISTS results_release ON results(release);
+"""
+
+
+def format_school_year(school_year):
+    """
+    :param school_year: tuple with the first and the second year, e.g. (2018, 2019)
+    :return school year as string, e.g. "2018/2019"
+    """
+    return "{0}/{1}".format(*school_year)
+
+
+class StoreException(Exception):
+    pass
+
+
+class ResultsStore(object):
+    """
+    SQLite database with the results of multiple school years. Each school year contains the full roster in the order
+    of the list view. The points of each release are additionally stored by their release number, which allows
+    querying the results of a student across all years.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path to the database file
+        """
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self._db.close()
+
+    def save_roster(self, school_year, user_data, schema):
+        """
+        Save the roster of a school year. An existing roster for this school year is replaced.
+        :param school_year: school year as string
+        :param user_data: data for each student
+        :param schema: HeaderSchema of the data, which must contain a grade and a school field
+        :raise StoreException if the data has no grade or school field
+        """
+        if schema.grade_index is None or schema.school_index is None:
+            raise StoreException("The name, sum, grade and school fields of the header settings must be part of the "
+                                 "data.")
+
+        headers = list(schema.headers)
+        name_idx, school_idx, grade_idx, sum_idx = schema.name_index, schema.school_index, schema.grade_index, \
+                                                   schema.sum_index
+
+        # Only headers with a numeric title are release numbers.
+        releases = [(idx, int(headers[idx])) for idx in schema.point_indices if headers[idx].isdigit()]
+
+        with self._db:
+            self._db.execute("DELETE FROM rosters WHERE school_year = ?", (school_year,))
+            self._db.execute("INSERT INTO rosters VALUES (?, ?)", (school_year, json.dumps(headers)))
+
+            for position, entry in enumerate(user_data):
+                # Fall back to the sum of the points if the sum field was not filled in.
+                total = str_to_points(entry[sum_idx])
+                if not total:
+                    total = sum(str_to_points(entry[i]) for i in schema.point_indices)
+                cursor = self._db.execute(
+                    "INSERT INTO students (school_year, position, name, name_norm, school, grade, total, entry) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (school_year, position, entry[name_idx], normalize_name(entry[name_idx]), entry[school_idx],
+                     entry[grade_idx], total, json.dumps(entry, ensure_ascii=False)))
+
+                self._db.executemany("INSERT INTO results VALUES (?, ?, ?)",
+                                     [(cursor.lastrowid, release, entry[idx]) for idx, release in releases])
+
+    def delete_roster(self, school_year):
+        """
+        Remove a school year from the store.
+        :param school_year: school year as string
+        """
+        with self._db:
+            self._db.execute("DELETE FROM rosters WHERE school_year = ?", (school_year,))
+
+    def school_years(self):
+        """
+        :return sorted list of all stored school years
+        """
+        return [r[0] for r in self._db.execute("SELECT school_year FROM rosters ORDER BY school_year")]
+
+    def headers(self, school_year):
+        """
+        :param school_year: school year as string
+        :return headers of a school year
+        """
+        row = self._db.execute("SELECT headers FROM rosters WHERE school_year = ?", (school_year,)).fetchone()
+        if row is None:
+            raise KeyError(school_year)
+        return json.loads(row[0])
+
+    def row_count(self, school_year):
+        """
+        :param school_year: school year as string
+        :return number of students in a school year
+        """
+        return self._db.execute("SELECT COUNT(*) FROM students WHERE school_year = ?", (school_year,)).fetchone()[0]
+
+    def rows(self, school_year, offset=0, limit=-1):
+        """
+        Read a page of the roster of a school year.
+        :param school_year: school year as string
+        :param offset: position of the first row
+        :param limit: maximum number of rows (-1 for all rows)
+        :return list of data entries
+        """
+        cursor = self._db.execute("SELECT entry FROM students WHERE school_year = ? AND position >= ? "
+                                  "ORDER BY position LIMIT ?", (school_year, offset, limit))
+        return [json.loads(r[0]) for r in cursor]
+
+    def student_results(self, name):
+        """
+        Find the results of a student across all school years.
+        :param name: name of the student, which is compared in its normalized form
+        :return list of (school year, release, points, name, school, grade) tuples
+        """
+        cursor = self._db.execute(
+            "SELECT s.school_year, r.release, r.points, s.name, s.school, s.grade FROM students s "
+            "JOIN results r ON r.student_id = s.id WHERE s.name_norm = ? ORDER BY s.school_year, r.release",
+            (normalize_name(name),))
+        return cursor.fetchall()
+
+    def top_students(self, school_year, grade=None, limit=20):
+        """
+        Find the students with the highest sum of a school year.
+        :param school_year: school year as string
+        :param grade: only include students of this grade (None to include all grades)
+        :param limit: maximum number of students
+        :return list of (name, school, grade, total) tuples
+        """
+        if grade is None:
+            cursor = self._db.execute("SELECT name, school, grade, total FROM students WHERE school_year = ? "
+                                      "ORDER BY total DESC, name_norm LIMIT ?", (school_year, limit))
+        else:
+            cursor = self._db.execute("SELECT name, school, grade, total FROM students WHERE school_year = ? "
+                                      "AND grade = ? ORDER BY total DESC, name_norm LIMIT ?",
+                                      (school_year, str(grade), limit))
+        return cursor.fetchall()
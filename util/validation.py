@@ -0,0 +1,190 @@
+from operator import sub, itemgetter
+from itertools import compress
+from collections import namedtuple
+
+from .helper import POINTS_PATTERN, points_to_str
+from .rollover import EMPTY_CELL
+
+
+# Default maximal number of points of a single release.
+DEFAULT_MAX_POINTS = 20
+
+# Maximal number of distinct cells remembered by a PointValidator.
+_MAX_CACHED_CELLS = 100000
+
+# Maximal difference between the sum and the points of an entry, the points are read as floats.
+_SUM_TOLERANCE = 1e-6
+
+# Cached value of cells which are not a number. NaN propagates through the sums, so entries with invalid points are
+# never reported as inconsistent.
+_INVALID = float("nan")
+
+
+# A point or sum cell which can not be exported:
+# - entry: the entry of the student (referenced directly, the rows change when the data is sorted)
+# - column: index of the column
+# - reason: description of the problem
+PointProblem = namedtuple("PointProblem", ["entry", "column", "reason"])
+
+
+class PointValidator(object):
+    """
+    Validate the point and sum cells of a roster. Unlike str_to_points, which reads every unknown text as 0 points,
+    texts which are not a number (e.g. "3,,5" or "O"), points above the maximum of a release and sums which do not
+    match the points are reported.
+
+    The roster is validated column by column. Each distinct text is only parsed once and the result is cached for all
+    later validations, so validating the whole roster again is a dictionary lookup per cell.
+    """
+
+    def __init__(self, schema, max_points=DEFAULT_MAX_POINTS):
+        """
+        :param schema: HeaderSchema of the data
+        :param max_points: maximal number of points of a single release (0 for no limit)
+        """
+        self.point_indices = tuple(schema.point_indices)
+        self.sum_index = schema.sum_index
+        self.max_points = max_points
+        # Points of each distinct cell or _INVALID if the cell is not a number.
+        self._cells = {}
+
+    def points(self, text):
+        """
+        :param text: content of a point or sum cell
+        :return points of the cell ("-" and empty cells are 0 points) or None if the text is not a number
+        """
+        try:
+            points = self._cells[text]
+        except KeyError:
+            stripped = text.strip()
+            if not stripped or stripped == EMPTY_CELL:
+                points = 0.0
+            elif POINTS_PATTERN.fullmatch(stripped) is None:
+                points = _INVALID
+            else:
+                points = float(stripped.replace(",", "."))
+            self._cells[text] = points
+        return None if points is _INVALID else points
+
+    def _column(self, entries, column):
+        """
+        :return points of each entry in the column and the reason of the problem for each distinct text with a problem
+        """
+        texts = list(map(itemgetter(column), entries))
+        distinct = set(texts)
+        cells = self._cells
+        for text in distinct.difference(cells):
+            self.points(text)
+        values = list(map(cells.__getitem__, texts))
+
+        if column == self.sum_index:
+            bad = {t: "invalid sum" for t in distinct if cells[t] is _INVALID}
+        else:
+            bad = {}
+            for text in distinct:
+                points = cells[text]
+                if points is _INVALID:
+                    bad[text] = "invalid points"
+                elif self.max_points and points > self.max_points:
+                    bad[text] = "more than {0} points".format(self.max_points)
+        return texts, values, bad
+
+    def validate(self, entries):
+        """
+        Validate all point and sum cells.
+        :param entries: data of each student
+        :return list of PointProblem in the order of the columns and entries
+        """
+        if len(self._cells) > _MAX_CACHED_CELLS:
+            self._cells.clear()
+
+        problems = []
+        columns = []
+        for column in self.point_indices:
+            texts, values, bad = self._column(entries, column)
+            if bad:
+                problems.extend(PointProblem(e, column, bad[t]) for e, t in zip(entries, texts) if t in bad)
+            columns.append(values)
+
+        if self.sum_index is None:
+            return problems
+
+        texts, totals, bad = self._column(entries, self.sum_index)
+        if bad:
+            problems.extend(PointProblem(e, self.sum_index, bad[t]) for e, t in zip(entries, texts) if t in bad)
+        # Compare all sums at once, only the inconsistent entries are visited by the interpreter.
+        expected = list(map(sum, zip(*columns))) if columns else [0.0] * len(entries)
+        differences = map(abs, map(sub, totals, expected))
+        for i in compress(range(len(entries)), map(_SUM_TOLERANCE.__lt__, differences)):
+            problems.append(PointProblem(entries[i], self.sum_index, "sum does not match the points ({0})".format(
+                points_to_str(expected[i]))))
+        return problems
+
+
+class PointProblemList(object):
+    """
+    Problems of all entries of a roster, kept up to date entry by entry while the data is edited.
+    """
+
+    def __init__(self, validator):
+        """
+        :param validator: PointValidator for the headers of the roster
+        """
+        self.validator = validator
+        # Problems of each entry with problems by the id of the entry. The problems reference their entry, so the id
+        # is not reused while the entry is in the list.
+        self._problems = {}
+
+    def __len__(self):
+        return len(self._problems)
+
+    def rebuild(self, entries):
+        """
+        Validate all entries again.
+        :param entries: data of each student
+        """
+        self._problems = {}
+        for problem in self.validator.validate(entries):
+            self._problems.setdefault(id(problem.entry), []).append(problem)
+
+    def update(self, entry):
+        """
+        Validate a new or changed entry.
+        """
+        problems = self.validator.validate([entry])
+        if problems:
+            self._problems[id(entry)] = problems
+        else:
+            self._problems.pop(id(entry), None)
+
+    def remove(self, entry):
+        """
+        Forget the problems of a removed entry.
+        """
+        self._problems.pop(id(entry), None)
+
+    def problems(self, entries=None):
+        """
+        :param entries: only return the problems of these entries (None for all problems)
+        :return list of PointProblem
+        """
+        if entries is None:
+            return [p for problems in self._problems.values() for p in problems]
+        return [p for e in entries for p in self._problems.get(id(e), ())]
+
+
+def format_point_problems(problems, headers, name_index, limit=None):
+    """
+    Create a text report of point problems.
+    :param problems: list of PointProblem
+    :param headers: all header fields
+    :param name_index: index of the name column
+    :param limit: maximal number of problems to list (None to list all)
+    :return report as string
+    """
+    listed = problems if limit is None else problems[:limit]
+    lines = ["{0}, {1} {2!r}: {3}".format(p.entry[name_index], headers[p.column], p.entry[p.column], p.reason)
+             for p in listed]
+    if len(listed) < len(problems):
+        lines.append("... and {0} more problems".format(len(problems) - len(listed)))
+    return "\n".join(lines)